@@ -28,4 +28,9 @@ export const runOptimization = (dryRun = false) => request('/optimize', {
 });
 
 export const approveAction = (actionId) => request(`/actions/${actionId}/approve`, { method: 'POST' });
+export const approveActions = (actionIds) => request('/actions/approve', {
+  method: 'POST',
+  headers: { 'Content-Type': 'application/json' },
+  body: JSON.stringify({ action_ids: actionIds }),
+});
 export const rejectAction = (actionId) => request(`/actions/${actionId}/reject`, { method: 'POST' });
\ No newline at end of file
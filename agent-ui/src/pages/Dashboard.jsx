@@ -10,6 +10,7 @@ function Dashboard() {
   const [pendingActions, setPendingActions] = useState([]);
   const [activities, setActivities] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
+  const [isApprovingAll, setIsApprovingAll] = useState(false);
   const [notification, setNotification] = useState(null);
 
   const showNotification = (message, type = 'info') => {
@@ -47,6 +48,19 @@ function Dashboard() {
       showNotification(`Error: ${error.message}`, 'error');
     }
   };
+
+  const handleApproveAll = async () => {
+    setIsApprovingAll(true);
+    try {
+      const approved = await api.approveActions(pendingActions.map(action => action.id));
+      showNotification(`${approved.length} actions approved and executed as one batch.`, 'success');
+      fetchData();
+    } catch (error) {
+      showNotification(`Error: ${error.message}`, 'error');
+    } finally {
+      setIsApprovingAll(false);
+    }
+  };
   
   const handleRunOptimization = async () => {
     setIsLoading(true);
@@ -77,7 +91,14 @@ function Dashboard() {
       <StatCards stats={stats} />
       
       <div className="bg-gray-800 p-6 rounded-lg shadow-lg my-8">
-        <h2 className="text-2xl font-bold mb-4 text-white">Action Approval (Human-in-the-Loop)</h2>
+        <div className="flex justify-between items-center mb-4">
+          <h2 className="text-2xl font-bold text-white">Action Approval (Human-in-the-Loop)</h2>
+          {pendingActions.length > 1 && (
+            <button onClick={handleApproveAll} disabled={isApprovingAll} className="bg-green-600 hover:bg-green-500 disabled:bg-green-800 disabled:cursor-not-allowed text-white font-bold py-2 px-4 rounded transition-colors shadow-lg">
+              {isApprovingAll ? 'Approving...' : `Approve All (${pendingActions.length})`}
+            </button>
+          )}
+        </div>
         {pendingActions.length > 0 ? (
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
             {pendingActions.map(action => (
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from k8s_cost_optimizer.models.schemas import OptimizationType
+from k8s_cost_optimizer.models.action_record import ActionRecord
+from k8s_cost_optimizer.utils.k8s_client import KubernetesClient
+from k8s_cost_optimizer.utils.logger import logger
+
+ObjectKey = Tuple[str, str, str]  # (kind, namespace, name)
+
+WORKLOAD_API_VERSIONS = {"Deployment": "apps/v1", "StatefulSet": "apps/v1", "DaemonSet": "apps/v1"}
+
+def _quantity_string(value: Any) -> str:
+    """Kubecost reports bare numbers (cores, bytes); the API server wants quantity strings."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+class ServerSideApplyExecutor:
+    """Executes rightsizing and HPA actions as one server-side-apply patch per object.
+
+    Actions are grouped by the object they change, so every container resize for a workload
+    lands in a single patch (one rollout, not one per container). The whole batch is first
+    validated with dryRun=All; only objects that pass are then applied, with bounded concurrency.
+    Fields owned by another field manager fail validation with the conflict unless `force_conflicts`.
+    """
+
+    def __init__(self, k8s_client: KubernetesClient, concurrency: int = 10, force_conflicts: bool = False):
+        self.k8s_client = k8s_client
+        self.concurrency = concurrency
+        self.force_conflicts = force_conflicts
+
+    def _apply(self, body: Dict[str, Any], dry_run: bool = False) -> Tuple[bool, str]:
+        return self.k8s_client.apply_object(body, dry_run=dry_run, force=self.force_conflicts)
+
+    def execute(self, actions: List[ActionRecord]) -> Dict[str, Tuple[bool, str]]:
+        results: Dict[str, Tuple[bool, str]] = {}
+        groups: Dict[ObjectKey, List[ActionRecord]] = {}
+        for action in actions:
+            try:
+                groups.setdefault(self._object_key(action), []).append(action)
+            except (AttributeError, ValueError) as e:
+                results[action.id] = (False, f"Invalid action details: {e}")
+
+        patches = {key: self._build_patch(key, group) for key, group in groups.items()}
+        log = logger.bind(objects=len(patches), actions=len(actions))
+        log.info("Validating server-side apply batch.")
+
+        if not patches:
+            return results
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            keys = list(patches)
+            validated = dict(zip(keys, pool.map(lambda k: self._apply(patches[k], dry_run=True), keys)))
+            valid_keys = [k for k in keys if validated[k][0]]
+            applied = dict(zip(valid_keys, pool.map(lambda k: self._apply(patches[k]), valid_keys)))
+
+        for key, group in groups.items():
+            ok, message = applied.get(key) or (False, f"Dry-run validation failed: {validated[key][1]}")
+            for action in group:
+                results[action.id] = (ok, message)
+        log.info("Server-side apply batch finished", validated=len(valid_keys), applied=sum(1 for ok, _ in applied.values() if ok))
+        return results
+
+    def _object_key(self, action: ActionRecord) -> ObjectKey:
+        if action.type == OptimizationType.HPA_OPTIMIZATION:
+            return "HorizontalPodAutoscaler", action.namespace, action.target
+        if action.type == OptimizationType.RIGHTSIZING:
+            kind = action.details.workload_kind
+            if kind not in WORKLOAD_API_VERSIONS:
+                raise ValueError(f"unsupported workload kind {kind}")
+            return kind, action.namespace, action.target
+        raise ValueError(f"action type {action.type.value} is not applied server-side")
+
+    def _build_patch(self, key: ObjectKey, actions: List[ActionRecord]) -> Dict[str, Any]:
+        kind, namespace, name = key
+        metadata = {"name": name, "namespace": namespace}
+        if kind == "HorizontalPodAutoscaler":
+            spec: Dict[str, Any] = {}
+            for action in actions:
+                spec["minReplicas"] = int(action.details.recommended_min)
+                spec["maxReplicas"] = int(action.details.recommended_max)
+            return {"apiVersion": "autoscaling/v2", "kind": kind, "metadata": metadata, "spec": spec}
+
+        containers: Dict[str, Dict[str, str]] = {}
+        for action in actions:
+            requests = containers.setdefault(action.details.container, {})
+            for resource, value in (action.details.recommended_requests or {}).items():
+                if resource in ("cpu", "memory"):
+                    requests[resource] = _quantity_string(value)
+        return {
+            "apiVersion": WORKLOAD_API_VERSIONS[kind],
+            "kind": kind,
+            "metadata": metadata,
+            "spec": {"template": {"spec": {"containers": [
+                {"name": container, "resources": {"requests": requests}}
+                for container, requests in sorted(containers.items())
+            ]}}},
+        }
\ No newline at end of file
@@ -0,0 +1,214 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from k8s_cost_optimizer.config import ContinuousSettings
+from k8s_cost_optimizer.models.schemas import AnalysisScope, OptimizationType
+from k8s_cost_optimizer.tools.pod_cleaner import PodCleanupTool, pod_finished_at
+from k8s_cost_optimizer.utils.informer import Informer, object_key
+from k8s_cost_optimizer.utils.k8s_client import KubernetesClient
+from k8s_cost_optimizer.utils.volume_index import VolumeReferenceIndex
+from k8s_cost_optimizer.utils.logger import logger
+
+def _mounts_claims(pod: Any) -> bool:
+    return any(v.persistent_volume_claim for v in (pod.spec and pod.spec.volumes) or [])
+
+class TriggerQueue:
+    """Coalesces analysis triggers into one targeted scope, debounced and rate-limited.
+
+    A batch is released once no trigger arrived for `debounce` seconds, or `max_delay` seconds after
+    its first trigger under a steady stream, but never sooner than `min_interval` after the previous one.
+    """
+
+    def __init__(self, debounce: float, max_delay: float, min_interval: float):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[OptimizationType, Set[str]] = {}
+        self._first_at: Optional[float] = None
+        self._last_at: Optional[float] = None
+        self._last_release = float("-inf")
+
+    def add(self, action_type: OptimizationType, namespace: Optional[str], now: float) -> None:
+        with self._lock:
+            namespaces = self._pending.setdefault(action_type, set())
+            if namespace:
+                namespaces.add(namespace)
+            if self._first_at is None:
+                self._first_at = now
+            self._last_at = now
+
+    def due(self, now: float) -> Optional[AnalysisScope]:
+        with self._lock:
+            if self._first_at is None or now - self._last_release < self.min_interval:
+                return None
+            if now - self._last_at < self.debounce and now - self._first_at < self.max_delay:
+                return None
+            scope = AnalysisScope(
+                namespaces=set().union(*self._pending.values()),
+                cluster_scoped=OptimizationType.NODE_OPTIMIZATION in self._pending,
+                action_types=set(self._pending),
+            )
+            self._reset(now)
+            return scope
+
+    def clear(self, now: float) -> None:
+        with self._lock:
+            self._reset(now)
+
+    def _reset(self, now: float) -> None:
+        self._pending, self._first_at, self._last_at = {}, None, None
+        self._last_release = now
+
+class ContinuousOptimizer:
+    """Turns watch events into targeted analysis scopes.
+
+    - a pod finished for longer than the pod cleanup retention -> pod cleanup in its namespace
+    - a claim losing a referrer (pod finished/deleted, StatefulSet or CronJob deleted) or going Lost -> PVC cleanup
+    - an HPA settling (current == desired) on its floor at a new replica count -> HPA tuning
+    - a node joining, leaving or being (un)cordoned, or a node alert -> node consolidation
+
+    Handlers only record state transitions, so informer relists never re-trigger work already seen.
+    """
+
+    def __init__(self, settings: ContinuousSettings, k8s_client: KubernetesClient, volume_index: VolumeReferenceIndex):
+        self.settings = settings
+        self.volume_index = volume_index
+        self.queue = TriggerQueue(settings.debounce_seconds, settings.max_delay_seconds, settings.min_interval_seconds)
+        self.informers = [
+            Informer("horizontalpodautoscalers", k8s_client.autoscaling_v2.list_horizontal_pod_autoscaler_for_all_namespaces),
+            Informer("nodes", k8s_client.core_v1.list_node),
+        ]
+        self._finished_pods: Set[str] = set()
+        self._cleanup_lock = threading.Lock()
+        self._cleanup_due: List[Tuple[float, str, str]] = []  # heap of (monotonic time, pod key, namespace)
+        self._lost_claims: Set[str] = set()
+        self._settled_hpas: Dict[str, int] = {}
+        self._node_unschedulable: Dict[str, bool] = {}
+        self._priming = False
+        self._next_sweep = time.monotonic() + settings.full_sweep_interval_seconds
+
+    def start(self) -> None:
+        # Existing objects are replayed as ADDED when handlers register; record them without triggering.
+        self._priming = True
+        try:
+            self.volume_index.informer("pods").add_handler(self._on_pod)
+            self.volume_index.informer("persistentvolumeclaims").add_handler(self._on_claim)
+            self.volume_index.informer("statefulsets").add_handler(self._on_claim_referrer)
+            self.volume_index.informer("cronjobs").add_handler(self._on_claim_referrer)
+            hpas, nodes = self.informers
+            hpas.add_handler(self._on_hpa)
+            nodes.add_handler(self._on_node)
+            for informer in self.informers:
+                informer.start()
+        finally:
+            self._priming = False
+        logger.info("Continuous optimization started", sweep_interval_seconds=self.settings.full_sweep_interval_seconds)
+
+    def poll(self, now: Optional[float] = None) -> Optional[Tuple[str, Optional[AnalysisScope]]]:
+        """Returns ("sweep", None) when a full sweep is due, ("event", scope) when a targeted batch is, else None."""
+        now = time.monotonic() if now is None else now
+        self._release_cleanups(now)
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.settings.full_sweep_interval_seconds
+            self.queue.clear(now)  # the sweep covers everything queued so far
+            return "sweep", None
+        scope = self.queue.due(now)
+        return ("event", scope) if scope else None
+
+    def handle_alerts(self, alerts: List[Dict[str, Any]]) -> int:
+        """Queues triggers from firing Alertmanager alerts: node-labelled ones ask for consolidation,
+        namespace-labelled ones for rightsizing of that namespace's workloads from their Prometheus usage.
+        Returns the number of alerts used."""
+        used = 0
+        for alert in alerts:
+            if alert.get("status", "firing") != "firing":
+                continue
+            labels = alert.get("labels") or {}
+            if labels.get("node"):
+                self._trigger(OptimizationType.NODE_OPTIMIZATION, None)
+            elif labels.get("namespace"):
+                self._trigger(OptimizationType.RIGHTSIZING, labels["namespace"])
+            else:
+                continue
+            used += 1
+        return used
+
+    def _trigger(self, action_type: OptimizationType, namespace: Optional[str]) -> None:
+        if not self._priming:
+            self.queue.add(action_type, namespace, time.monotonic())
+
+    # --- event handlers (called from informer threads) ---
+    def _on_pod(self, event_type: str, pod: Any) -> None:
+        key, namespace = object_key(pod), pod.metadata.namespace
+        if event_type == "DELETED":
+            was_finished = key in self._finished_pods
+            self._finished_pods.discard(key)
+            if _mounts_claims(pod) and not was_finished:
+                self._trigger(OptimizationType.PVC_CLEANUP, namespace)
+            return
+        finished = pod.status is not None and pod.status.phase in ("Succeeded", "Failed")
+        if finished and key not in self._finished_pods:
+            self._finished_pods.add(key)
+            self._schedule_cleanup(key, namespace, pod)
+            if _mounts_claims(pod):
+                self._trigger(OptimizationType.PVC_CLEANUP, namespace)
+
+    def _schedule_cleanup(self, key: str, namespace: str, pod: Any) -> None:
+        """Pod cleanup only picks pods finished longer than its retention ago, so trigger it once this one is."""
+        finished_at = pod_finished_at(pod)
+        if finished_at is None:
+            return  # the cleanup tool never picks pods without a finish time
+        wait = (finished_at + PodCleanupTool.RETENTION - datetime.now(timezone.utc)).total_seconds()
+        if wait <= 0:
+            self._trigger(OptimizationType.POD_CLEANUP, namespace)
+            return
+        # Scheduled even while priming: pods that finished before startup become eligible later too.
+        with self._cleanup_lock:
+            heapq.heappush(self._cleanup_due, (time.monotonic() + wait, key, namespace))
+
+    def _release_cleanups(self, now: float) -> None:
+        with self._cleanup_lock:
+            while self._cleanup_due and self._cleanup_due[0][0] <= now:
+                _, key, namespace = heapq.heappop(self._cleanup_due)
+                if key in self._finished_pods:  # deleted pods need no cleanup
+                    self.queue.add(OptimizationType.POD_CLEANUP, namespace, now)
+
+    def _on_claim(self, event_type: str, pvc: Any) -> None:
+        key = object_key(pvc)
+        lost = event_type != "DELETED" and pvc.status is not None and pvc.status.phase == "Lost"
+        if lost and key not in self._lost_claims:
+            self._lost_claims.add(key)
+            self._trigger(OptimizationType.PVC_CLEANUP, pvc.metadata.namespace)
+        elif not lost:
+            self._lost_claims.discard(key)
+
+    def _on_claim_referrer(self, event_type: str, obj: Any) -> None:
+        if event_type == "DELETED":
+            self._trigger(OptimizationType.PVC_CLEANUP, obj.metadata.namespace)
+
+    def _on_hpa(self, event_type: str, hpa: Any) -> None:
+        key = object_key(hpa)
+        if event_type == "DELETED":
+            self._settled_hpas.pop(key, None)
+            return
+        current, desired = hpa.status.current_replicas, hpa.status.desired_replicas
+        if current is None or current != desired or self._settled_hpas.get(key) == current:
+            return
+        self._settled_hpas[key] = current
+        if current <= (hpa.spec.min_replicas or 1):
+            self._trigger(OptimizationType.HPA_OPTIMIZATION, hpa.metadata.namespace)
+
+    def _on_node(self, event_type: str, node: Any) -> None:
+        name = node.metadata.name
+        if event_type == "DELETED":
+            self._node_unschedulable.pop(name, None)
+            self._trigger(OptimizationType.NODE_OPTIMIZATION, None)
+            return
+        unschedulable = bool(node.spec.unschedulable)
+        if self._node_unschedulable.get(name) != unschedulable:
+            self._node_unschedulable[name] = unschedulable
+            self._trigger(OptimizationType.NODE_OPTIMIZATION, None)
\ No newline at end of file
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from k8s_cost_optimizer.config import CoordinationSettings
+from k8s_cost_optimizer.models.schemas import AnalysisScope, OptimizationRun, RunStatus
+from k8s_cost_optimizer.utils.hash_ring import ConsistentHashRing
+from k8s_cost_optimizer.utils.k8s_client import KubernetesClient
+from k8s_cost_optimizer.utils.lease import LeaseBackend, LeaseRecord, InMemoryLeaseBackend, KubernetesLeaseBackend
+from k8s_cost_optimizer.utils.logger import logger
+
+# Pseudo-shard for cluster-scoped work (node consolidation); always processed by the current leader.
+CLUSTER_SHARD = "__cluster__"
+
+class ClusterCoordinator:
+    """Replica membership, leader election and namespace sharding, all built on Leases.
+
+    Every replica renews its own member Lease; the set of unexpired member Leases is the hash ring.
+    A single leader Lease decides who runs cluster-scoped work and who takes over the shards of
+    replicas that left before claiming them or died mid-run.
+    """
+
+    def __init__(self, settings: CoordinationSettings, backend: LeaseBackend, k8s_client: KubernetesClient):
+        self.settings = settings
+        self.backend = backend
+        self.k8s_client = k8s_client
+        self.identity = settings.identity
+        self.is_leader = False
+        self._members: List[str] = [self.identity]
+        self._member_labels = {"app.kubernetes.io/managed-by": settings.lease_prefix, "role": "member"}
+        self._leader_lease = f"{settings.lease_prefix}-leader"
+
+    def heartbeat(self) -> None:
+        """Renews this replica's membership, refreshes the member list and runs one leader-election round."""
+        self._renew_member_lease()
+        now = datetime.now(timezone.utc)
+        members = {r.holder for r in self.backend.list(self._member_labels) if not r.is_expired(now)}
+        members.add(self.identity)
+        self._members = sorted(members)
+
+        was_leader = self.is_leader
+        self.is_leader = self._try_acquire_leadership()
+        if self.is_leader != was_leader:
+            logger.info("Leadership changed", identity=self.identity, is_leader=self.is_leader)
+
+    def _renew_member_lease(self) -> None:
+        name = f"{self.settings.lease_prefix}-member-{self.identity}"
+        record = self.backend.get(name)
+        now = datetime.now(timezone.utc)
+        if record is None:
+            self.backend.create(LeaseRecord(
+                name=name, holder=self.identity, labels=self._member_labels,
+                duration_seconds=self.settings.lease_duration_seconds,
+            ))
+        else:
+            self.backend.replace(record.model_copy(update={"renew_time": now}))
+
+    def _try_acquire_leadership(self) -> bool:
+        now = datetime.now(timezone.utc)
+        record = self.backend.get(self._leader_lease)
+        if record is None:
+            return self.backend.create(LeaseRecord(
+                name=self._leader_lease, holder=self.identity,
+                duration_seconds=self.settings.lease_duration_seconds,
+            ))
+        if record.holder == self.identity:
+            return self.backend.replace(record.model_copy(update={"renew_time": now}))
+        if record.is_expired(now):
+            return self.backend.replace(record.model_copy(update={
+                "holder": self.identity, "acquire_time": now, "renew_time": now,
+                "transitions": record.transitions + 1,
+            }))
+        return False
+
+    def live_members(self) -> List[str]:
+        return list(self._members)
+
+    def plan_shards(self) -> Dict[str, RunStatus]:
+        """Shards for a new run: one per live replica, plus the cluster shard when there is more than one."""
+        members = self.live_members()
+        shards = {member: RunStatus.PENDING for member in members}
+        if len(members) > 1:
+            shards[CLUSTER_SHARD] = RunStatus.PENDING
+        return shards
+
+    def claimable_shards(self, run: OptimizationRun) -> List[Tuple[str, Optional[str]]]:
+        """Shards of `run` this replica should claim, each with the owner its claim has to replace.
+
+        Its own pending shard; and, if it is the leader, the cluster shard, pending shards of replicas
+        that are gone, and running shards whose owner has left the membership set since claiming them.
+        """
+        live = set(self._members)
+        # A claim younger than one lease term may come from a replica this one has not seen join yet.
+        settled = datetime.utcnow() - timedelta(seconds=self.settings.lease_duration_seconds)
+        claimable = []
+        for shard, status in run.shards.items():
+            claim = run.claims.get(shard)
+            if status == RunStatus.PENDING and claim is None:
+                if shard == self.identity or (self.is_leader and (shard == CLUSTER_SHARD or shard not in live)):
+                    claimable.append((shard, None))
+            elif status == RunStatus.RUNNING and claim is not None and self.is_leader \
+                    and claim.owner not in live and claim.claimed_at < settled:
+                claimable.append((shard, claim.owner))
+        return claimable
+
+    def scope_for(self, run: OptimizationRun, shard: str) -> AnalysisScope:
+        """The part of the run's target (the whole cluster unless the run is targeted) `shard` analyzes."""
+        target = run.scope or AnalysisScope()
+        if shard == CLUSTER_SHARD:
+            return target.model_copy(update={"namespaces": set()})
+        members = [s for s in run.shards if s != CLUSTER_SHARD]
+        if len(members) == 1:
+            return target
+        # The ring is built from the member snapshot taken when the run was planned, so every
+        # replica computes the same partition even if membership changes mid-run.
+        ring = ConsistentHashRing(members, vnodes=self.settings.hash_ring_vnodes)
+        candidates = target.namespaces if target.namespaces is not None else self.k8s_client.list_namespaces()
+        owned = {ns for ns in candidates if ring.owner(ns) == shard}
+        return target.model_copy(update={"namespaces": owned, "cluster_scoped": False})
+
+def merge_shard_reports(reports: Dict[str, Dict]) -> Dict:
+    merged = {
+        'timestamp': max((r.get('timestamp', '') for r in reports.values()), default=None),
+        'total_actions_generated': sum(r.get('total_actions_generated', 0) for r in reports.values()),
+        'actions_approved_for_review': sum(r.get('actions_approved_for_review', 0) for r in reports.values()),
+        'actions_already_queued': sum(r.get('actions_already_queued', 0) for r in reports.values()),
+        'dry_run': next((r.get('dry_run') for r in reports.values() if 'dry_run' in r), None),
+        'ai_analysis_summary': next((r['ai_analysis_summary'] for r in reports.values() if r.get('ai_analysis_summary')), None),
+    }
+    if len(reports) > 1:
+        merged['shards'] = reports
+    return merged
+
+def build_lease_backend(settings: CoordinationSettings) -> LeaseBackend:
+    if settings.lease_backend == "kubernetes":
+        return KubernetesLeaseBackend(namespace=settings.lease_namespace)
+    return InMemoryLeaseBackend()
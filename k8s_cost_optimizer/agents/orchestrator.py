@@ -1,48 +1,99 @@
+import asyncio
 from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, START, END
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 
 from k8s_cost_optimizer.config import Settings
-from k8s_cost_optimizer.models.schemas import ClusterState, ActionStatus, OptimizationType, OptimizationAction
+from k8s_cost_optimizer.models.schemas import ClusterState, ActionStatus, OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord
 from k8s_cost_optimizer.utils.k8s_client import KubernetesClient
 from k8s_cost_optimizer.utils.prometheus import PrometheusClient
 from k8s_cost_optimizer.utils.kubecost_client import KubecostClient
+from k8s_cost_optimizer.utils.cost_index import CostIndex
+from k8s_cost_optimizer.utils.volume_index import VolumeReferenceIndex
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.outbound import OutboundRegistry
+from k8s_cost_optimizer.utils import snapshot as snapshots
 from k8s_cost_optimizer.tools.pod_cleaner import PodCleanupTool
 from k8s_cost_optimizer.tools.pvc_cleaner import PVCCleanerTool
 from k8s_cost_optimizer.tools.hpa_optimizer import HPAOptimizerTool
+from k8s_cost_optimizer.tools.rightsizer import RightsizingTool
 from k8s_cost_optimizer.tools.node_optimizer import NodeOptimizerTool
 from k8s_cost_optimizer.tools.kubecost_suggester import KubecostSuggesterTool
 from k8s_cost_optimizer.agents.safety_controller import SafetyController
+from k8s_cost_optimizer.agents.apply_executor import ServerSideApplyExecutor
+
+# Action types executed as server-side-apply patches, batched per target object.
+APPLY_ACTION_TYPES = (OptimizationType.RIGHTSIZING, OptimizationType.HPA_OPTIMIZATION)
 
 class AICostOptimizationOrchestrator:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, snapshot: Optional[snapshots.Snapshot] = None):
         self.settings = settings
-        self.k8s_client = KubernetesClient()
-        self.prometheus_client = PrometheusClient(
-            url=self.settings.prometheus.url,
-            timeout=self.settings.prometheus.timeout
-        )
-        self.kubecost_client = KubecostClient(
-          base_url=self.settings.kubecost.url
-        )
-        
+        self.snapshot = snapshot
+        # Rate limits, adaptive concurrency and circuit breakers shared by every outbound call.
+        self.outbound = OutboundRegistry(dict(settings.outbound))
+        if snapshot is not None:
+            # Offline replay: every input is served from the snapshot file, nothing touches the network.
+            self.k8s_client = snapshots.ReplayKubernetesClient(snapshot)
+            self.prometheus_client = snapshots.ReplayPrometheusClient(snapshot)
+            self.kubecost_client = snapshots.ReplayKubecostClient(snapshot)
+            self.volume_index = snapshots.ReplayVolumeIndex(snapshot)
+        else:
+            self._connect_clients()
+
         self.tools = [
             KubecostSuggesterTool(
                 kubecost_client=self.kubecost_client,
                 k8s_client=self.k8s_client,
                 prometheus_client=self.prometheus_client
             ),
+            RightsizingTool(self.k8s_client, self.prometheus_client),
             PodCleanupTool(self.k8s_client, self.prometheus_client),
-            PVCCleanerTool(self.k8s_client, self.prometheus_client),
+            PVCCleanerTool(self.volume_index, self.k8s_client, self.prometheus_client),
             HPAOptimizerTool(self.k8s_client, self.prometheus_client),
             NodeOptimizerTool(self.k8s_client, self.prometheus_client),
         ]
+        if snapshot is not None:
+            for tool in self.tools:
+                tool.clock = snapshot.clock
         
         self.safety_controller = SafetyController(self.k8s_client)
-        self.llm = ChatGroq(model=settings.groq_model_name, groq_api_key=settings.groq_api_key)
+        self.apply_executor = ServerSideApplyExecutor(
+            self.k8s_client, settings.agent.apply_concurrency, force_conflicts=settings.agent.apply_force_conflicts)
+        if snapshot is None and not settings.groq_api_key:
+            raise ValueError("GROQ_API_KEY is not set")
+        self.llm = None if snapshot is not None else ChatGroq(model=settings.groq_model_name, groq_api_key=settings.groq_api_key)
         self.agent = self._build_workflow().compile()
+
+    @classmethod
+    def from_snapshot(cls, settings: Settings, path: str) -> "AICostOptimizationOrchestrator":
+        return cls(settings, snapshots.Snapshot(path))
+
+    def _connect_clients(self) -> None:
+        self.k8s_client = KubernetesClient(guard=self.outbound.guard("kubernetes"))
+        self.prometheus_client = PrometheusClient(
+            url=self.settings.prometheus.url,
+            timeout=self.settings.prometheus.timeout,
+            query_concurrency=self.settings.prometheus.query_concurrency,
+            query_shards=self.settings.prometheus.query_shards,
+            guard=self.outbound.guard("prometheus"),
+        )
+        self.kubecost_client = KubecostClient(
+          base_url=self.settings.kubecost.url,
+          guard=self.outbound.guard("kubecost"),
+        )
+        
+        # Kept current by watches, so PVC analysis never relists pods.
+        self.volume_index = VolumeReferenceIndex(self.k8s_client)
+        self.volume_index.start()
+
+        if self.settings.snapshot.record_dir:
+            # Analysis reads go through recorders; they only capture while a run is being recorded.
+            self.k8s_client = snapshots.RecordingKubernetesClient(self.k8s_client)
+            self.prometheus_client = snapshots.RecordingPrometheusClient(self.prometheus_client)
+            self.kubecost_client = snapshots.RecordingKubecostClient(self.kubecost_client)
+            self.volume_index = snapshots.RecordingVolumeIndex(self.volume_index)
     
     def _build_workflow(self) -> StateGraph:
         workflow = StateGraph(dict)
@@ -61,12 +112,21 @@ class AICostOptimizationOrchestrator:
         
         return workflow
 
-    def _run_analysis_workflow(self, run_id: str, dry_run: bool) -> Dict:
+    def _run_analysis_workflow(self, run_id: str, dry_run: bool, scope: AnalysisScope) -> Dict:
         """Runs the analysis part of the workflow and returns potential actions."""
         log = logger.bind(run_id=run_id)
         log.info("Starting new Kubernetes cost optimization analysis workflow", dry_run=dry_run)
-        initial_state = {"run_id": run_id, "dry_run": dry_run, "actions": []}
-        final_state = self.agent.invoke(initial_state)
+        initial_state = {"run_id": run_id, "dry_run": dry_run, "scope": scope, "actions": []}
+        recorder = None
+        if self.settings.snapshot.record_dir and self.snapshot is None:
+            recorder = snapshots.SnapshotRecorder(run_id, scope)
+        with snapshots.recording(recorder):
+            final_state = self.agent.invoke(initial_state)
+        if recorder is not None:
+            try:
+                log.info("Recorded analysis snapshot", path=recorder.write(self.settings.snapshot.record_dir))
+            except OSError as e:
+                log.error("Failed to write analysis snapshot", error=str(e))
 
         if final_state.get("error"):
              log.error("Analysis workflow finished with an error.", error=final_state.get("error"))
@@ -74,12 +134,12 @@ class AICostOptimizationOrchestrator:
              log.info("Analysis workflow completed successfully.", report=final_state.get("report"))
         return final_state
 
-    def run_and_categorize_actions(self, run_id: str, dry_run: bool) -> Dict:
+    def run_and_categorize_actions(self, run_id: str, dry_run: bool, scope: Optional[AnalysisScope] = None) -> Dict:
         """
         Runs the full analysis and then categorizes actions for HITL or autonomous execution.
-        This is the new main entry point for the backend.
+        This is the new main entry point for the backend. `scope` limits the run to one replica's shard.
         """
-        analysis_result = self._run_analysis_workflow(run_id, dry_run)
+        analysis_result = self._run_analysis_workflow(run_id, dry_run, scope or AnalysisScope())
         
         if "error" in analysis_result:
             return analysis_result
@@ -119,7 +179,7 @@ class AICostOptimizationOrchestrator:
             "auto_execute_actions": auto_execute_actions
         }
 
-    async def execute_single_action(self, action: OptimizationAction) -> Tuple[bool, str]:
+    async def execute_single_action(self, action: ActionRecord) -> Tuple[bool, str]:
         """Executes a single, approved action. Called by the API for both auto and manual approval."""
         log = logger.bind(action_id=action.id, type=action.type.value)
         log.info("Executing single action.")
@@ -127,18 +187,25 @@ class AICostOptimizationOrchestrator:
         message = ""
 
         try:
-            if action.type == OptimizationType.POD_CLEANUP:
+            if action.type in APPLY_ACTION_TYPES:
+                results = await asyncio.to_thread(self.apply_executor.execute, [action])
+                success, message = results[action.id]
+            elif action.type == OptimizationType.POD_CLEANUP:
                 success = self.k8s_client.delete_pod(name=action.target, namespace=action.namespace)
             elif action.type == OptimizationType.PVC_CLEANUP:
                 success = self.k8s_client.delete_pvc(name=action.target, namespace=action.namespace)
             elif action.type == OptimizationType.NODE_OPTIMIZATION:
+                if not self.safety_controller.can_drain_node(action):
+                    log.warning("Node drain refused at execution", reason=action.error)
+                    return False, action.error
                 if self.k8s_client.cordon_node(node_name=action.target):
                     success = self.k8s_client.drain_node(node_name=action.target)
             else:
-                log.warning("Live execution logic for action type not implemented, skipping.")
-                success = True
-            
-            if not success:
+                message = f"No execution logic for action type {action.type.value}"
+                log.warning(message)
+                return False, message
+
+            if not success and not message:
                 message = f"Execution failed in Kubernetes client for action type {action.type.value}"
                 log.error(message)
         except Exception as e:
@@ -148,12 +215,51 @@ class AICostOptimizationOrchestrator:
 
         return success, message
     
+    async def execute_actions(self, actions: List[ActionRecord]) -> List[Tuple[bool, str]]:
+        """Executes a batch of approved actions. Pod cleanups are deleted together and resource/HPA
+        changes are validated and applied together, both with bounded concurrency."""
+        pod_cleanups = [a for a in actions if a.type == OptimizationType.POD_CLEANUP]
+        results: Dict[str, Tuple[bool, str]] = {}
+
+        if pod_cleanups:
+            logger.info("Executing pod cleanup batch.", count=len(pod_cleanups))
+            deleted = await asyncio.to_thread(
+                self.k8s_client.delete_pods,
+                [(a.namespace, a.target, a.details.uid) for a in pod_cleanups],
+            )
+            for action in pod_cleanups:
+                results[action.id] = deleted[(action.namespace, action.target)]
+
+        patches = [a for a in actions if a.type in APPLY_ACTION_TYPES]
+        if patches:
+            logger.info("Executing server-side apply batch.", count=len(patches))
+            results.update(await asyncio.to_thread(self.apply_executor.execute, patches))
+
+        for action in actions:
+            if action.id not in results:
+                results[action.id] = await self.execute_single_action(action)
+        return [results[a.id] for a in actions]
+
     def _log_node_entry(self, state: dict, node_name: str) -> any:
         return logger.bind(run_id=state.get('run_id'), node=node_name)
 
+    @staticmethod
+    def _summarizes(scope: AnalysisScope) -> bool:
+        """Only full cluster-wide passes collect the cluster state and summarize it with the LLM."""
+        return scope.cluster_scoped and scope.action_types is None
+
     def _collect_metrics_node(self, state: dict) -> dict:
         log = self._log_node_entry(state, "collect_metrics")
         log.info("Starting metric collection")
+        scope = state['scope']
+        # Unit prices are fetched once here; every tool prices its actions against this index.
+        # Only the Kubecost data the run's tools price with is fetched (none for pod cleanup).
+        datasets = frozenset().union(*(t.cost_data for t in self.tools if scope.runs(t.action_type)))
+        state['cost_index'] = CostIndex.from_kubecost(self.kubecost_client, datasets=datasets) if datasets else CostIndex()
+        if not self._summarizes(scope):
+            state['cluster_state'] = None
+            return state
+
         nodes = self.k8s_client.get_nodes()
         pods = self.k8s_client.get_all_pods()
         estimated_cost = self.kubecost_client.get_total_monthly_cost()
@@ -167,12 +273,22 @@ class AICostOptimizationOrchestrator:
     
     def _analyze_cluster_node(self, state: dict) -> dict:
         log = self._log_node_entry(state, "analyze_cluster")
+        if not self._summarizes(state['scope']):
+            # Shards and targeted runs skip the LLM call.
+            state['ai_analysis'] = None
+            return state
+        if self.snapshot is not None:
+            state['ai_analysis'] = self.snapshot.ai_analysis
+            return state
         log.info("Starting AI cluster analysis")
         cluster_state_model = state['cluster_state']
         prompt = f"Analyze the following Kubernetes cluster state and provide a brief, one-sentence summary of the primary cost optimization opportunities. Cluster State: {cluster_state_model.model_dump_json(indent=2)}"
         try:
-            response = self.llm.invoke(prompt)
+            response = self.outbound.guard("llm").call(self.llm.invoke, prompt)
             state['ai_analysis'] = response.content
+            recorder = snapshots.active_recorder()
+            if recorder is not None:
+                recorder.ai_analysis = response.content
             log.info("AI analysis completed")
         except Exception as e:
             log.error("AI analysis failed", error=str(e))
@@ -184,8 +300,10 @@ class AICostOptimizationOrchestrator:
         log.info("Generating optimization actions from tools")
         all_actions = []
         for tool in self.tools:
+            if not state['scope'].runs(tool.action_type):
+                continue
             try:
-                actions = tool.analyze()
+                actions = tool.analyze(state['scope'], state['cost_index'])
                 all_actions.extend(actions)
             except Exception as e:
                 log.error(f"Tool {tool.__class__.__name__} failed during analysis", error=str(e))
@@ -1,20 +1,29 @@
-from typing import List
-from k8s_cost_optimizer.models.schemas import OptimizationAction, ActionStatus, OptimizationType
+from typing import List, Optional
+from k8s_cost_optimizer.models.schemas import ActionStatus, OptimizationType
+from k8s_cost_optimizer.models.action_record import ActionRecord
 from k8s_cost_optimizer.utils.k8s_client import KubernetesClient
 from k8s_cost_optimizer.utils.logger import logger
 
 class SafetyController:
+    MIN_SCHEDULABLE_NODES = 2  # a node drain must leave at least this many ready, uncordoned nodes
+
     def __init__(self, k8s_client: KubernetesClient):
         self.k8s_client = k8s_client
         self.critical_namespaces = ['kube-system', 'kube-public', 'opencost']
     
-    def validate_actions(self, actions: List[OptimizationAction], run_id: str) -> List[OptimizationAction]:
+    def validate_actions(self, actions: List[ActionRecord], run_id: str) -> List[ActionRecord]:
         log = logger.bind(run_id=run_id)
         log.info(f"Validating {len(actions)} actions for safety.")
         
+        # Drains are judged against the cluster left by the drains approved before them.
+        schedulable_nodes = None
         for action in actions:
-            if self._is_action_safe(action):
+            if action.type == OptimizationType.NODE_OPTIMIZATION and schedulable_nodes is None:
+                schedulable_nodes = self.schedulable_node_count()
+            if self._is_action_safe(action, schedulable_nodes):
                 action.status = ActionStatus.APPROVED
+                if action.type == OptimizationType.NODE_OPTIMIZATION:
+                    schedulable_nodes -= 1
                 log.info("Action approved", action_id=action.id, type=action.type.value)
             else:
                 action.status = ActionStatus.REJECTED
@@ -22,7 +31,19 @@ class SafetyController:
         
         return actions
 
-    def _is_action_safe(self, action: OptimizationAction) -> bool:
+    def schedulable_node_count(self) -> int:
+        """Ready nodes that are not cordoned; nodes being drained are cordoned first, so they do not count."""
+        return sum(
+            1 for n in self.k8s_client.get_nodes()
+            if n.status and any(c.type == "Ready" and c.status == "True" for c in n.status.conditions or [])
+            and not (n.spec and n.spec.unschedulable)
+        )
+
+    def can_drain_node(self, action: ActionRecord) -> bool:
+        """Re-checks a drain right before it runs, when other drains may have been executed since it was approved."""
+        return self._is_action_safe(action, self.schedulable_node_count())
+
+    def _is_action_safe(self, action: ActionRecord, schedulable_nodes: Optional[int] = None) -> bool:
         if action.namespace in self.critical_namespaces:
             action.error = f"Action targets a critical namespace: {action.namespace}"
             return False
@@ -32,12 +53,8 @@ class SafetyController:
              return False
 
         if action.type == OptimizationType.NODE_OPTIMIZATION:
-            nodes = self.k8s_client.get_nodes()
-            ready_nodes = [
-                n for n in nodes if n.status and any(c.type == "Ready" and c.status == "True" for c in n.status.conditions)
-            ]
-            if len(ready_nodes) <= 2:
-                action.error = "Cannot drain node from a cluster with <= 2 ready nodes."
+            if schedulable_nodes is None or schedulable_nodes <= self.MIN_SCHEDULABLE_NODES:
+                action.error = f"Cannot drain node from a cluster with <= {self.MIN_SCHEDULABLE_NODES} schedulable nodes."
                 return False
             return True
 
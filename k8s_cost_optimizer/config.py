@@ -23,18 +23,77 @@
 #     agent: AgentSettings = AgentSettings()
 
 # settings = Settings()
+import socket
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 class PrometheusSettings(BaseSettings):
     url: str = Field("http://localhost:9090", alias="PROMETHEUS_URL")
     timeout: int = 30
+    # Heavy queries are split into this many namespace shards, run with bounded concurrency.
+    query_shards: int = 8
+    query_concurrency: int = 4
 
 class KubecostSettings(BaseSettings):
     url: str = Field("http://localhost:9000", alias="KUBECOST_URL")
 
 class AgentSettings(BaseSettings):
     dry_run: bool = True
+    apply_concurrency: int = 10
+    # Server-side apply leaves fields owned by other managers (e.g. GitOps controllers) alone and reports
+    # the conflict; true takes ownership of them instead.
+    apply_force_conflicts: bool = False
+
+class CoordinationSettings(BaseSettings):
+    # Identity defaults to the pod hostname; set POD_NAME via the downward API.
+    identity: str = Field(default_factory=socket.gethostname, alias="POD_NAME")
+    lease_namespace: str = Field("optimizer-agent", alias="POD_NAMESPACE")
+    # "kubernetes" uses coordination.k8s.io Leases, "memory" is a single-process stand-in.
+    lease_backend: str = Field("memory", alias="LEASE_BACKEND")
+    lease_prefix: str = "k8s-optimizer"
+    lease_duration_seconds: int = 15
+    renew_interval_seconds: float = 5.0
+    shard_poll_interval_seconds: float = 2.0
+    hash_ring_vnodes: int = 64
+
+class ContinuousSettings(BaseSettings):
+    # Event-driven mode: watch events schedule targeted runs, with a periodic full sweep as backstop.
+    enabled: bool = Field(False, alias="CONTINUOUS_MODE")
+    debounce_seconds: float = 5.0  # quiet period after the last event before a targeted run
+    max_delay_seconds: float = 30.0  # upper bound on how long a steady event stream can defer a run
+    min_interval_seconds: float = 15.0  # rate limit between targeted runs
+    full_sweep_interval_seconds: float = 3600.0
+    tick_seconds: float = 1.0
+
+class DependencyLimits(BaseModel):
+    rate: float = 20.0  # sustained requests per second
+    burst: int = 40
+    initial_concurrency: int = 8
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    latency_target_seconds: float = 2.0  # slower calls shrink the concurrency limit
+    list_latency_target_seconds: Optional[float] = None  # for collection reads (full lists); None: latency_target_seconds
+    failure_threshold: int = 5  # consecutive errors that open the circuit
+    reset_timeout_seconds: float = 30.0  # how long an open circuit fails fast before a trial call
+    max_retries: int = 2  # retries after 429/503 responses
+
+class OutboundSettings(BaseSettings):
+    # Per-dependency limits, e.g. OUTBOUND__KUBECOST__RATE=5
+    kubernetes: DependencyLimits = DependencyLimits(rate=50.0, burst=100, initial_concurrency=16, max_concurrency=64, latency_target_seconds=1.0,
+                                                   list_latency_target_seconds=15.0)
+    prometheus: DependencyLimits = DependencyLimits(rate=10.0, burst=20, initial_concurrency=4, max_concurrency=8, latency_target_seconds=30.0)
+    kubecost: DependencyLimits = DependencyLimits(rate=5.0, burst=10, initial_concurrency=2, max_concurrency=4, latency_target_seconds=10.0)
+    llm: DependencyLimits = DependencyLimits(rate=0.5, burst=2, initial_concurrency=1, max_concurrency=2, latency_target_seconds=30.0, failure_threshold=3, reset_timeout_seconds=120.0)
+
+class StoreSettings(BaseSettings):
+    # Empty keeps runs and actions in process memory (single replica only).
+    redis_url: str = Field("", alias="REDIS_URL")
+    key_prefix: str = "k8s-optimizer"
+
+class SnapshotSettings(BaseSettings):
+    # Directory to write one input snapshot per analysis run to; empty disables recording.
+    record_dir: str = Field("", alias="SNAPSHOT_RECORD_DIR")
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -42,7 +101,7 @@ class Settings(BaseSettings):
     )
 
     api_key: str = Field("", alias="API_KEY") # Optional for local dev
-    groq_api_key: str = Field(..., alias="GROQ_API_KEY")
+    groq_api_key: str = Field("", alias="GROQ_API_KEY") # Required by the agent; offline replay runs without it
     groq_model_name: str = Field("openai/gpt-oss-20b", alias="GROQ_MODEL_NAME")
     
     log_level: str = "INFO"
@@ -50,6 +109,11 @@ class Settings(BaseSettings):
     prometheus: PrometheusSettings = PrometheusSettings()
     kubecost: KubecostSettings = KubecostSettings()
     agent: AgentSettings = AgentSettings()
+    coordination: CoordinationSettings = CoordinationSettings()
+    continuous: ContinuousSettings = ContinuousSettings()
+    outbound: OutboundSettings = OutboundSettings()
+    store: StoreSettings = StoreSettings()
+    snapshot: SnapshotSettings = SnapshotSettings()
 
 settings = Settings()
 
@@ -1,18 +1,33 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException, status
+import asyncio
+import time
+import uuid
+from fastapi import Body, FastAPI, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 from k8s_cost_optimizer.config import settings
 from k8s_cost_optimizer.utils.logger import setup_logging, logger
+from k8s_cost_optimizer.utils.state_store import StateStore, build_state_store
+from k8s_cost_optimizer.utils.export import (
+    ExportDataset, ExportFilter, ExportFormat, columns_for, csv_lines, iter_rows, ndjson_lines
+)
+from k8s_cost_optimizer.utils.rollups import DEFAULT_WINDOWS, RollupQuery, aggregate, parse_window
 from k8s_cost_optimizer.agents.orchestrator import AICostOptimizationOrchestrator
+from k8s_cost_optimizer.agents.coordinator import ClusterCoordinator, build_lease_backend, merge_shard_reports
+from k8s_cost_optimizer.agents.continuous import ContinuousOptimizer
+from k8s_cost_optimizer.models.action_record import ActionRecord, to_models
 from k8s_cost_optimizer.models.schemas import (
     OptimizationRequest,
     OptimizationRun,
     OptimizationScheduledResponse,
     RunStatus,
     OptimizationAction,
-    ActionStatus
+    OptimizationType,
+    ActionStatus,
+    AnalysisScope,
+    BulkActionRequest
 )
 
 setup_logging(settings.log_level)
@@ -27,19 +42,16 @@ app.add_middleware(
 )
 
 orchestrator: AICostOptimizationOrchestrator
+coordinator: Optional[ClusterCoordinator] = None
+continuous: Optional[ContinuousOptimizer] = None
 
-class AppState:
-    def __init__(self):
-        self.runs: Dict[str, OptimizationRun] = {}
-        self.pending_actions: Dict[str, OptimizationAction] = {}
-        self.activity_log: List[OptimizationAction] = []
-        self.stats = {"total_savings": 0.0, "actions_executed": 0}
-
-STATE = AppState()
+# Runs, actions and stats live in a store shared by all replicas (Redis), or in memory for a single one.
+STATE: StateStore = build_state_store(settings.store.redis_url, settings.store.key_prefix)
+_shard_work_available = asyncio.Event()
 
 @app.on_event("startup")
 async def startup_event():
-    global orchestrator
+    global orchestrator, coordinator, continuous
     logger.info("Application starting up...")
     try:
         orchestrator = AICostOptimizationOrchestrator(settings)
@@ -47,106 +59,289 @@ async def startup_event():
     except Exception as e:
         logger.error("Fatal: Failed to initialize orchestrator", error=str(e), exc_info=True)
         orchestrator = None
+        return
 
-async def execute_autonomous_action(action: OptimizationAction):
-    success, message = await orchestrator.execute_single_action(action)
-    action.executed_at = datetime.utcnow()
+    coordinator = ClusterCoordinator(
+        settings.coordination,
+        build_lease_backend(settings.coordination),
+        orchestrator.k8s_client,
+    )
+    await asyncio.to_thread(coordinator.heartbeat)
+    asyncio.create_task(coordination_loop())
+    asyncio.create_task(shard_worker_loop())
+
+    if settings.continuous.enabled:
+        continuous = ContinuousOptimizer(settings.continuous, orchestrator.k8s_client, orchestrator.volume_index)
+        await asyncio.to_thread(continuous.start)
+        asyncio.create_task(continuous_loop())
+
+async def coordination_loop():
+    while True:
+        await asyncio.sleep(settings.coordination.renew_interval_seconds)
+        try:
+            await asyncio.to_thread(coordinator.heartbeat)
+        except Exception as e:
+            logger.error("Coordination heartbeat failed", error=str(e))
+
+async def shard_worker_loop():
+    """Picks up this replica's shards (and orphaned or abandoned ones, when leader) of every active run."""
+    while True:
+        try:
+            await asyncio.wait_for(_shard_work_available.wait(), timeout=settings.coordination.shard_poll_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _shard_work_available.clear()
+        try:
+            for run in await asyncio.to_thread(STATE.list_active_runs):
+                for shard, owner in coordinator.claimable_shards(run):
+                    if await asyncio.to_thread(STATE.claim_shard, run.run_id, shard, coordinator.identity, expected_owner=owner):
+                        if owner is not None:
+                            logger.warning("Re-claimed shard of a departed replica", run_id=run.run_id, shard=shard, owner=owner)
+                        await execute_analysis_shard(run, shard)
+        except Exception as e:
+            logger.error("Shard worker iteration failed", error=str(e), exc_info=True)
+
+async def continuous_loop():
+    """Schedules targeted runs for batched watch events, and periodic full sweeps. Every replica
+    watches, but only the leader schedules, so each event leads to one run cluster-wide."""
+    while True:
+        await asyncio.sleep(settings.continuous.tick_seconds)
+        due = continuous.poll()
+        if due is None or not coordinator.is_leader:
+            continue
+        trigger, scope = due
+        run_id = await schedule_run(settings.agent.dry_run, trigger, scope)
+        logger.info("Scheduled continuous optimization run", run_id=run_id, trigger=trigger,
+                    namespaces=sorted(scope.namespaces) if scope else None,
+                    action_types=sorted(t.value for t in scope.action_types) if scope else None)
+
+async def schedule_run(dry_run: bool, trigger: str = "manual", scope: Optional[AnalysisScope] = None) -> str:
+    run_id = f"run_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:4]}"
+    await asyncio.to_thread(STATE.create_run, OptimizationRun(
+        run_id=run_id, status=RunStatus.PENDING, dry_run=dry_run,
+        shards=coordinator.plan_shards(), trigger=trigger, scope=scope,
+    ))
+    _shard_work_available.set()
+    return run_id
+
+def record_execution_result(action: ActionRecord, success: bool, message: str):
+    """Blocking store writes; call it through `asyncio.to_thread`."""
+    action.executed_at = time.time()
     if success:
         action.status = ActionStatus.EXECUTED
-        STATE.stats["total_savings"] += action.estimated_savings
-        STATE.stats["actions_executed"] += 1
+        STATE.record_execution(action.estimated_savings)
     else:
         action.status = ActionStatus.FAILED
         action.error = message
-    STATE.activity_log.insert(0, action) # Prepend to show newest first
+    STATE.record_activity(action)
 
-def execute_analysis_run(run_id: str, dry_run: bool, background_tasks: BackgroundTasks):
-    STATE.runs[run_id].status = RunStatus.RUNNING
+async def execute_autonomous_action(action: ActionRecord):
+    success, message = await orchestrator.execute_single_action(action)
+    await asyncio.to_thread(record_execution_result, action, success, message)
+
+async def execute_approved_actions(actions: List[ActionRecord]):
+    results = await orchestrator.execute_actions(actions)
+    for action, (success, message) in zip(actions, results):
+        await asyncio.to_thread(record_execution_result, action, success, message)
+
+async def execute_analysis_shard(run: OptimizationRun, shard: str):
+    log = logger.bind(run_id=run.run_id, shard=shard)
+    status, report, actions, auto_execute = RunStatus.FAILED, None, [], []
     try:
-        result = orchestrator.run_and_categorize_actions(run_id, dry_run)
-        
-        run_record = STATE.runs[run_id]
+        scope = await asyncio.to_thread(coordinator.scope_for, run, shard)
+        if scope.is_empty:
+            # Targeted runs leave shards that own none of the affected namespaces with nothing to do.
+            result = {"report": {}, "pending_actions": [], "auto_execute_actions": []}
+        else:
+            result = await asyncio.to_thread(orchestrator.run_and_categorize_actions, run.run_id, run.dry_run, scope)
+
         if "error" in result:
-            run_record.status = RunStatus.FAILED
-            run_record.detail = result["error"]
+            report = {"error": result["error"]}
         else:
-            run_record.status = RunStatus.COMPLETED
-            run_record.report = result["report"]
-            # --- Store all generated actions with the run ---
-            run_record.actions = result.get("pending_actions", []) + result.get("auto_execute_actions", [])
-            
-            for action in result["pending_actions"]:
-                STATE.pending_actions[action.id] = action
-            
-            for action in result["auto_execute_actions"]:
-                background_tasks.add_task(execute_autonomous_action, action)
-            
-            logger.info(f"Analysis {run_id} complete. Queued {len(result['pending_actions'])} actions for HITL and {len(result['auto_execute_actions'])} for auto-execution.")
+            status = RunStatus.COMPLETED
+            report = result["report"] or {}
+            auto_execute = result["auto_execute_actions"]
+            # Overlapping runs (events, sweeps, manual) rediscover the same opportunities; queue each once,
+            # and keep only what was actually queued with the run.
+            pending = await asyncio.to_thread(STATE.queue_pending_actions, result["pending_actions"])
+            report["actions_already_queued"] = len(result["pending_actions"]) - len(pending)
+            actions = pending + auto_execute
+            await asyncio.to_thread(STATE.record_transitions, auto_execute)
+            log.info(f"Analysis shard complete. Queued {len(pending)} actions for HITL and {len(auto_execute)} for auto-execution.")
 
     except Exception as e:
-        logger.error("Unhandled exception during analysis run", run_id=run_id, error=str(e), exc_info=True)
-        STATE.runs[run_id].status = RunStatus.FAILED
-        STATE.runs[run_id].detail = "An internal error occurred."
+        log.error("Unhandled exception during analysis run", error=str(e), exc_info=True)
+        report = {"error": "An internal error occurred."}
+
+    shard_reports = await asyncio.to_thread(
+        STATE.complete_shard, run.run_id, shard, coordinator.identity, status, report, actions)
+    if shard_reports is not None:
+        errors = [r["error"] for r in shard_reports.values() if r.get("error")]
+        await asyncio.to_thread(
+            STATE.finalize_run,
+            run.run_id,
+            RunStatus.FAILED if errors else RunStatus.COMPLETED,
+            merge_shard_reports(shard_reports),
+            "; ".join(errors) or None,
+        )
+
+    if auto_execute:
+        asyncio.create_task(execute_approved_actions(auto_execute))
+
+def with_actions(run: OptimizationRun) -> OptimizationRun:
+    """API view of a run, with its action records converted to response models. Reads the store."""
+    return run.model_copy(update={"actions": to_models(STATE.list_run_actions(run.run_id))})
 
 @app.post("/optimize", status_code=status.HTTP_202_ACCEPTED, response_model=OptimizationScheduledResponse)
-async def schedule_optimization(request: OptimizationRequest, background_tasks: BackgroundTasks):
+async def schedule_optimization(request: OptimizationRequest):
     if not orchestrator:
         raise HTTPException(status_code=503, detail="Orchestrator is not available.")
     
-    run_id = f"run_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
     dry_run = request.dry_run if request.dry_run is not None else settings.agent.dry_run
-    
-    STATE.runs[run_id] = OptimizationRun(run_id=run_id, status=RunStatus.PENDING)
-    background_tasks.add_task(execute_analysis_run, run_id, dry_run, background_tasks)
+    run_id = await schedule_run(dry_run)
     
     return OptimizationScheduledResponse(run_id=run_id, status=RunStatus.PENDING, detail="Optimization analysis run has been scheduled.")
 
+@app.post("/continuous/alerts", status_code=status.HTTP_202_ACCEPTED, response_model=Dict)
+async def receive_alerts(payload: Dict[str, Any] = Body(...)):
+    """Alertmanager webhook receiver; firing alerts become continuous-mode triggers."""
+    if not continuous:
+        raise HTTPException(status_code=503, detail="Continuous mode is not enabled.")
+    return {"accepted": continuous.handle_alerts(payload.get("alerts", []))}
+
 @app.post("/actions/{action_id}/approve", response_model=OptimizationAction)
 async def approve_action(action_id: str):
-    if action_id not in STATE.pending_actions:
+    action = await asyncio.to_thread(STATE.pop_pending_action, action_id)
+    if action is None:
         raise HTTPException(status_code=404, detail="Pending action not found.")
-    action = STATE.pending_actions.pop(action_id)
     await execute_autonomous_action(action)
-    return action
+    return action.to_model()
+
+@app.post("/actions/approve", response_model=List[OptimizationAction])
+async def approve_actions(request: BulkActionRequest):
+    """Approves many pending actions at once so they can be executed as a batch."""
+    popped = await asyncio.to_thread(lambda: [STATE.pop_pending_action(i) for i in request.action_ids])
+    actions = [a for a in popped if a is not None]
+    if not actions:
+        raise HTTPException(status_code=404, detail="No pending actions found.")
+    await execute_approved_actions(actions)
+    return to_models(actions)
 
 @app.post("/actions/{action_id}/reject", response_model=OptimizationAction)
 async def reject_action(action_id: str):
-    if action_id not in STATE.pending_actions:
+    action = await asyncio.to_thread(STATE.pop_pending_action, action_id)
+    if action is None:
         raise HTTPException(status_code=404, detail="Pending action not found.")
-    action = STATE.pending_actions.pop(action_id)
     action.status = ActionStatus.REJECTED
-    action.executed_at = datetime.utcnow()
-    STATE.activity_log.insert(0, action)
+    action.executed_at = time.time()
+    await asyncio.to_thread(STATE.record_activity, action)
     logger.info("Action rejected by user", action_id=action_id)
-    return action
+    return action.to_model()
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok" if orchestrator else "degraded"}
+    if not orchestrator:
+        return {"status": "degraded"}
+    open_circuits = orchestrator.outbound.open_circuits()
+    return {"status": "degraded" if open_circuits else "ok", "open_circuits": open_circuits}
+
+@app.get("/health/dependencies", response_model=Dict)
+async def get_dependency_health():
+    """Rate limiter, concurrency limit and circuit state of every outbound dependency."""
+    if not orchestrator:
+        raise HTTPException(status_code=503, detail="Orchestrator is not available.")
+    return orchestrator.outbound.snapshot()
+
+@app.get("/cluster/members", response_model=Dict)
+async def get_cluster_members():
+    if not coordinator:
+        raise HTTPException(status_code=503, detail="Coordinator is not available.")
+    return {
+        "identity": coordinator.identity,
+        "isLeader": coordinator.is_leader,
+        "members": coordinator.live_members(),
+    }
 
 @app.get("/dashboard/stats", response_model=Dict)
 async def get_dashboard_stats():
+    stats = await asyncio.to_thread(STATE.get_stats)
+    return {
+        "totalSavings": stats["total_savings"],
+        "actionsExecuted": stats["actions_executed"],
+        "pendingActions": await asyncio.to_thread(STATE.count_pending_actions)
+    }
+
+@app.get("/stats/savings", response_model=Dict)
+async def get_savings_rollups(
+    granularity: str = "day",
+    window: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    group_by: str = "",
+    type: Optional[OptimizationType] = None,
+    namespace: Optional[str] = None,
+    status_filter: Optional[ActionStatus] = Query(None, alias="status"),
+):
+    """Estimated/realized savings and action counts from the pre-aggregated rollups.
+
+    The window is `since`..`until` (default: now), or `window` (e.g. 24h, 7d) back from `until`;
+    `group_by` is a comma-separated subset of bucket, type, namespace, status.
+    """
+    try:
+        until = until or datetime.utcnow()
+        since = since or until - (parse_window(window) if window else DEFAULT_WINDOWS.get(granularity, DEFAULT_WINDOWS["day"]))
+        query = RollupQuery(
+            granularity=granularity, since=since, until=until,
+            group_by=[g.strip() for g in group_by.split(",") if g.strip()],
+            type=type, namespace=namespace, status=status_filter,
+        )
+        buckets = query.buckets()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
-        "totalSavings": STATE.stats["total_savings"],
-        "actionsExecuted": STATE.stats["actions_executed"],
-        "pendingActions": len(STATE.pending_actions)
+        "granularity": granularity,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "group_by": query.group_by,
+        "rows": aggregate(await asyncio.to_thread(STATE.get_rollups, granularity, buckets), query),
     }
 
 @app.get("/actions/pending", response_model=List[OptimizationAction])
 async def get_pending_actions():
-    return list(STATE.pending_actions.values())
+    return to_models(await asyncio.to_thread(STATE.list_pending_actions))
 
 @app.get("/activities", response_model=List[OptimizationAction])
 async def get_activity_log():
-    return STATE.activity_log[:20]
+    return to_models(await asyncio.to_thread(STATE.list_activity, 20))
 
 @app.get("/runs", response_model=List[OptimizationRun])
 async def get_all_runs():
-    return sorted(list(STATE.runs.values()), key=lambda r: r.run_id, reverse=True)
+    return await asyncio.to_thread(lambda: [with_actions(run) for run in STATE.list_runs()])
 
 @app.get("/runs/{run_id}", response_model=OptimizationRun)
 async def get_run_details(run_id: str):
-    if run_id not in STATE.runs:
+    run = await asyncio.to_thread(STATE.get_run, run_id)
+    if run is None:
         raise HTTPException(status_code=404, detail="Run not found.")
-    return STATE.runs[run_id]
+    return await asyncio.to_thread(with_actions, run)
 
+
+@app.get("/export/{dataset}")
+def export_dataset(
+    dataset: ExportDataset,
+    format: ExportFormat = ExportFormat.NDJSON,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    type: Optional[OptimizationType] = None,
+    namespace: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+):
+    # A plain generator: Starlette iterates it in the threadpool, so blocking store reads are fine.
+    filters = ExportFilter(since=since, until=until, type=type, namespace=namespace, status=status_filter)
+    rows = iter_rows(STATE, dataset, filters)
+    filename = f"{dataset.value}.{format.value}"
+    if format == ExportFormat.CSV:
+        body, media_type = csv_lines(rows, columns_for(dataset)), "text/csv"
+    else:
+        body, media_type = ndjson_lines(rows), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
\ No newline at end of file
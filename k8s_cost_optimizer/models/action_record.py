@@ -0,0 +1,166 @@
+import itertools
+import secrets
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from .schemas import ActionStatus, OptimizationAction, OptimizationType
+
+# --- typed details payloads, one per action type ---
+class PodCleanupDetails(NamedTuple):
+    operation = "delete_pod"
+    phase: str
+    uid: Optional[str]
+    finished_at: str
+
+class PVCCleanupDetails(NamedTuple):
+    operation = "delete_pvc"
+    phase: str
+    reason: str
+    storage_class: Optional[str]
+    volume_name: Optional[str]
+    provisioned_bytes: int
+
+class RightsizingDetails(NamedTuple):
+    operation = "patch_workload_resources"
+    container: str
+    current_requests: Dict[str, Any]
+    recommended_requests: Dict[str, Any]
+    workload_kind: str = "Deployment"
+
+class HPADetails(NamedTuple):
+    operation = "patch_hpa"
+    recommendation: str
+    current_min: int
+    current_max: int
+    recommended_min: int
+    recommended_max: int
+    replicas_p50: float = 0.0
+    replicas_p95: float = 0.0
+    replicas_peak: int = 0
+    time_at_min: float = 0.0
+    time_at_max: float = 0.0
+    window_days: int = 0
+    replica_monthly_cost: float = 0.0
+
+class NodeDrainDetails(NamedTuple):
+    operation = "cordon_and_drain"
+    reason: str
+    cpu_utilization: float
+    memory_utilization: float
+    pods_to_move: int
+    destinations: Dict[str, int]  # destination node -> pods the simulation placed there
+    pricing: str = "default"
+
+ActionDetails = Union[PodCleanupDetails, PVCCleanupDetails, RightsizingDetails, HPADetails, NodeDrainDetails]
+
+DETAILS_TYPES = {
+    OptimizationType.POD_CLEANUP: PodCleanupDetails,
+    OptimizationType.PVC_CLEANUP: PVCCleanupDetails,
+    OptimizationType.RIGHTSIZING: RightsizingDetails,
+    OptimizationType.HPA_OPTIMIZATION: HPADetails,
+    OptimizationType.NODE_OPTIMIZATION: NodeDrainDetails,
+}
+
+# Ids only need to be unique across replicas and restarts: a random per-process prefix plus a counter.
+_ID_PREFIX = secrets.token_hex(3)
+_id_counter = itertools.count(1)
+
+def _new_id() -> str:
+    return f"action_{_ID_PREFIX}{next(_id_counter):x}"
+
+def _timestamp(value: Union[None, float, str, datetime]) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value if value is None else float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+def _datetime(value: Optional[float]) -> Optional[datetime]:
+    return None if value is None else datetime.utcfromtimestamp(value)
+
+class ActionRecord:
+    """Compact internal form of an action, used from the tools through the store.
+
+    Slotted, with interned namespace/target strings, epoch timestamps and a typed details tuple;
+    `to_model()` builds the pydantic `OptimizationAction` only when an API response is serialized.
+    """
+
+    __slots__ = (
+        "id", "type", "target", "namespace", "details", "estimated_savings",
+        "confidence", "status", "created_at", "executed_at", "error",
+    )
+
+    def __init__(
+        self,
+        type: OptimizationType,
+        target: str,
+        namespace: str,
+        details: ActionDetails,
+        confidence: float,
+        estimated_savings: float = 0.0,
+        id: Optional[str] = None,
+        status: ActionStatus = ActionStatus.PENDING,
+        created_at: Optional[float] = None,
+        executed_at: Optional[float] = None,
+        error: Optional[str] = None,
+    ):
+        self.id = id or _new_id()
+        self.type = type
+        self.target = sys.intern(target)
+        self.namespace = sys.intern(namespace)
+        self.details = details
+        self.estimated_savings = float(estimated_savings)
+        self.confidence = confidence
+        self.status = status
+        self.created_at = time.time() if created_at is None else created_at
+        self.executed_at = executed_at
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"ActionRecord({self.id}, {self.type.value}, {self.namespace}/{self.target}, {self.status.value})"
+
+    def details_dict(self) -> Dict[str, Any]:
+        return {"operation": self.details.operation, **self.details._asdict()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict in the `OptimizationAction` shape; also the shared-store format."""
+        return {
+            "id": self.id,
+            "type": self.type.value,
+            "target": self.target,
+            "namespace": self.namespace,
+            "action_details": self.details_dict(),
+            "estimated_savings": self.estimated_savings,
+            "confidence": self.confidence,
+            "status": self.status.value,
+            "created_at": _datetime(self.created_at).isoformat(),
+            "executed_at": _datetime(self.executed_at).isoformat() if self.executed_at is not None else None,
+            "error": self.error,
+        }
+
+    def to_model(self) -> OptimizationAction:
+        return OptimizationAction(
+            id=self.id, type=self.type, target=self.target, namespace=self.namespace,
+            action_details=self.details_dict(), estimated_savings=self.estimated_savings,
+            confidence=self.confidence, status=self.status, created_at=_datetime(self.created_at),
+            executed_at=_datetime(self.executed_at), error=self.error,
+        )
+
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> "ActionRecord":
+        action_type = OptimizationType(doc["type"])
+        details_type = DETAILS_TYPES[action_type]
+        raw = doc.get("action_details") or {}
+        details = details_type(**{f: raw[f] for f in details_type._fields if f in raw})
+        return cls(
+            type=action_type, target=doc["target"], namespace=doc["namespace"], details=details,
+            confidence=doc["confidence"], estimated_savings=doc.get("estimated_savings", 0.0),
+            id=doc["id"], status=ActionStatus(doc.get("status", ActionStatus.PENDING)),
+            created_at=_timestamp(doc.get("created_at")), executed_at=_timestamp(doc.get("executed_at")),
+            error=doc.get("error"),
+        )
+
+def to_models(records: List[ActionRecord]) -> List[OptimizationAction]:
+    return [record.to_model() for record in records]
\ No newline at end of file
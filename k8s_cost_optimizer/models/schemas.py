@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -28,6 +28,10 @@ class RunStatus(str, Enum):
 class OptimizationRequest(BaseModel):
     dry_run: Optional[bool] = None
 
+# Request body for approving several pending actions in one call
+class BulkActionRequest(BaseModel):
+    action_ids: List[str]
+
 # --- THIS IS THE MISSING CLASS ---
 # This class defines the response when an optimization run is first scheduled
 class OptimizationScheduledResponse(BaseModel):
@@ -56,10 +60,37 @@ class ClusterState(BaseModel):
     cost_metrics: Dict[str, float]
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+class AnalysisScope(BaseModel):
+    """The slice of the cluster a single analysis pass is responsible for."""
+    namespaces: Optional[Set[str]] = None  # None means every namespace
+    cluster_scoped: bool = True  # node-level work is only done by one replica
+    action_types: Optional[Set[OptimizationType]] = None  # None runs every tool; event-triggered runs narrow it
+
+    def includes(self, namespace: str) -> bool:
+        return self.namespaces is None or namespace in self.namespaces
+
+    def runs(self, action_type: OptimizationType) -> bool:
+        return self.action_types is None or action_type in self.action_types
+
+    @property
+    def is_empty(self) -> bool:
+        return self.namespaces == set() and not self.cluster_scoped
+
+class ShardClaim(BaseModel):
+    owner: str
+    claimed_at: datetime = Field(default_factory=datetime.utcnow)
+
 class OptimizationRun(BaseModel):
     run_id: str
     status: RunStatus
+    dry_run: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     report: Optional[Dict[str, Any]] = None
     detail: Optional[str] = None
     actions: List[OptimizationAction] = []
+    # Shard id -> status; a run completes once every shard planned at schedule time has reported.
+    shards: Dict[str, RunStatus] = {}
+    claims: Dict[str, ShardClaim] = {}  # shard id -> replica working on it
+    trigger: str = "manual"  # "manual", "event" or "sweep"
+    scope: Optional[AnalysisScope] = None  # targeted runs only; None analyzes the whole cluster
 
@@ -0,0 +1,122 @@
+"""Offline replay of recorded analysis snapshots.
+
+    python -m k8s_cost_optimizer.replay snapshots/ --set HPAOptimizerTool.MIN_TIME_AT_MIN=0.3
+
+Runs the full analysis workflow against each snapshot (files, or directories of *.snap files) with no
+network access, and prints one JSON line per snapshot with the resulting actions summarized. `--set`
+overrides a tool attribute for the replay, so threshold variations can be swept over many snapshots;
+values take the type of the attribute they replace (durations as 90s, 30m, 36h or 2d).
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from k8s_cost_optimizer.config import settings
+from k8s_cost_optimizer.utils.logger import setup_logging
+from k8s_cost_optimizer.agents.orchestrator import AICostOptimizationOrchestrator
+
+def _snapshot_paths(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, "*.snap")))
+        else:
+            yield path
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhd]?)$")
+_DURATION_UNITS = {"": "seconds", "s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+def _parse_override(text: str) -> Tuple[str, str, str]:
+    target, _, raw = text.partition("=")
+    tool, _, attribute = target.partition(".")
+    if not tool or not attribute or not raw:
+        raise argparse.ArgumentTypeError(f"expected Tool.ATTRIBUTE=value, got {text!r}")
+    return tool, attribute, raw
+
+def coerce(raw: str, current: Any) -> Any:
+    """Parses an override into the type of the value it replaces."""
+    if isinstance(current, timedelta):
+        match = _DURATION.match(raw.strip())
+        if not match:
+            raise ValueError(f"invalid duration {raw!r}; expected e.g. 90s, 30m, 36h or 2d")
+        return timedelta(**{_DURATION_UNITS[match.group(2)]: float(match.group(1))})
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    if isinstance(current, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"expected true or false, got {raw!r}")
+        return value
+    if isinstance(current, (int, float)) and not isinstance(value, bool) and isinstance(value, (int, float)):
+        if isinstance(current, int) and not float(value).is_integer():
+            raise ValueError(f"expected an integer, got {raw!r}")
+        return type(current)(value)
+    if current is not None and not isinstance(value, type(current)):
+        raise ValueError(f"expected a {type(current).__name__}, got {raw!r}")
+    return value
+
+def apply_overrides(tools: List[Any], overrides: List[Tuple[str, str, str]]) -> None:
+    for tool_name, attribute, raw in overrides:
+        matched = [tool for tool in tools if type(tool).__name__ == tool_name]
+        if not matched:
+            raise ValueError(f"no tool named {tool_name}")
+        for tool in matched:
+            if not hasattr(tool, attribute):
+                raise ValueError(f"{tool_name} has no attribute {attribute}")
+            try:
+                setattr(tool, attribute, coerce(raw, getattr(tool, attribute)))
+            except ValueError as e:
+                raise ValueError(f"{tool_name}.{attribute}: {e}")
+
+def replay(path: str, overrides: List[Tuple[str, str, str]], include_actions: bool) -> Dict[str, Any]:
+    started = time.perf_counter()
+    orchestrator = AICostOptimizationOrchestrator.from_snapshot(settings, path)
+    apply_overrides(orchestrator.tools, overrides)
+
+    snapshot = orchestrator.snapshot
+    result = orchestrator.run_and_categorize_actions(f"replay-{snapshot.run_id}", True, snapshot.scope)
+    if "error" in result:
+        return {"snapshot": path, "run_id": snapshot.run_id, "error": result["error"]}
+    actions = result["pending_actions"] + result["auto_execute_actions"]
+    summary = {
+        "snapshot": path,
+        "run_id": snapshot.run_id,
+        "captured_at": snapshot.captured_at.isoformat(),
+        "actions": len(actions),
+        "by_type": dict(Counter(a.type.value for a in actions)),
+        "estimated_savings": round(sum(a.estimated_savings for a in actions), 2),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if include_actions:
+        summary["action_details"] = [a.to_dict() for a in actions]
+    return summary
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded analysis snapshots offline.")
+    parser.add_argument("paths", nargs="+", help="snapshot files or directories containing *.snap files")
+    parser.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                        metavar="Tool.ATTRIBUTE=value", help="override a tool attribute for the replay")
+    parser.add_argument("--actions", action="store_true", help="include every generated action in the output")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    failed = 0
+    for path in _snapshot_paths(args.paths):
+        try:
+            summary = replay(path, args.overrides, args.actions)
+        except (OSError, ValueError) as e:
+            summary = {"snapshot": path, "error": str(e)}
+        failed += "error" in summary
+        print(json.dumps(summary, default=str), flush=True)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
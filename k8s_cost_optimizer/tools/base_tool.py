@@ -1,10 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import List
-from k8s_cost_optimizer.models.schemas import OptimizationAction
+from datetime import datetime, timezone
+from typing import Callable, FrozenSet, List, Optional
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord
+from k8s_cost_optimizer.utils.cost_index import CostIndex
 from k8s_cost_optimizer.utils.k8s_client import KubernetesClient
 from k8s_cost_optimizer.utils.prometheus import PrometheusClient
 
 class BaseOptimizationTool(ABC):
+    # The type of action the tool produces; targeted runs only invoke the tools they need.
+    action_type: OptimizationType
+    # Kubecost datasets ("allocations", "assets") the tool prices with; a run only fetches what its tools use.
+    cost_data: FrozenSet[str] = frozenset({"allocations", "assets"})
+    # Source of "now" for time-relative analysis; snapshot replays pin it to the capture time.
+    clock: Callable[[], datetime] = staticmethod(lambda: datetime.now(timezone.utc))
+
     def __init__(
         self,
         k8s_client: KubernetesClient,
@@ -14,5 +24,7 @@ class BaseOptimizationTool(ABC):
         self.prometheus_client = prometheus_client
 
     @abstractmethod
-    def analyze(self) -> List[OptimizationAction]:
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
+        """Returns candidate actions for the objects in `scope` (the whole cluster when None),
+        with savings priced against the run's `costs` (default unit prices when None)."""
         pass
\ No newline at end of file
@@ -0,0 +1,277 @@
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from k8s_cost_optimizer.utils.cost_index import HOURS_PER_MONTH
+from k8s_cost_optimizer.utils.quantity import quantity as _quantity
+
+SCHEDULING_TAINT_EFFECTS = ("NoSchedule", "NoExecute")
+# Weighs memory against CPU when ordering pods largest-first (one core ~ 4GiB).
+BYTES_PER_CORE = 4 * 1024 ** 3
+
+def pod_requests(pod: Any) -> Tuple[float, float]:
+    """Effective scheduling request (cores, bytes): max(sum of containers, largest init container) + overhead."""
+    def _sum(containers) -> Tuple[float, float]:
+        cpu = mem = 0.0
+        for c in containers or []:
+            requests = (c.resources and c.resources.requests) or {}
+            cpu += _quantity(requests.get("cpu", "0"))
+            mem += _quantity(requests.get("memory", "0"))
+        return cpu, mem
+
+    cpu, mem = _sum(pod.spec.containers)
+    for init in pod.spec.init_containers or []:
+        init_cpu, init_mem = _sum([init])
+        cpu, mem = max(cpu, init_cpu), max(mem, init_mem)
+    for key, value in (pod.spec.overhead or {}).items():
+        if key == "cpu":
+            cpu += _quantity(value)
+        elif key == "memory":
+            mem += _quantity(value)
+    return cpu, mem
+
+# A pod's placement constraints, reduced to hashable form so that pods sharing constraints share a node mask.
+# tolerations: (key, operator, value, effect); selector: (key, value); terms: OR of AND of (key, op, values)
+ConstraintSignature = Tuple[FrozenSet[Tuple], Tuple[Tuple[str, str], ...], Tuple[Tuple[Tuple[str, str, Tuple[str, ...]], ...], ...]]
+
+class _Pod:
+    __slots__ = ("namespace", "name", "cpu", "mem", "signature")
+
+    def __init__(self, namespace: str, name: str, cpu: float, mem: float, signature: ConstraintSignature):
+        self.namespace = namespace
+        self.name = name
+        self.cpu = cpu
+        self.mem = mem
+        self.signature = signature
+
+class NodeDrain(BaseModel):
+    node: str
+    monthly_cost: float
+    cpu_utilization: float
+    memory_utilization: float
+    pods_to_move: int
+    # Destination node -> number of pods the simulation placed there.
+    destinations: Dict[str, int]
+
+class ConsolidationPlanner:
+    """Simulates removing underutilized nodes by re-packing their pods onto the rest of the cluster.
+
+    Pods are modelled by CPU/memory requests, tolerations, nodeSelector and required node affinity.
+    Candidate nodes are tried from least to most utilized; each candidate's pods are placed
+    best-fit-decreasing onto the remaining nodes with vectorized capacity/compatibility masks,
+    and the drain is committed only if every pod fits. Drains build on each other: a candidate
+    that received pods from an earlier drain is re-checked against its utilization after them.
+    Nodes hosting pods that would not be recreated elsewhere (bare pods, protected namespaces,
+    required pod affinity or anti-affinity, unsupported affinity operators) are never drained.
+    """
+
+    SUPPORTED_OPERATORS = ("In", "NotIn", "Exists", "DoesNotExist")
+
+    def __init__(self, protected_namespaces: Sequence[str] = ("kube-system", "opencost"), max_utilization: float = 0.5):
+        self.protected_namespaces = set(protected_namespaces)
+        self.max_utilization = max_utilization
+
+    def plan(self, nodes: List[Any], pods: List[Any], hourly_prices: Dict[str, float]) -> List[NodeDrain]:
+        n = len(nodes)
+        if n < 2:
+            return []
+        names = [node.metadata.name for node in nodes]
+        index = {name: i for i, name in enumerate(names)}
+        self._labels = [node.metadata.labels or {} for node in nodes]
+        self._mask_cache: Dict[Any, np.ndarray] = {}
+
+        alloc_cpu = np.zeros(n)
+        alloc_mem = np.zeros(n)
+        schedulable = np.zeros(n, dtype=bool)
+        taint_classes: Dict[Tuple, List[int]] = {}
+        for i, node in enumerate(nodes):
+            allocatable = (node.status and node.status.allocatable) or {}
+            alloc_cpu[i] = _quantity(allocatable.get("cpu", "0"))
+            alloc_mem[i] = _quantity(allocatable.get("memory", "0"))
+            ready = any(c.type == "Ready" and c.status == "True" for c in (node.status.conditions or []))
+            schedulable[i] = ready and not node.spec.unschedulable
+            taints = tuple(sorted(
+                (t.key, t.value or "", t.effect) for t in (node.spec.taints or [])
+                if t.effect in SCHEDULING_TAINT_EFFECTS
+            ))
+            taint_classes.setdefault(taints, []).append(i)
+        self._taint_classes = {k: np.array(v) for k, v in taint_classes.items()}
+
+        used_cpu = np.zeros(n)
+        used_mem = np.zeros(n)
+        movable: List[List[_Pod]] = [[] for _ in range(n)]
+        blocked = ~schedulable
+        for pod in pods:
+            i = index.get(pod.spec.node_name)
+            if i is None or pod.status.phase in ("Succeeded", "Failed"):
+                continue
+            cpu, mem = pod_requests(pod)
+            used_cpu[i] += cpu
+            used_mem[i] += mem
+            if self._is_node_bound(pod):
+                continue  # DaemonSet and static pods leave with the node
+            signature = self._signature(pod)
+            if signature is None or not self._is_evictable(pod):
+                blocked[i] = True
+                continue
+            movable[i].append(_Pod(pod.metadata.namespace, pod.metadata.name, cpu, mem, signature))
+
+        safe_cpu = np.where(alloc_cpu > 0, alloc_cpu, 1.0)
+        safe_mem = np.where(alloc_mem > 0, alloc_mem, 1.0)
+        cpu_util = used_cpu / safe_cpu
+        mem_util = used_mem / safe_mem
+        prices = np.array([hourly_prices.get(name, 0.0) for name in names])
+
+        candidates = np.flatnonzero(~blocked & (np.maximum(cpu_util, mem_util) < self.max_utilization))
+        # Emptiest first; among equally empty nodes, remove the most expensive first.
+        order = np.lexsort((-prices[candidates], np.maximum(cpu_util, mem_util)[candidates]))
+
+        free_cpu = alloc_cpu - used_cpu
+        free_mem = alloc_mem - used_mem
+        alive = schedulable.copy()
+        drains: List[NodeDrain] = []
+
+        for c in candidates[order]:
+            cpu_now = (alloc_cpu[c] - free_cpu[c]) / safe_cpu[c]
+            mem_now = (alloc_mem[c] - free_mem[c]) / safe_mem[c]
+            if max(cpu_now, mem_now) >= self.max_utilization:
+                continue  # filled up by earlier drains in this plan
+            receivers = alive.copy()
+            receivers[c] = False
+            placement = self._pack(movable[c], receivers, free_cpu, free_mem, safe_cpu, safe_mem)
+            if placement is None:
+                continue
+
+            alive[c] = False
+            destinations: Dict[str, int] = {}
+            for pod, dest in placement:
+                free_cpu[dest] -= pod.cpu
+                free_mem[dest] -= pod.mem
+                movable[dest].append(pod)  # the destination may itself be drained later
+                destinations[names[dest]] = destinations.get(names[dest], 0) + 1
+            drains.append(NodeDrain(
+                node=names[c],
+                monthly_cost=round(float(prices[c]) * HOURS_PER_MONTH, 2),
+                cpu_utilization=round(float(cpu_now), 3),
+                memory_utilization=round(float(mem_now), 3),
+                pods_to_move=len(placement),
+                destinations=destinations,
+            ))
+        return drains
+
+    def _pack(self, pods: List[_Pod], receivers: np.ndarray, free_cpu: np.ndarray, free_mem: np.ndarray,
+              alloc_cpu: np.ndarray, alloc_mem: np.ndarray) -> Optional[List[Tuple[_Pod, int]]]:
+        """Best-fit-decreasing placement of `pods` onto `receivers`; None if any pod does not fit."""
+        if not receivers.any():
+            return None
+        trial_cpu = free_cpu.copy()
+        trial_mem = free_mem.copy()
+        placement = []
+        for pod in sorted(pods, key=lambda p: max(p.cpu, p.mem / BYTES_PER_CORE), reverse=True):
+            fits = receivers & self._compatible(pod.signature) & (trial_cpu >= pod.cpu) & (trial_mem >= pod.mem)
+            if not fits.any():
+                return None
+            slack = (trial_cpu - pod.cpu) / alloc_cpu + (trial_mem - pod.mem) / alloc_mem
+            dest = int(np.argmin(np.where(fits, slack, np.inf)))
+            trial_cpu[dest] -= pod.cpu
+            trial_mem[dest] -= pod.mem
+            placement.append((pod, dest))
+        return placement
+
+    def _is_node_bound(self, pod: Any) -> bool:
+        annotations = pod.metadata.annotations or {}
+        if "kubernetes.io/config.mirror" in annotations:
+            return True
+        return any(o.kind == "DaemonSet" for o in (pod.metadata.owner_references or []))
+
+    def _is_evictable(self, pod: Any) -> bool:
+        if pod.metadata.namespace in self.protected_namespaces:
+            return False  # drain_node skips these, so the node would never empty
+        if not pod.metadata.owner_references:
+            return False  # bare pods are not recreated after eviction
+        affinity = pod.spec.affinity
+        for pod_affinity in (affinity and affinity.pod_affinity, affinity and affinity.pod_anti_affinity):
+            if pod_affinity and pod_affinity.required_during_scheduling_ignored_during_execution:
+                return False  # inter-pod placement is not modelled; be conservative
+        return True
+
+    def _signature(self, pod: Any) -> Optional[ConstraintSignature]:
+        tolerations = frozenset(
+            (t.key or "", t.operator or "Equal", t.value or "", t.effect or "")
+            for t in (pod.spec.tolerations or [])
+        )
+        selector = tuple(sorted((pod.spec.node_selector or {}).items()))
+        terms = ()
+        affinity = pod.spec.affinity
+        required = affinity and affinity.node_affinity and affinity.node_affinity.required_during_scheduling_ignored_during_execution
+        if required:
+            parsed = []
+            for term in required.node_selector_terms or []:
+                expressions = []
+                for expr in term.match_expressions or []:
+                    if expr.operator not in self.SUPPORTED_OPERATORS:
+                        return None
+                    expressions.append((expr.key, expr.operator, tuple(sorted(expr.values or []))))
+                if term.match_fields:
+                    return None
+                parsed.append(tuple(sorted(expressions)))
+            terms = tuple(parsed)
+        return tolerations, selector, terms
+
+    def _compatible(self, signature: ConstraintSignature) -> np.ndarray:
+        mask = self._mask_cache.get(signature)
+        if mask is not None:
+            return mask
+        tolerations, selector, terms = signature
+        n = len(self._labels)
+
+        mask = np.zeros(n, dtype=bool)
+        for taints, idx in self._taint_classes.items():
+            if all(self._tolerates(tolerations, taint) for taint in taints):
+                mask[idx] = True
+        for key, value in selector:
+            mask &= self._label_mask(key, value)
+        if terms:
+            any_term = np.zeros(n, dtype=bool)
+            for term in terms:
+                term_mask = np.ones(n, dtype=bool)
+                for key, operator, values in term:
+                    term_mask &= self._expression_mask(key, operator, values)
+                any_term |= term_mask
+            mask &= any_term
+
+        self._mask_cache[signature] = mask
+        return mask
+
+    def _label_mask(self, key: str, value: Optional[str]) -> np.ndarray:
+        """Nodes carrying label `key` (with `value`, unless value is None)."""
+        cache_key = ("label", key, value)
+        mask = self._mask_cache.get(cache_key)
+        if mask is None:
+            mask = np.array([
+                key in labels and (value is None or labels[key] == value) for labels in self._labels
+            ], dtype=bool)
+            self._mask_cache[cache_key] = mask
+        return mask
+
+    def _expression_mask(self, key: str, operator: str, values: Tuple[str, ...]) -> np.ndarray:
+        if operator in ("Exists", "DoesNotExist"):
+            has_key = self._label_mask(key, None)
+            return has_key if operator == "Exists" else ~has_key
+        in_values = np.zeros(len(self._labels), dtype=bool)
+        for value in values:
+            in_values |= self._label_mask(key, value)
+        return in_values if operator == "In" else ~in_values
+
+    @staticmethod
+    def _tolerates(tolerations: FrozenSet[Tuple], taint: Tuple[str, str, str]) -> bool:
+        key, value, effect = taint
+        for t_key, t_operator, t_value, t_effect in tolerations:
+            if t_effect and t_effect != effect:
+                continue
+            if t_operator == "Exists" and (not t_key or t_key == key):
+                return True
+            if t_operator == "Equal" and t_key == key and t_value == value:
+                return True
+        return False
@@ -1,32 +1,191 @@
-from typing import List
-from k8s_cost_optimizer.models.schemas import OptimizationAction, OptimizationType
+import warnings
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord, HPADetails
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.cost_index import CostIndex
 from .base_tool import BaseOptimizationTool
 
+CURRENT_REPLICAS = "kube_horizontalpodautoscaler_status_current_replicas"
+DESIRED_REPLICAS = "kube_horizontalpodautoscaler_status_desired_replicas"
+OBSERVED_METRIC = "kube_horizontalpodautoscaler_status_target_metric"
+TARGET_METRIC = "kube_horizontalpodautoscaler_spec_target_metric"
+
 class HPAOptimizerTool(BaseOptimizationTool):
-    def analyze(self) -> List[OptimizationAction]:
+    action_type = OptimizationType.HPA_OPTIMIZATION
+    cost_data = frozenset({"allocations"})
+    # Per-replica monthly cost used when Kubecost has no data for the scaled workload.
+    DEFAULT_REPLICA_MONTHLY_COST = 2.5
+    WINDOW = timedelta(days=7)
+    STEP_SECONDS = 300
+    # Only lower the floor of HPAs that sit on it for at least this share of the window.
+    MIN_TIME_AT_MIN = 0.5
+    # The new floor covers demand at this percentile; the new ceiling is the p99 demand plus headroom,
+    # and never below the highest replica count seen in the window.
+    MIN_DEMAND_PERCENTILE = 5
+    MAX_HEADROOM = 1.2
+    # Leave the ceiling alone unless it moves by at least this many replicas and this share of the
+    # current maxReplicas, so small swings in demand don't re-tune it every run.
+    MAX_CHANGE_REPLICAS = 2
+    MAX_CHANGE_RATIO = 0.2
+
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
+        scope = scope or AnalysisScope()
+        costs = costs or CostIndex()
         actions = []
-        hpas = self.k8s_client.list_hpas()
-        
-        for hpa in hpas:
-            current_min = hpa.spec.min_replicas
-            current_max = hpa.spec.max_replicas
-            current_replicas = hpa.status.current_replicas
-
-            if current_replicas == current_min and current_min > 1:
-                actions.append(OptimizationAction(
-                    type=OptimizationType.HPA_OPTIMIZATION,
-                    target=hpa.metadata.name,
-                    namespace=hpa.metadata.namespace,
-                    action_details={
-                        "operation": "patch_hpa",
-                        "recommendation": f"Consider lowering minReplicas from {current_min}",
-                        "current_min": current_min,
-                        "current_max": current_max
-                    },
-                    confidence=0.75,
-                    estimated_savings=2.5 * (current_min - 1)
-                ))
-        
-        logger.info(f"Generated {len(actions)} HPA optimization actions.")
-        return actions
\ No newline at end of file
+        log = logger.bind(tool="HPAOptimizerTool")
+        hpas = self.k8s_client.list_hpas(scope.namespaces)
+        if not hpas:
+            return []
+
+        keys = [(hpa.metadata.namespace, hpa.metadata.name) for hpa in hpas]
+        history = self._replica_history(keys)
+        if history is None:
+            log.warning("Could not retrieve HPA replica history from Prometheus.")
+            return []
+        current, desired, demand = history
+
+        mins = np.array([hpa.spec.min_replicas or 1 for hpa in hpas], dtype=float)
+        maxs = np.array([hpa.spec.max_replicas for hpa in hpas], dtype=float)
+        stats = self._summarize(current, desired, demand, mins, maxs)
+
+        workload_costs = costs.workload_monthly_cost(
+            [hpa.metadata.namespace for hpa in hpas],
+            [hpa.spec.scale_target_ref.name for hpa in hpas],
+        )
+        replica_costs = np.where(
+            np.isnan(workload_costs), self.DEFAULT_REPLICA_MONTHLY_COST,
+            workload_costs / np.maximum(np.nan_to_num(stats["p50"], nan=1.0), 1),
+        )
+        # Lowering the floor only saves money while the HPA would otherwise sit on it; moving the
+        # ceiling changes what a scale-up may spend, not what the workload costs now.
+        savings = (mins - stats["recommended_min"]) * replica_costs * stats["time_at_min"]
+
+        for i in np.flatnonzero(stats["lower_min"] | stats["change_max"]):
+            hpa = hpas[i]
+            current_min, current_max = int(mins[i]), hpa.spec.max_replicas
+            recommended_min, recommended_max = int(stats["recommended_min"][i]), int(stats["recommended_max"][i])
+            changes = []
+            if recommended_min != current_min:
+                changes.append(f"lower minReplicas from {current_min} to {recommended_min}")
+            if recommended_max != current_max:
+                direction = "lower" if recommended_max < current_max else "raise"
+                changes.append(f"{direction} maxReplicas from {current_max} to {recommended_max}")
+            recommendation = "; ".join(changes)
+            actions.append(ActionRecord(
+                type=OptimizationType.HPA_OPTIMIZATION,
+                target=hpa.metadata.name,
+                namespace=hpa.metadata.namespace,
+                details=HPADetails(
+                    recommendation=recommendation[0].upper() + recommendation[1:],
+                    current_min=current_min,
+                    current_max=current_max,
+                    recommended_min=recommended_min,
+                    recommended_max=recommended_max,
+                    replicas_p50=round(float(stats["p50"][i]), 2),
+                    replicas_p95=round(float(stats["p95"][i]), 2),
+                    replicas_peak=int(stats["peak"][i]),
+                    time_at_min=round(float(stats["time_at_min"][i]), 3),
+                    time_at_max=round(float(stats["time_at_max"][i]), 3),
+                    window_days=self.WINDOW.days,
+                    replica_monthly_cost=round(float(replica_costs[i]), 2),
+                ),
+                confidence=0.8,
+                estimated_savings=round(float(savings[i]), 2)
+            ))
+
+        log.info(f"Generated {len(actions)} HPA optimization actions.", hpas=len(hpas))
+        return actions
+
+    def _replica_history(self, keys: List[Tuple[str, str]]) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Fetches replica and target-metric history for every HPA with one range query, sharded by namespace.
+
+        Returns (current, desired, demand) matrices of shape (len(keys), steps), NaN where no sample
+        exists. `demand` is the unclamped replica count the HPA algorithm would pick,
+        current * observed / target, taking the max across an HPA's metrics.
+        """
+        end = self.clock()
+        start = end - self.WINDOW
+        steps = int(self.WINDOW.total_seconds() // self.STEP_SECONDS) + 1
+        names = "|".join((CURRENT_REPLICAS, DESIRED_REPLICAS, OBSERVED_METRIC, TARGET_METRIC))
+        hpas_per_namespace = Counter(ns for ns, _ in keys)
+        fetched = self.prometheus_client.query_range_sharded(
+            lambda ns: f'{{__name__=~"{names}"{ns}}}', start, end, self.STEP_SECONDS,
+            hpas_per_namespace, hpas_per_namespace,
+        )
+        if not fetched.series and not fetched.complete:
+            return None
+        if not fetched.complete:
+            logger.warning("HPA history incomplete; affected HPAs are skipped.", failed_namespaces=fetched.failed_namespaces)
+        results = fetched.series
+
+        rows = {key: i for i, key in enumerate(keys)}
+        current = np.full((len(keys), steps), np.nan)
+        desired = np.full((len(keys), steps), np.nan)
+        observed: Dict[Tuple, np.ndarray] = {}
+        targets: Dict[Tuple, np.ndarray] = {}
+        for series in results:
+            metric = series.get('metric', {})
+            row = rows.get((metric.get('namespace'), metric.get('horizontalpodautoscaler')))
+            if row is None or series.get('values') is None or len(series['values']) == 0:
+                continue
+            samples = np.asarray(series['values'], dtype=float)  # [[timestamp, "value"], ...] or an (n, 2) array
+            cols = np.rint((samples[:, 0] - start.timestamp()) / self.STEP_SECONDS).astype(int)
+            valid = (cols >= 0) & (cols < steps)
+            cols, values = cols[valid], samples[valid, 1]
+
+            name = metric.get('__name__')
+            if name == CURRENT_REPLICAS:
+                current[row, cols] = values
+            elif name == DESIRED_REPLICAS:
+                desired[row, cols] = values
+            else:
+                series_key = (row, metric.get('metric_name'), metric.get('metric_target_type'))
+                target = observed if name == OBSERVED_METRIC else targets
+                target.setdefault(series_key, np.full(steps, np.nan))[cols] = values
+
+        demand = np.full((len(keys), steps), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for series_key, values in observed.items():
+                target = targets.get(series_key)
+                if target is None:
+                    continue
+                row = series_key[0]
+                demand[row] = np.fmax(demand[row], current[row] * values / target)
+        demand[~np.isfinite(demand)] = np.nan
+        return current, desired, demand
+
+    def _summarize(self, current: np.ndarray, desired: np.ndarray, demand: np.ndarray,
+                   mins: np.ndarray, maxs: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-HPA percentiles, time at the floor/ceiling and recommended bounds, for all HPAs at once."""
+        samples = np.sum(~np.isnan(current), axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows for HPAs without history
+            p50, p95 = np.nanpercentile(current, [50, 95], axis=1)
+            peak = np.nanmax(np.fmax(current, desired), axis=1)
+            demand_low = np.nanpercentile(demand, self.MIN_DEMAND_PERCENTILE, axis=1)
+            demand_high = np.nanpercentile(demand, 99, axis=1)
+
+        time_at_min = np.sum(current <= mins[:, None], axis=1) / np.maximum(samples, 1)
+        time_at_max = np.sum(current >= maxs[:, None], axis=1) / np.maximum(samples, 1)
+        recommended_min = np.maximum(1, np.ceil(np.nan_to_num(demand_low, nan=np.inf)))
+        recommended_min = np.minimum(recommended_min, mins)
+        lower_min = (samples > 0) & ~np.isnan(demand_low) \
+            & (time_at_min >= self.MIN_TIME_AT_MIN) & (recommended_min < mins)
+        recommended_min = np.where(lower_min, recommended_min, mins)  # the floor stays unless it is lowered
+
+        recommended_max = np.maximum(recommended_min, np.ceil(np.nan_to_num(demand_high * self.MAX_HEADROOM, nan=0)))
+        recommended_max = np.fmax(recommended_max, np.ceil(peak))
+        recommended_max = np.where(np.isnan(demand_high), maxs, recommended_max)
+        delta = np.abs(recommended_max - maxs)
+        change_max = (samples > 0) & ~np.isnan(demand_high) \
+            & (delta >= self.MAX_CHANGE_REPLICAS) & (delta >= self.MAX_CHANGE_RATIO * maxs)
+        recommended_max = np.where(change_max, recommended_max, maxs)
+        return {
+            "p50": p50, "p95": p95, "peak": np.nan_to_num(peak), "time_at_min": time_at_min,
+            "time_at_max": time_at_max, "recommended_min": recommended_min,
+            "recommended_max": recommended_max, "lower_min": lower_min, "change_max": change_max,
+        }
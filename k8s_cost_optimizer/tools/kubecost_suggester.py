@@ -1,44 +1,90 @@
-from typing import List, Optional
-from k8s_cost_optimizer.models.schemas import OptimizationAction, OptimizationType
+from typing import List, Optional, Tuple
+import numpy as np
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord, RightsizingDetails
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.cost_index import CostIndex
 from k8s_cost_optimizer.utils.kubecost_client import KubecostClient
+from k8s_cost_optimizer.utils.quantity import quantity
 from k8s_cost_optimizer.tools.base_tool import BaseOptimizationTool
+from k8s_cost_optimizer.agents.apply_executor import WORKLOAD_API_VERSIONS
+
+# Kubecost reports controller kinds in lower case; only kinds the apply executor can patch are mapped.
+WORKLOAD_KINDS = {kind.lower(): kind for kind in WORKLOAD_API_VERSIONS}
 
 class KubecostSuggesterTool(BaseOptimizationTool):
+    action_type = OptimizationType.RIGHTSIZING
+    cost_data = frozenset({"allocations"})
+
     def __init__(self, kubecost_client: KubecostClient, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.kubecost_client = kubecost_client
 
-    def analyze(self) -> List[OptimizationAction]:
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
         actions = []
         log = logger.bind(tool="KubecostSuggesterTool")
         log.info("Querying Kubecost for savings recommendations.")
         
         recommendations = self.kubecost_client.get_savings_recommendations()
 
-        for rec in recommendations:
-            if rec.get('type') == 'Request Sizing':
-                action = self._create_rightsizing_action(rec)
-                if action:
-                    actions.append(action)
+        scope = scope or AnalysisScope()
+        costs = costs or CostIndex()
+        recommendations = [
+            rec for rec in recommendations
+            if rec.get('type') == 'Request Sizing' and scope.includes(rec.get('namespace', ''))
+        ]
+        # Jobs, bare ReplicaSets etc. are left alone rather than patched as the wrong kind of workload.
+        skipped = [rec for rec in recommendations if self._workload_kind(rec) is None]
+        if skipped:
+            log.info("Skipping Kubecost recommendations for unsupported controller kinds",
+                     count=len(skipped), kinds=sorted({str(rec.get('controllerKind')) for rec in skipped}))
+            recommendations = [rec for rec in recommendations if self._workload_kind(rec) is not None]
+
+        # Kubecost usually reports monthlySavings itself; price the request delta where it does not.
+        deltas = np.array([self._request_delta(rec) for rec in recommendations], dtype=float).reshape(-1, 2)
+        fallback_savings = costs.compute_monthly_cost(
+            [rec.get('namespace', '') for rec in recommendations],
+            [rec.get('name') for rec in recommendations],
+            deltas[:, 0], deltas[:, 1],
+        )
+
+        for rec, fallback in zip(recommendations, fallback_savings):
+            action = self._create_rightsizing_action(rec, max(0.0, round(float(fallback), 2)))
+            if action:
+                actions.append(action)
         
         log.info(f"Generated {len(actions)} actions from Kubecost recommendations.")
         return actions
 
-    def _create_rightsizing_action(self, rec: dict) -> Optional[OptimizationAction]:
+    @staticmethod
+    def _workload_kind(rec: dict) -> Optional[str]:
+        return WORKLOAD_KINDS.get(str(rec.get('controllerKind', '')).lower())
+
+    def _request_delta(self, rec: dict) -> Tuple[float, float]:
+        """(cores, bytes) freed by moving from the current to the recommended requests."""
+        try:
+            current, recommended = rec['requestCurrent'], rec['requestRec']
+            return (
+                quantity(str(current.get('cpu', 0))) - quantity(str(recommended.get('cpu', 0))),
+                quantity(str(current.get('memory', 0))) - quantity(str(recommended.get('memory', 0))),
+            )
+        except (KeyError, AttributeError, ValueError, TypeError):
+            return 0.0, 0.0
+
+    def _create_rightsizing_action(self, rec: dict, fallback_savings: float) -> Optional[ActionRecord]:
         try:
-            return OptimizationAction(
+            return ActionRecord(
                 type=OptimizationType.RIGHTSIZING,
                 target=rec['name'],
                 namespace=rec['namespace'],
-                action_details={
-                    "operation": "patch_workload_resources",
-                    "container": rec['container'],
-                    "current_requests": rec['requestCurrent'],
-                    "recommended_requests": rec['requestRec']
-                },
+                details=RightsizingDetails(
+                    container=rec['container'],
+                    current_requests=rec['requestCurrent'],
+                    recommended_requests=rec['requestRec'],
+                    workload_kind=self._workload_kind(rec),
+                ),
                 confidence=0.95,
-                estimated_savings=rec.get('monthlySavings', 20.0)
+                estimated_savings=rec.get('monthlySavings', fallback_savings)
             )
         except KeyError as e:
             logger.warning("Could not parse Kubecost rightsizing recommendation due to missing key", key=str(e), recommendation=rec)
@@ -1,35 +1,64 @@
-from typing import List
-from k8s_cost_optimizer.models.schemas import OptimizationAction, OptimizationType
+from typing import List, Optional, Dict
+import numpy as np
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord, NodeDrainDetails
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.cost_index import CostIndex
+from k8s_cost_optimizer.utils.quantity import quantity
 from .base_tool import BaseOptimizationTool
+from .consolidation import ConsolidationPlanner
 
 class NodeOptimizerTool(BaseOptimizationTool):
-    def analyze(self) -> List[OptimizationAction]:
+    action_type = OptimizationType.NODE_OPTIMIZATION
+    INSTANCE_TYPE_LABELS = ("node.kubernetes.io/instance-type", "beta.kubernetes.io/instance-type")
+
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
+        scope = scope or AnalysisScope()
+        costs = costs or CostIndex()
         actions = []
         log = logger.bind(tool="NodeOptimizerTool")
+        if not scope.cluster_scoped:
+            return []
         log.info("Starting node optimization analysis.")
 
-        query = '(sum(kube_pod_container_resource_requests{resource="cpu", unit="core"}) by (node)) / (sum(kube_node_status_capacity{resource="cpu", unit="core"}) by (node)) < 0.3'
-        
-        results = self.prometheus_client.query(query)
-        if not results:
-            log.warning("Could not retrieve node utilization metrics from Prometheus.")
+        nodes = self.k8s_client.get_nodes()
+        pods = self.k8s_client.get_all_pods()
+        if not nodes:
+            log.warning("Could not retrieve nodes for consolidation analysis.")
             return []
 
-        underutilized_nodes = [res['metric']['node'] for res in results]
+        drains = ConsolidationPlanner().plan(nodes, pods, self._node_hourly_prices(nodes, costs))
 
-        for node_name in underutilized_nodes:
-            actions.append(OptimizationAction(
+        for drain in drains:
+            actions.append(ActionRecord(
                 type=OptimizationType.NODE_OPTIMIZATION,
-                target=node_name,
+                target=drain.node,
                 namespace="",
-                action_details={
-                    "operation": "cordon_and_drain",
-                    "reason": "Node is underutilized, consolidating workloads to save costs."
-                },
+                details=NodeDrainDetails(
+                    reason="Node is underutilized and its pods fit on the remaining nodes.",
+                    cpu_utilization=drain.cpu_utilization,
+                    memory_utilization=drain.memory_utilization,
+                    pods_to_move=drain.pods_to_move,
+                    destinations=drain.destinations,
+                    pricing=costs.source,
+                ),
                 confidence=0.9,
-                estimated_savings=100.0
+                estimated_savings=drain.monthly_cost
             ))
 
-        log.info(f"Generated {len(actions)} node optimization actions.")
-        return actions
\ No newline at end of file
+        log.info(f"Generated {len(actions)} node optimization actions.", nodes=len(nodes))
+        return actions
+
+    def _node_hourly_prices(self, nodes: list, costs: CostIndex) -> Dict[str, float]:
+        names = [node.metadata.name for node in nodes]
+        instance_types = []
+        for node in nodes:
+            labels = node.metadata.labels or {}
+            instance_types.append(next((labels[l] for l in self.INSTANCE_TYPE_LABELS if l in labels), None))
+        allocatable = [(node.status and node.status.allocatable) or {} for node in nodes]
+        prices = costs.node_hourly_cost(
+            names, instance_types,
+            np.array([quantity(a.get("cpu", "0")) for a in allocatable]),
+            np.array([quantity(a.get("memory", "0")) for a in allocatable]),
+        )
+        return dict(zip(names, prices.tolist()))
\ No newline at end of file
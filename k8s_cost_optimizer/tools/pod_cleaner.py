@@ -1,30 +1,60 @@
-from typing import List
+from typing import Any, List, Optional
 from datetime import datetime, timedelta, timezone
-from k8s_cost_optimizer.models.schemas import OptimizationAction, OptimizationType
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord, PodCleanupDetails
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.cost_index import CostIndex
 from .base_tool import BaseOptimizationTool
 
 class PodCleanupTool(BaseOptimizationTool):
-    def analyze(self) -> List[OptimizationAction]:
+    action_type = OptimizationType.POD_CLEANUP
+    cost_data = frozenset()
+    # Finished pods no longer reserve CPU or memory, so the cost index prices them at zero;
+    # this nominal value only reflects API-server/etcd object overhead.
+    FINISHED_POD_SAVINGS = 0.1
+    RETENTION = timedelta(hours=24)
+
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
+        scope = scope or AnalysisScope()
         actions = []
-        pods = self.k8s_client.get_all_pods()
+        pods = self.k8s_client.get_finished_pods(scope.namespaces)
+        cutoff = self.clock() - self.RETENTION
         
         for pod in pods:
-            if pod.status.phase in ["Succeeded", "Failed"]:
-                try:
-                    end_time_str = pod.status.container_statuses[0].state.terminated.finished_at
-                    end_time = end_time_str.replace(tzinfo=timezone.utc)
-                    if datetime.now(timezone.utc) - end_time > timedelta(hours=24):
-                        actions.append(OptimizationAction(
-                            type=OptimizationType.POD_CLEANUP,
-                            target=pod.metadata.name,
-                            namespace=pod.metadata.namespace,
-                            action_details={"operation": "delete_pod", "phase": pod.status.phase},
-                            confidence=0.99,
-                            estimated_savings=0.1
-                        ))
-                except (AttributeError, IndexError):
-                    continue
+            end_time = pod_finished_at(pod)
+            if end_time is None or end_time > cutoff:
+                continue
+            actions.append(ActionRecord(
+                type=OptimizationType.POD_CLEANUP,
+                target=pod.metadata.name,
+                namespace=pod.metadata.namespace,
+                details=PodCleanupDetails(
+                    phase=pod.status.phase,
+                    uid=pod.metadata.uid,
+                    finished_at=end_time.isoformat(),
+                ),
+                confidence=0.99,
+                estimated_savings=self.FINISHED_POD_SAVINGS
+            ))
+
+        logger.info(f"Generated {len(actions)} pod cleanup actions.", finished_pods=len(pods))
+        return actions
+
+def pod_finished_at(pod: Any) -> Optional[datetime]:
+    """Latest termination time across all (init, regular, ephemeral) containers.
 
-        logger.info(f"Generated {len(actions)} pod cleanup actions.")
-        return actions
\ No newline at end of file
+    Pods that never ran a container (e.g. evicted before start) fall back to their latest
+    condition transition.
+    """
+    status = pod.status
+    times = [
+        cs.state.terminated.finished_at
+        for statuses in (status.init_container_statuses, status.container_statuses, status.ephemeral_container_statuses)
+        for cs in statuses or []
+        if cs.state and cs.state.terminated and cs.state.terminated.finished_at
+    ]
+    if not times:
+        times = [c.last_transition_time for c in status.conditions or [] if c.last_transition_time]
+    if not times:
+        return None
+    return max(t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in times)
\ No newline at end of file
@@ -1,21 +1,46 @@
-from typing import List
-from k8s_cost_optimizer.models.schemas import OptimizationAction, OptimizationType
+from typing import List, Optional
+import numpy as np
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord, PVCCleanupDetails
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.cost_index import CostIndex
+from k8s_cost_optimizer.utils.volume_index import VolumeReferenceIndex
 from .base_tool import BaseOptimizationTool
 
 class PVCCleanerTool(BaseOptimizationTool):
-    def analyze(self) -> List[OptimizationAction]:
+    action_type = OptimizationType.PVC_CLEANUP
+    cost_data = frozenset({"assets"})
+
+    def __init__(self, volume_index: VolumeReferenceIndex, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.volume_index = volume_index
+
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
+        scope = scope or AnalysisScope()
+        costs = costs or CostIndex()
         actions = []
-        unbound_pvcs = self.k8s_client.get_unbound_pvcs()
+        claims = self.volume_index.unreferenced_claims(scope)
+
+        # Pending claims have nothing provisioned yet, so they price at zero.
+        savings = costs.storage_monthly_cost(
+            [claim.storage_class for claim in claims],
+            np.array([claim.provisioned_bytes for claim in claims], dtype=float),
+        )
 
-        for pvc in unbound_pvcs:
-            actions.append(OptimizationAction(
+        for claim, saving in zip(claims, savings):
+            actions.append(ActionRecord(
                 type=OptimizationType.PVC_CLEANUP,
-                target=pvc.metadata.name,
-                namespace=pvc.metadata.namespace,
-                action_details={"operation": "delete_pvc", "phase": pvc.status.phase},
+                target=claim.name,
+                namespace=claim.namespace,
+                details=PVCCleanupDetails(
+                    phase=claim.phase,
+                    reason=claim.reason,
+                    storage_class=claim.storage_class,
+                    volume_name=claim.volume_name,
+                    provisioned_bytes=int(claim.provisioned_bytes),
+                ),
                 confidence=0.9,
-                estimated_savings=5.0
+                estimated_savings=round(float(saving), 2)
             ))
 
         logger.info(f"Generated {len(actions)} PVC cleanup actions.")
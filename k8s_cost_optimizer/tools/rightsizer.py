@@ -1,54 +1,96 @@
-from typing import List, Dict, Any
-from k8s_cost_optimizer.models.schemas import OptimizationAction, OptimizationType
+from collections import Counter
+from typing import List, Dict, Any, Optional
+import numpy as np
+from k8s_cost_optimizer.models.schemas import OptimizationType, AnalysisScope
+from k8s_cost_optimizer.models.action_record import ActionRecord, RightsizingDetails
 from k8s_cost_optimizer.utils.logger import logger
+from k8s_cost_optimizer.utils.cost_index import CostIndex
+from k8s_cost_optimizer.utils.quantity import quantity
+from k8s_cost_optimizer.agents.apply_executor import WORKLOAD_API_VERSIONS
 from .base_tool import BaseOptimizationTool
-from kubernetes.utils import parse_quantity
 
 class RightsizingTool(BaseOptimizationTool):
-    def analyze(self) -> List[OptimizationAction]:
+    action_type = OptimizationType.RIGHTSIZING
+    cost_data = frozenset({"allocations"})
+
+    def analyze(self, scope: Optional[AnalysisScope] = None, costs: Optional[CostIndex] = None) -> List[ActionRecord]:
+        scope = scope or AnalysisScope()
+        costs = costs or CostIndex()
         actions = []
         log = logger.bind(tool="RightsizingTool")
         log.info("Starting workload rightsizing analysis.")
+        if scope.namespaces is not None and not scope.namespaces:
+            return []
 
-        cpu_query = 'quantile_over_time(0.95, rate(container_cpu_usage_seconds_total{container!="", pod!=""}[5m])[7d:5m])'
-        mem_query = 'quantile_over_time(0.95, container_memory_working_set_bytes{container!="", pod!=""}[7d:5m])'
+        # Only pods of workloads the apply executor can patch; Jobs, bare ReplicaSets etc. are left alone.
+        pods = [
+            pod for pod in self.k8s_client.get_all_pods(scope.namespaces)
+            if pod.metadata.owner_references and self._get_owner_kind(pod) in WORKLOAD_API_VERSIONS
+        ]
+        # Only namespaces with owned pods can yield actions; container counts approximate series per shard.
+        weights = Counter()
+        for pod in pods:
+            weights[pod.metadata.namespace] += len(pod.spec.containers)
 
-        cpu_results = self.prometheus_client.query(cpu_query)
-        mem_results = self.prometheus_client.query(mem_query)
+        cpu = self.prometheus_client.query_sharded(
+            lambda ns: f'quantile_over_time(0.95, rate(container_cpu_usage_seconds_total{{container!="", pod!=""{ns}}}[5m])[7d:5m])',
+            weights, weights,
+        )
+        mem = self.prometheus_client.query_sharded(
+            lambda ns: f'quantile_over_time(0.95, container_memory_working_set_bytes{{container!="", pod!=""{ns}}}[7d:5m])',
+            weights, weights,
+        )
+        failed = sorted(set(cpu.failed_namespaces) | set(mem.failed_namespaces))
+        if failed:
+            log.warning("Rightsizing metrics incomplete; some namespaces are skipped.", failed_namespaces=failed)
 
-        if not cpu_results and not mem_results:
+        if not cpu.series and not mem.series:
             log.warning("Could not retrieve metrics from Prometheus for rightsizing.")
             return []
 
-        recommendations = self._process_metrics(cpu_results or [], mem_results or [])
-        pods = self.k8s_client.get_all_pods()
+        recommendations = self._process_metrics(cpu.series, mem.series)
 
+        # Replicas of a workload share one template, so recommend once per workload container,
+        # sized for its busiest replica.
+        containers: Dict[tuple, Dict] = {}
         for pod in pods:
-            if not pod.metadata.owner_references:
-                continue
-
+            workload_key = (pod.metadata.namespace, self._get_owner_workload(pod), self._get_owner_kind(pod))
             for container in pod.spec.containers:
-                key = f"{pod.metadata.namespace}/{pod.metadata.name}/{container.name}"
-                if key not in recommendations:
+                rec = recommendations.get(f"{pod.metadata.namespace}/{pod.metadata.name}/{container.name}")
+                if rec is None:
                     continue
+                entry = containers.setdefault(workload_key + (container.name,), {
+                    "current": container.resources.requests or {}, "rec": {},
+                })
+                for resource, value in rec.items():
+                    if resource not in entry["rec"] or quantity(value) > quantity(entry["rec"][resource]):
+                        entry["rec"][resource] = value
 
-                rec = recommendations[key]
-                current_requests = container.resources.requests or {}
-                
-                if self._is_recommendation_significant(rec, current_requests):
-                    actions.append(OptimizationAction(
-                        type=OptimizationType.RIGHTSIZING,
-                        target=self._get_owner_workload(pod),
-                        namespace=pod.metadata.namespace,
-                        action_details={
-                            "operation": "patch_workload_resources",
-                            "container": container.name,
-                            "current_requests": current_requests,
-                            "recommended_requests": rec
-                        },
-                        confidence=0.85,
-                        estimated_savings=15.0
-                    ))
+        candidates = [
+            (key, entry["current"], entry["rec"]) for key, entry in containers.items()
+            if self._is_recommendation_significant(entry["rec"], entry["current"])
+        ]
+        savings = costs.compute_monthly_cost(
+            [key[0] for key, _, _ in candidates],
+            [key[1] for key, _, _ in candidates],
+            np.array([self._delta(cur, rec, 'cpu') for _, cur, rec in candidates], dtype=float),
+            np.array([self._delta(cur, rec, 'memory') for _, cur, rec in candidates], dtype=float),
+        )
+
+        for ((namespace, workload, kind, container), current_requests, rec), saving in zip(candidates, savings):
+            actions.append(ActionRecord(
+                type=OptimizationType.RIGHTSIZING,
+                target=workload,
+                namespace=namespace,
+                details=RightsizingDetails(
+                    container=container,
+                    current_requests=current_requests,
+                    recommended_requests=rec,
+                    workload_kind=kind,
+                ),
+                confidence=0.85,
+                estimated_savings=round(max(0.0, float(saving)), 2)
+            ))
 
         log.info(f"Generated {len(actions)} rightsizing actions.")
         return actions
@@ -64,21 +106,31 @@ class RightsizingTool(BaseOptimizationTool):
         for result in mem_results:
             metric = result.get('metric', {})
             key = f"{metric.get('namespace')}/{metric.get('pod')}/{metric.get('container')}"
-            value_bytes = int(result.get('value', [0, '0'])[1])
+            value_bytes = int(float(result.get('value', [0, '0'])[1]))
             recs.setdefault(key, {})['memory'] = f"{max(50, int(value_bytes / 1024 / 1024))}Mi"
         return recs
 
+    def _delta(self, current: Dict, rec: Dict, resource: str) -> float:
+        """Quantity of `resource` released by the recommendation (0 when either side is unset)."""
+        if resource not in current or resource not in rec:
+            return 0.0
+        return quantity(current[resource]) - quantity(rec[resource])
+
     def _get_owner_workload(self, pod: Any) -> str:
         owner = pod.metadata.owner_references[0]
         if owner.kind == "ReplicaSet":
             return owner.name.rsplit('-', 1)[0]
         return owner.name
 
+    def _get_owner_kind(self, pod: Any) -> str:
+        kind = pod.metadata.owner_references[0].kind
+        return "Deployment" if kind == "ReplicaSet" else kind
+
     def _is_recommendation_significant(self, rec: Dict, current: Dict) -> bool:
         try:
-            current_cpu_m = parse_quantity(current.get('cpu', '0m')) * 1000
-            rec_cpu_m = parse_quantity(rec.get('cpu', '0m')) * 1000
-            if rec_cpu_m > 0 and current_cpu_m > 0 and rec_cpu_m < (current_cpu_m * 0.7):
+            current_cpu = quantity(str(current.get('cpu', '0m')))
+            rec_cpu = quantity(str(rec.get('cpu', '0m')))
+            if rec_cpu > 0 and current_cpu > 0 and rec_cpu < (current_cpu * 0.7):
                 return True
         except (ValueError, TypeError):
             pass
@@ -0,0 +1,173 @@
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .kubecost_client import KubecostClient
+from .logger import logger
+
+HOURS_PER_MONTH = 730
+GIB = 1024 ** 3
+
+# Kubecost's own default custom-pricing rates, used when no allocation data is available.
+DEFAULT_CPU_CORE_HOUR = 0.031611
+DEFAULT_RAM_GIB_HOUR = 0.004237
+DEFAULT_STORAGE_GIB_HOUR = 0.00005479452
+
+def _rate(cost: float, units: float) -> Optional[float]:
+    return cost / units if units > 0 and cost > 0 else None
+
+class CostIndex:
+    """Unit prices for one analysis run, built once from Kubecost allocation and asset data.
+
+    CPU and RAM rates are kept in a single table whose row 0 is the cluster average, followed by
+    per-namespace and per-(namespace, workload) rows; lookups resolve every key to the most
+    specific row that exists and then price whole batches with array arithmetic, so tools never
+    make per-action network calls.
+    """
+
+    def __init__(
+        self,
+        cluster_rates: Tuple[float, float] = (DEFAULT_CPU_CORE_HOUR, DEFAULT_RAM_GIB_HOUR),
+        namespace_rates: Optional[Dict[str, Tuple[float, float]]] = None,
+        workload_rates: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None,
+        workload_hourly_costs: Optional[Dict[Tuple[str, str], float]] = None,
+        storage_rates: Optional[Dict[str, float]] = None,
+        node_hourly_costs: Optional[Dict[str, float]] = None,
+        instance_type_hourly_costs: Optional[Dict[str, float]] = None,
+        source: str = "default",
+    ):
+        self.source = source
+        namespace_rates = namespace_rates or {}
+        workload_rates = workload_rates or {}
+
+        rows = [cluster_rates] + list(namespace_rates.values()) + list(workload_rates.values())
+        self._namespace_row = {ns: i + 1 for i, ns in enumerate(namespace_rates)}
+        self._workload_row = {key: i + 1 + len(namespace_rates) for i, key in enumerate(workload_rates)}
+        self._cpu_rates = np.array([r[0] for r in rows], dtype=float)
+        self._ram_rates = np.array([r[1] for r in rows], dtype=float)
+
+        self.workload_hourly_costs = workload_hourly_costs or {}
+        self.storage_rates = storage_rates or {}
+        self.default_storage_rate = (
+            float(np.mean(list(self.storage_rates.values()))) if self.storage_rates else DEFAULT_STORAGE_GIB_HOUR
+        )
+        self.node_hourly_costs = node_hourly_costs or {}
+        self.instance_type_hourly_costs = instance_type_hourly_costs or {}
+
+    @classmethod
+    def from_kubecost(cls, kubecost_client: KubecostClient, window: str = "7d",
+                      datasets: FrozenSet[str] = frozenset({"allocations", "assets"})) -> "CostIndex":
+        """`datasets` limits the fetch: allocations give CPU/RAM and workload prices, assets storage and node prices."""
+        allocations = kubecost_client.get_allocations(window=window, aggregate="namespace,controller") \
+            if "allocations" in datasets else []
+        assets = kubecost_client.get_assets(window=window) if "assets" in datasets else []
+        if not allocations and not assets:
+            logger.warning("No Kubecost allocation or asset data, using default unit prices.")
+            return cls()
+
+        # (cpuCost, cpuCoreHours, ramCost, ramGiBHours) summed per namespace, per workload and overall
+        totals = np.zeros(4)
+        namespace_sums: Dict[str, np.ndarray] = {}
+        workload_sums: Dict[Tuple[str, str], np.ndarray] = {}
+        workload_hourly_costs: Dict[Tuple[str, str], float] = {}
+        for entry in allocations:
+            props = entry.get('properties') or {}
+            namespace, controller = props.get('namespace'), props.get('controller')
+            if not namespace or entry.get('name', '').startswith('__'):
+                continue  # idle / unallocated buckets
+            sums = np.array([
+                entry.get('cpuCost', 0.0), entry.get('cpuCoreHours', 0.0),
+                entry.get('ramCost', 0.0), entry.get('ramByteHours', 0.0) / GIB,
+            ], dtype=float)
+            totals += sums
+            namespace_sums[namespace] = namespace_sums.get(namespace, 0) + sums
+            if controller:
+                workload_sums[(namespace, controller)] = sums
+                hours = entry.get('minutes', 0.0) / 60
+                if hours > 0:
+                    workload_hourly_costs[(namespace, controller)] = entry.get('totalCost', 0.0) / hours
+
+        cluster_rates = (
+            _rate(totals[0], totals[1]) or DEFAULT_CPU_CORE_HOUR,
+            _rate(totals[2], totals[3]) or DEFAULT_RAM_GIB_HOUR,
+        )
+
+        def _rates(sums: np.ndarray) -> Tuple[float, float]:
+            return (_rate(sums[0], sums[1]) or cluster_rates[0], _rate(sums[2], sums[3]) or cluster_rates[1])
+
+        storage_sums: Dict[str, List[float]] = {}
+        node_hourly_costs: Dict[str, float] = {}
+        instance_type_costs: Dict[str, List[float]] = {}
+        for asset in assets:
+            hours = asset.get('minutes', 0.0) / 60
+            if hours <= 0:
+                continue
+            if asset.get('type') == 'Node':
+                name = (asset.get('properties') or {}).get('name')
+                hourly = asset.get('totalCost', 0.0) / hours
+                if name:
+                    node_hourly_costs[name] = hourly
+                if asset.get('nodeType'):
+                    instance_type_costs.setdefault(asset['nodeType'], []).append(hourly)
+            elif asset.get('type') == 'Disk' and asset.get('storageClass'):
+                gib_hours = asset.get('byteHours') or asset.get('bytes', 0.0) * hours
+                sums = storage_sums.setdefault(asset['storageClass'], [0.0, 0.0])
+                sums[0] += asset.get('totalCost', 0.0)
+                sums[1] += gib_hours / GIB
+
+        index = cls(
+            cluster_rates=cluster_rates,
+            namespace_rates={ns: _rates(s) for ns, s in namespace_sums.items()},
+            workload_rates={key: _rates(s) for key, s in workload_sums.items()},
+            workload_hourly_costs=workload_hourly_costs,
+            storage_rates={sc: r for sc, (cost, gib_hours) in storage_sums.items() if (r := _rate(cost, gib_hours))},
+            node_hourly_costs=node_hourly_costs,
+            instance_type_hourly_costs={t: float(np.mean(c)) for t, c in instance_type_costs.items()},
+            source="kubecost",
+        )
+        logger.info(
+            "Cost index built from Kubecost",
+            namespaces=len(namespace_sums), workloads=len(workload_sums),
+            storage_classes=len(index.storage_rates), nodes=len(node_hourly_costs),
+        )
+        return index
+
+    def _rows(self, namespaces: Sequence[str], workloads: Sequence[Optional[str]]) -> np.ndarray:
+        return np.fromiter(
+            (self._workload_row.get((ns, wl)) or self._namespace_row.get(ns, 0) for ns, wl in zip(namespaces, workloads)),
+            dtype=np.intp, count=len(namespaces),
+        )
+
+    def compute_monthly_cost(self, namespaces: Sequence[str], workloads: Sequence[Optional[str]],
+                             cpu_cores: np.ndarray, memory_bytes: np.ndarray) -> np.ndarray:
+        """Monthly price of the given CPU/memory quantities (deltas give savings), one entry per workload."""
+        rows = self._rows(namespaces, workloads)
+        hourly = self._cpu_rates[rows] * np.asarray(cpu_cores, dtype=float) \
+            + self._ram_rates[rows] * np.asarray(memory_bytes, dtype=float) / GIB
+        return hourly * HOURS_PER_MONTH
+
+    def storage_monthly_cost(self, storage_classes: Sequence[Optional[str]], size_bytes: np.ndarray) -> np.ndarray:
+        rates = np.fromiter(
+            (self.storage_rates.get(sc, self.default_storage_rate) for sc in storage_classes),
+            dtype=float, count=len(storage_classes),
+        )
+        return rates * np.asarray(size_bytes, dtype=float) / GIB * HOURS_PER_MONTH
+
+    def workload_monthly_cost(self, namespaces: Sequence[str], workloads: Sequence[str]) -> np.ndarray:
+        """Observed monthly cost of each workload; NaN where Kubecost has no data for it."""
+        return np.fromiter(
+            (self.workload_hourly_costs.get((ns, wl), np.nan) for ns, wl in zip(namespaces, workloads)),
+            dtype=float, count=len(namespaces),
+        ) * HOURS_PER_MONTH
+
+    def node_hourly_cost(self, names: Sequence[str], instance_types: Sequence[Optional[str]],
+                         allocatable_cpu: np.ndarray, allocatable_memory: np.ndarray) -> np.ndarray:
+        """Hourly node price by name, then instance type, then allocatable capacity at cluster unit prices."""
+        capacity_price = self._cpu_rates[0] * np.asarray(allocatable_cpu, dtype=float) \
+            + self._ram_rates[0] * np.asarray(allocatable_memory, dtype=float) / GIB
+        known = np.fromiter(
+            (self.node_hourly_costs.get(n, self.instance_type_hourly_costs.get(t, np.nan))
+             for n, t in zip(names, instance_types)),
+            dtype=float, count=len(names),
+        )
+        return np.where(np.isnan(known), capacity_price, known)
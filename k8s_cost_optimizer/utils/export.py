@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from k8s_cost_optimizer.models.action_record import ActionRecord
+from k8s_cost_optimizer.models.schemas import OptimizationRun, OptimizationType
+from .state_store import EPOCH, StateStore
+
+class ExportDataset(str, Enum):
+    RUNS = "runs"
+    ACTIONS = "actions"
+    ACTIVITY = "activity"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+ACTION_COLUMNS = [
+    "id", "type", "target", "namespace", "status", "confidence", "estimated_savings",
+    "created_at", "executed_at", "error", "action_details",
+]
+RUN_COLUMNS = [
+    "run_id", "status", "trigger", "dry_run", "created_at", "detail",
+    "total_actions_generated", "actions_approved_for_review", "error",
+]
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)  # stored timestamps are naive UTC
+    return (value - EPOCH).total_seconds()
+
+class ExportFilter(BaseModel):
+    """Row filter for exports. The time range applies to creation time (execution time for activity);
+    type and namespace only apply to action rows."""
+
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    type: Optional[OptimizationType] = None
+    namespace: Optional[str] = None
+    status: Optional[str] = None
+
+    def in_range(self, timestamp: Optional[float]) -> bool:
+        since, until = _epoch(self.since), _epoch(self.until)
+        if timestamp is None:
+            return since is None and until is None
+        return (since is None or timestamp >= since) and (until is None or timestamp <= until)
+
+    def matches_action(self, action: ActionRecord, timestamp: Optional[float]) -> bool:
+        return (
+            (self.type is None or action.type == self.type)
+            and (self.namespace is None or action.namespace == self.namespace)
+            and (self.status is None or action.status.value == self.status)
+            and self.in_range(timestamp)
+        )
+
+def _run_row(run: OptimizationRun) -> Dict[str, Any]:
+    report = run.report or {}
+    return {
+        "run_id": run.run_id,
+        "status": run.status.value,
+        "trigger": run.trigger,
+        "dry_run": run.dry_run,
+        "created_at": run.created_at.isoformat(),
+        "detail": run.detail,
+        "total_actions_generated": report.get("total_actions_generated"),
+        "actions_approved_for_review": report.get("actions_approved_for_review"),
+        "error": report.get("error"),
+    }
+
+def iter_rows(store: StateStore, dataset: ExportDataset, filters: ExportFilter) -> Iterator[Dict[str, Any]]:
+    """Filtered rows, pulled from the store batch by batch so memory stays flat however much is stored."""
+    if dataset == ExportDataset.RUNS:
+        for run in store.iter_runs(since=_epoch(filters.since), until=_epoch(filters.until)):
+            if filters.status is None or run.status.value == filters.status:
+                yield _run_row(run)
+    elif dataset == ExportDataset.ACTIONS:
+        for action in store.iter_actions(since=_epoch(filters.since), until=_epoch(filters.until)):
+            if filters.matches_action(action, action.created_at):
+                yield action.to_dict()
+    else:
+        for action in store.iter_activity():
+            if filters.matches_action(action, action.executed_at):
+                yield action.to_dict()
+
+def columns_for(dataset: ExportDataset) -> List[str]:
+    return RUN_COLUMNS if dataset == ExportDataset.RUNS else ACTION_COLUMNS
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+def csv_lines(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    def flush() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield flush()
+    for row in rows:
+        if isinstance(row.get("action_details"), dict):
+            row = {**row, "action_details": json.dumps(row["action_details"], default=str)}
+        writer.writerow(row)
+        yield flush()
\ No newline at end of file
@@ -0,0 +1,37 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class ConsistentHashRing:
+    """Maps keys (namespaces) onto members so that adding or removing a replica only moves ~1/N of the keys."""
+
+    def __init__(self, members: Iterable[str], vnodes: int = 64):
+        self.members = sorted(set(members))
+        self._points: List[int] = []
+        self._owners: List[str] = []
+
+        ring = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(vnodes)
+        )
+        for point, member in ring:
+            self._points.append(point)
+            self._owners.append(member)
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        idx = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[idx]
+
+    def partition(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        shards: Dict[str, List[str]] = {member: [] for member in self.members}
+        for key in keys:
+            owner = self.owner(key)
+            if owner is not None:
+                shards[owner].append(key)
+        return shards
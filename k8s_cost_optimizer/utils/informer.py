@@ -0,0 +1,129 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+from .logger import logger
+
+EventHandler = Callable[[str, Any], None]
+
+def object_key(obj: Any) -> str:
+    namespace = obj.metadata.namespace
+    return f"{namespace}/{obj.metadata.name}" if namespace else obj.metadata.name
+
+class Informer:
+    """List-then-watch cache for one resource type, in the style of client-go informers.
+
+    Handlers receive ("ADDED" | "MODIFIED" | "DELETED", obj). After a watch expires (410 Gone)
+    the informer relists and synthesizes the events that were missed, so handlers can maintain
+    derived indexes incrementally without ever rescanning. Lists are paged (`page_size` objects per
+    request), and `transform` reduces every object before it is cached or handed to the handlers,
+    so a replica holds only the fields its handlers read.
+    """
+
+    def __init__(self, name: str, list_fn: Callable, watch_timeout_seconds: int = 300, page_size: int = 500,
+                 transform: Optional[Callable[[Any], Any]] = None, **list_kwargs):
+        self.name = name
+        self.list_fn = list_fn
+        self.list_kwargs = list_kwargs
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.page_size = page_size
+        self.transform = transform or (lambda obj: obj)
+        self.store: Dict[str, Any] = {}
+        self.handlers: List[EventHandler] = []
+        self.resource_version: Optional[str] = None
+        self.synced = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_handler(self, handler: EventHandler) -> None:
+        self.handlers.append(handler)
+        for obj in list(self.store.values()):
+            handler("ADDED", obj)
+
+    def start(self) -> None:
+        """Performs the initial list synchronously, then keeps watching in a daemon thread."""
+        if self._thread:
+            return
+        self._relist()
+        self._thread = threading.Thread(target=self._run, name=f"informer-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _dispatch(self, event_type: str, obj: Any) -> None:
+        key = object_key(obj)
+        if event_type == "DELETED":
+            self.store.pop(key, None)
+        else:
+            self.store[key] = obj
+        for handler in self.handlers:
+            try:
+                handler(event_type, obj)
+            except Exception as e:
+                logger.error("Informer handler failed", informer=self.name, key=key, error=str(e))
+
+    def _list(self) -> Tuple[Dict[str, Any], str]:
+        fresh: Dict[str, Any] = {}
+        token = None
+        while True:
+            try:
+                result = self.list_fn(limit=self.page_size, _continue=token, **self.list_kwargs)
+            except ApiException as e:
+                if e.status != 410 or token is None:
+                    raise
+                # The continue token outlived the list snapshot; fall back to one unpaged list.
+                logger.info("List continuation expired, listing without paging", informer=self.name)
+                fresh, token = {}, None
+                result = self.list_fn(**self.list_kwargs)
+            for obj in result.items:
+                obj = self.transform(obj)
+                fresh[object_key(obj)] = obj
+            token = result.metadata._continue
+            if not token:
+                return fresh, result.metadata.resource_version
+
+    def _relist(self) -> None:
+        fresh, resource_version = self._list()
+        for key in set(self.store) - set(fresh):
+            self._dispatch("DELETED", self.store[key])
+        for key, obj in fresh.items():
+            self._dispatch("MODIFIED" if key in self.store else "ADDED", obj)
+        self.resource_version = resource_version
+        self.synced.set()
+        logger.info("Informer synced", informer=self.name, objects=len(fresh))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                stream = watch.Watch().stream(
+                    self.list_fn, resource_version=self.resource_version,
+                    timeout_seconds=self.watch_timeout_seconds, **self.list_kwargs
+                )
+                for event in stream:
+                    if event["type"] == "ERROR":
+                        if (event.get("raw_object") or {}).get("code") == 410:
+                            raise ApiException(status=410, reason="Gone")
+                        continue
+                    obj = event["object"]
+                    self.resource_version = obj.metadata.resource_version
+                    if event["type"] != "BOOKMARK":
+                        self._dispatch(event["type"], self.transform(obj))
+                    if self._stop.is_set():
+                        return
+            except ApiException as e:
+                if e.status == 410:
+                    logger.info("Watch expired, relisting", informer=self.name)
+                else:
+                    logger.error("Watch failed", informer=self.name, error=str(e))
+                    self._stop.wait(5)
+                try:
+                    self._relist()
+                except ApiException as relist_error:
+                    logger.error("Relist failed", informer=self.name, error=str(relist_error))
+                    self._stop.wait(5)
+            except Exception as e:
+                logger.error("Watch stream interrupted", informer=self.name, error=str(e))
+                self._stop.wait(5)
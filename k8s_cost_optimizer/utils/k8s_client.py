@@ -1,9 +1,48 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 from .logger import logger
+from .outbound import EVICTION, CallPolicy, CircuitOpenError, OutboundGuard
+
+FIELD_MANAGER = "k8s-cost-optimizer"
+
+# Matches pods in a terminal phase (Succeeded or Failed); evaluated by the API server.
+FINISHED_POD_FIELD_SELECTOR = "status.phase!=Running,status.phase!=Pending,status.phase!=Unknown"
+
+def _status_message(e: ApiException) -> Optional[str]:
+    try:
+        return json.loads(e.body).get("message")
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+class GuardedApiClient(client.ApiClient):
+    """ApiClient whose HTTP calls go through an OutboundGuard. Streaming (watch) responses return
+    as soon as headers arrive, so watches only hold a concurrency slot while connecting."""
+
+    def __init__(self, guard: OutboundGuard):
+        super().__init__()
+        self.guard = guard
+        self.list_policy = guard.policy._replace(latency_target=guard.limits.list_latency_target_seconds)
+
+    def _policy(self, resource_path: str, method: str) -> CallPolicy:
+        if resource_path.endswith("/eviction"):
+            return EVICTION
+        if method == "GET" and "{name}" not in resource_path:  # collection reads, e.g. full pod lists
+            return self.list_policy
+        return self.guard.policy
+
+    def call_api(self, resource_path, method, *args, **kwargs):
+        try:
+            return self.guard.call_with(self._policy(resource_path, method), super().call_api, resource_path, method, *args, **kwargs)
+        except CircuitOpenError as e:
+            raise ApiException(status=503, reason=str(e))
 
 class KubernetesClient:
-    def __init__(self):
+    def __init__(self, delete_concurrency: int = 20, page_size: int = 5000, guard: Optional[OutboundGuard] = None):
+        self.delete_concurrency = delete_concurrency
+        self.page_size = page_size
         try:
             config.load_incluster_config()
             self.in_cluster = True
@@ -11,9 +50,11 @@ class KubernetesClient:
             config.load_kube_config()
             self.in_cluster = False
         
-        self.core_v1 = client.CoreV1Api()
-        self.apps_v1 = client.AppsV1Api()
-        self.autoscaling_v2 = client.AutoscalingV2Api()
+        api_client = GuardedApiClient(guard) if guard else None
+        self.core_v1 = client.CoreV1Api(api_client)
+        self.apps_v1 = client.AppsV1Api(api_client)
+        self.autoscaling_v2 = client.AutoscalingV2Api(api_client)
+        self.batch_v1 = client.BatchV1Api(api_client)
         logger.info("Kubernetes client initialized", mode="in-cluster" if self.in_cluster else "kube-config")
 
     def get_nodes(self) -> list:
@@ -23,37 +64,58 @@ class KubernetesClient:
             logger.error("Failed to get nodes", error=str(e))
             return []
 
-    def get_all_pods(self) -> list:
+    def list_namespaces(self) -> list:
         try:
-            return self.core_v1.list_pod_for_all_namespaces().items
+            return [ns.metadata.name for ns in self.core_v1.list_namespace().items]
+        except ApiException as e:
+            logger.error("Failed to list namespaces", error=str(e))
+            return []
+
+    def _paginate(self, list_fn, **kwargs) -> list:
+        items, token = [], None
+        while True:
+            page = list_fn(_continue=token, **kwargs) if token else list_fn(**kwargs)
+            items.extend(page.items)
+            token = page.metadata._continue
+            if not token:
+                return items
+
+    def _list_scoped(self, list_all, list_namespaced, namespaces: Optional[Iterable[str]], **kwargs) -> list:
+        """Lists across the cluster when `namespaces` is None, otherwise only within the given namespaces."""
+        if namespaces is None:
+            return self._paginate(list_all, **kwargs)
+        items = []
+        for namespace in sorted(namespaces):
+            items.extend(self._paginate(list_namespaced, namespace=namespace, **kwargs))
+        return items
+
+    def get_all_pods(self, namespaces: Optional[Iterable[str]] = None) -> list:
+        try:
+            return self._list_scoped(
+                self.core_v1.list_pod_for_all_namespaces, self.core_v1.list_namespaced_pod, namespaces
+            )
         except ApiException as e:
             logger.error("Failed to get pods", error=str(e))
             return []
 
-    def get_unbound_pvcs(self) -> list:
+    def get_finished_pods(self, namespaces: Optional[Iterable[str]] = None) -> list:
+        """Succeeded/Failed pods, filtered server-side and fetched in pages."""
         try:
-            pvcs = self.core_v1.list_persistent_volume_claim_for_all_namespaces().items
-            mounted_claims = set()
-            all_pods = self.get_all_pods()
-
-            for pod in all_pods:
-                if pod.spec.volumes:
-                    for volume in pod.spec.volumes:
-                        if volume.persistent_volume_claim:
-                            mounted_claims.add(f"{pod.metadata.namespace}/{volume.persistent_volume_claim.claim_name}")
-            
-            unbound_pvcs = [
-                pvc for pvc in pvcs
-                if pvc.status.phase != "Bound" or f"{pvc.metadata.namespace}/{pvc.metadata.name}" not in mounted_claims
-            ]
-            return unbound_pvcs
+            return self._list_scoped(
+                self.core_v1.list_pod_for_all_namespaces, self.core_v1.list_namespaced_pod, namespaces,
+                field_selector=FINISHED_POD_FIELD_SELECTOR, limit=self.page_size,
+            )
         except ApiException as e:
-            logger.error("Failed to get unbound PVCs", error=str(e))
+            logger.error("Failed to get finished pods", error=str(e))
             return []
 
-    def list_hpas(self) -> list:
+    def list_hpas(self, namespaces: Optional[Iterable[str]] = None) -> list:
         try:
-            return self.autoscaling_v2.list_horizontal_pod_autoscaler_for_all_namespaces().items
+            return self._list_scoped(
+                self.autoscaling_v2.list_horizontal_pod_autoscaler_for_all_namespaces,
+                self.autoscaling_v2.list_namespaced_horizontal_pod_autoscaler,
+                namespaces,
+            )
         except ApiException as e:
             logger.error("Failed to list HPAs", error=str(e))
             return []
@@ -67,6 +129,60 @@ class KubernetesClient:
             logger.error("Failed to delete pod", pod_name=name, namespace=namespace, error=str(e))
             return False
 
+    def delete_pods(self, pods: List[Tuple[str, str, Optional[str]]]) -> Dict[Tuple[str, str], Tuple[bool, str]]:
+        """Deletes many pods concurrently. Each entry is (namespace, name, uid); a uid precondition
+        makes sure a pod recreated under the same name since analysis is left alone."""
+        def _delete(entry: Tuple[str, str, Optional[str]]) -> Tuple[bool, str]:
+            namespace, name, uid = entry
+            body = client.V1DeleteOptions(preconditions=client.V1Preconditions(uid=uid)) if uid else None
+            try:
+                self.core_v1.delete_namespaced_pod(name=name, namespace=namespace, body=body)
+                return True, ""
+            except ApiException as e:
+                if e.status == 404:
+                    return True, "Pod was already deleted"
+                if e.status == 409:
+                    return False, "Pod was replaced since analysis (uid precondition failed)"
+                return False, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.delete_concurrency) as pool:
+            results = dict(zip(((ns, name) for ns, name, _ in pods), pool.map(_delete, pods)))
+        failed = sum(1 for ok, _ in results.values() if not ok)
+        logger.info("Bulk pod deletion finished", requested=len(pods), failed=failed)
+        return results
+
+    def apply_object(self, body: Dict, dry_run: bool = False, force: bool = False) -> Tuple[bool, str]:
+        """Server-side applies a partial manifest as FIELD_MANAGER. Supports the workload kinds and HPAs the agent tunes.
+
+        Without `force`, fields another manager owns are left alone and the conflict is returned as the message.
+        """
+        patchers = {
+            "Deployment": self.apps_v1.patch_namespaced_deployment,
+            "StatefulSet": self.apps_v1.patch_namespaced_stateful_set,
+            "DaemonSet": self.apps_v1.patch_namespaced_daemon_set,
+            "HorizontalPodAutoscaler": self.autoscaling_v2.patch_namespaced_horizontal_pod_autoscaler,
+        }
+        kind, meta = body["kind"], body["metadata"]
+        if kind not in patchers:
+            return False, f"Unsupported kind for server-side apply: {kind}"
+        try:
+            patchers[kind](
+                name=meta["name"], namespace=meta["namespace"], body=body,
+                field_manager=FIELD_MANAGER, force=force, dry_run="All" if dry_run else None,
+                _content_type="application/apply-patch+yaml",
+            )
+            if not dry_run:
+                logger.info("Applied object", kind=kind, name=meta["name"], namespace=meta["namespace"])
+            return True, ""
+        except ApiException as e:
+            if e.status == 409:
+                message = _status_message(e) or str(e)
+                logger.warning("Server-side apply conflicts with another field manager", kind=kind, name=meta["name"],
+                               namespace=meta["namespace"], conflict=message)
+                return False, f"Conflict with another field manager: {message}"
+            logger.error("Server-side apply failed", kind=kind, name=meta["name"], namespace=meta["namespace"], dry_run=dry_run, error=str(e))
+            return False, str(e)
+
     def delete_pvc(self, name: str, namespace: str) -> bool:
         try:
             self.core_v1.delete_namespaced_persistent_volume_claim(name=name, namespace=namespace)
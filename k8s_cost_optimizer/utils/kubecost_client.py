@@ -1,11 +1,29 @@
 import httpx
 import json
+from typing import Optional
 from .logger import logger
+from .outbound import CircuitOpenError, OutboundGuard
+
+class GuardedTransport(httpx.BaseTransport):
+    """Sends every request through an OutboundGuard; an open circuit surfaces as a transport error."""
+
+    def __init__(self, guard: OutboundGuard, transport: Optional[httpx.BaseTransport] = None):
+        self.guard = guard
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return self.guard.call(self.transport.handle_request, request)
+        except CircuitOpenError as e:
+            raise httpx.ConnectError(str(e), request=request)
+
+    def close(self) -> None:
+        self.transport.close()
 
 class KubecostClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, guard: Optional[OutboundGuard] = None):
         self.base_url = base_url
-        self.http_client = httpx.Client(timeout=20.0)
+        self.http_client = httpx.Client(timeout=20.0, transport=GuardedTransport(guard) if guard else None)
         logger.info("Kubecost client initialized", url=self.base_url)
 
     def get_total_monthly_cost(self) -> float:
@@ -50,3 +68,21 @@ class KubecostClient:
             logger.error("Failed to retrieve savings recommendations from Kubecost", error=str(e))
             return []
 
+    def _get_accumulated(self, path: str, params: dict) -> list:
+        """Fetches an accumulated Kubecost query and flattens its single {name: entry} set into a list."""
+        try:
+            response = self.http_client.get(f"{self.base_url}{path}", params={**params, "accumulate": "true"})
+            response.raise_for_status()
+            data = response.json().get('data') or []
+            entries = [entry for item in data if item for entry in item.values() if entry]
+            logger.info(f"Retrieved {len(entries)} entries from Kubecost {path}.")
+            return entries
+        except (httpx.RequestError, httpx.HTTPStatusError, json.JSONDecodeError, AttributeError) as e:
+            logger.error(f"Failed to retrieve {path} from Kubecost", error=str(e))
+            return []
+
+    def get_allocations(self, window: str = "7d", aggregate: str = "namespace,controller") -> list:
+        return self._get_accumulated("/model/allocation", {"window": window, "aggregate": aggregate})
+
+    def get_assets(self, window: str = "7d") -> list:
+        return self._get_accumulated("/model/assets", {"window": window})
@@ -0,0 +1,160 @@
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from pydantic import BaseModel, Field
+
+from .logger import logger
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class LeaseRecord(BaseModel):
+    name: str
+    holder: str
+    duration_seconds: int
+    acquire_time: datetime = Field(default_factory=_now)
+    renew_time: datetime = Field(default_factory=_now)
+    transitions: int = 0
+    labels: Dict[str, str] = {}
+    resource_version: Optional[str] = None
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return (now or _now()) > self.renew_time + timedelta(seconds=self.duration_seconds)
+
+class LeaseBackend(ABC):
+    """Minimal slice of the coordination.k8s.io Lease API needed for membership and leader election.
+
+    `create` and `replace` must be atomic: they return False when another writer got there
+    first (name already exists, or resource_version is stale), mirroring a 409 from the API server.
+    """
+
+    @abstractmethod
+    def get(self, name: str) -> Optional[LeaseRecord]:
+        pass
+
+    @abstractmethod
+    def create(self, record: LeaseRecord) -> bool:
+        pass
+
+    @abstractmethod
+    def replace(self, record: LeaseRecord) -> bool:
+        pass
+
+    @abstractmethod
+    def list(self, label_selector: Dict[str, str]) -> List[LeaseRecord]:
+        pass
+
+class InMemoryLeaseBackend(LeaseBackend):
+    """Local stand-in for the Lease API; several coordinators can share one instance."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases: Dict[str, LeaseRecord] = {}
+        self._version = 0
+
+    def _store(self, record: LeaseRecord) -> None:
+        self._version += 1
+        self._leases[record.name] = record.model_copy(update={"resource_version": str(self._version)})
+
+    def get(self, name: str) -> Optional[LeaseRecord]:
+        with self._lock:
+            record = self._leases.get(name)
+            return record.model_copy() if record else None
+
+    def create(self, record: LeaseRecord) -> bool:
+        with self._lock:
+            if record.name in self._leases:
+                return False
+            self._store(record)
+            return True
+
+    def replace(self, record: LeaseRecord) -> bool:
+        with self._lock:
+            current = self._leases.get(record.name)
+            if current is None or current.resource_version != record.resource_version:
+                return False
+            self._store(record)
+            return True
+
+    def list(self, label_selector: Dict[str, str]) -> List[LeaseRecord]:
+        with self._lock:
+            return [
+                r.model_copy() for r in self._leases.values()
+                if all(r.labels.get(k) == v for k, v in label_selector.items())
+            ]
+
+class KubernetesLeaseBackend(LeaseBackend):
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.coordination_v1 = client.CoordinationV1Api()
+
+    def _to_record(self, lease) -> LeaseRecord:
+        spec = lease.spec
+        return LeaseRecord(
+            name=lease.metadata.name,
+            holder=spec.holder_identity or "",
+            duration_seconds=spec.lease_duration_seconds or 0,
+            acquire_time=spec.acquire_time or _now(),
+            renew_time=spec.renew_time or datetime.min.replace(tzinfo=timezone.utc),
+            transitions=spec.lease_transitions or 0,
+            labels=lease.metadata.labels or {},
+            resource_version=lease.metadata.resource_version,
+        )
+
+    def _to_body(self, record: LeaseRecord) -> client.V1Lease:
+        return client.V1Lease(
+            metadata=client.V1ObjectMeta(
+                name=record.name,
+                namespace=self.namespace,
+                labels=record.labels,
+                resource_version=record.resource_version,
+            ),
+            spec=client.V1LeaseSpec(
+                holder_identity=record.holder,
+                lease_duration_seconds=record.duration_seconds,
+                acquire_time=record.acquire_time,
+                renew_time=record.renew_time,
+                lease_transitions=record.transitions,
+            ),
+        )
+
+    def get(self, name: str) -> Optional[LeaseRecord]:
+        try:
+            return self._to_record(self.coordination_v1.read_namespaced_lease(name=name, namespace=self.namespace))
+        except ApiException as e:
+            if e.status != 404:
+                logger.error("Failed to read lease", lease=name, error=str(e))
+            return None
+
+    def create(self, record: LeaseRecord) -> bool:
+        try:
+            self.coordination_v1.create_namespaced_lease(namespace=self.namespace, body=self._to_body(record))
+            return True
+        except ApiException as e:
+            if e.status != 409:
+                logger.error("Failed to create lease", lease=record.name, error=str(e))
+            return False
+
+    def replace(self, record: LeaseRecord) -> bool:
+        try:
+            self.coordination_v1.replace_namespaced_lease(
+                name=record.name, namespace=self.namespace, body=self._to_body(record)
+            )
+            return True
+        except ApiException as e:
+            if e.status != 409:
+                logger.error("Failed to replace lease", lease=record.name, error=str(e))
+            return False
+
+    def list(self, label_selector: Dict[str, str]) -> List[LeaseRecord]:
+        selector = ",".join(f"{k}={v}" for k, v in label_selector.items())
+        try:
+            leases = self.coordination_v1.list_namespaced_lease(namespace=self.namespace, label_selector=selector).items
+            return [self._to_record(lease) for lease in leases]
+        except ApiException as e:
+            logger.error("Failed to list leases", selector=selector, error=str(e))
+            return []
@@ -0,0 +1,233 @@
+import random
+import re
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from k8s_cost_optimizer.config import DependencyLimits
+from .logger import logger
+
+class Outcome(str, Enum):
+    OK = "ok"
+    OVERLOAD = "overload"  # 429/503: back off and retry
+    ERROR = "error"  # other 5xx, connection errors, timeouts: counts against the circuit
+    TOO_HEAVY = "too_heavy"  # timeout/429/503 of a call whose caller splits the work and retries itself
+
+class CircuitOpenError(Exception):
+    def __init__(self, dependency: str):
+        super().__init__(f"Circuit for {dependency} is open; failing fast")
+        self.dependency = dependency
+
+_STATUS_IN_MESSAGE = re.compile(r"Status Code (\d{3})")
+
+def classify(result: Any, exc: Optional[BaseException]) -> Outcome:
+    """Maps a call's response or exception onto an Outcome, for any of the clients the agent uses."""
+    source = exc if exc is not None else result
+    status = next((v for v in (getattr(source, "status", None), getattr(source, "status_code", None)) if isinstance(v, int)), None)
+    if status is None and exc is not None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+        if status is None:
+            match = _STATUS_IN_MESSAGE.search(str(exc))  # prometheus_api_client only reports it in the message
+            status = int(match.group(1)) if match else None
+    if status in (429, 503):
+        return Outcome.OVERLOAD
+    if (status is not None and status >= 500) or (status is None and exc is not None):
+        return Outcome.ERROR
+    return Outcome.OK
+
+def _is_timeout(exc: Optional[BaseException]) -> bool:
+    # requests, httpx and urllib3 each have their own timeout classes; all are named *Timeout*.
+    return exc is not None and (isinstance(exc, TimeoutError) or any("Timeout" in c.__name__ for c in type(exc).__mro__))
+
+def classify_splittable(result: Any, exc: Optional[BaseException]) -> Outcome:
+    """For sharded queries: a timeout or overload means the shard was too heavy, which the query
+    planner answers by splitting it. Retrying it whole or opening the circuit would only get in the way."""
+    outcome = classify(result, exc)
+    if outcome == Outcome.OVERLOAD or (outcome == Outcome.ERROR and _is_timeout(exc)):
+        return Outcome.TOO_HEAVY
+    return outcome
+
+def classify_eviction(result: Any, exc: Optional[BaseException]) -> Outcome:
+    """The Eviction API answers 429 when a PodDisruptionBudget blocks the eviction; that is a
+    decision about the pod, not a sign the API server is overloaded."""
+    if getattr(exc, "status", None) == 429:
+        return Outcome.OK
+    return classify(result, exc)
+
+class CallPolicy(NamedTuple):
+    """Per-call overrides of how a guard judges a call."""
+    classifier: Callable[[Any, Optional[BaseException]], Outcome] = classify
+    latency_target: Optional[float] = None  # seconds; None uses the dependency's target
+
+SPLITTABLE_QUERY = CallPolicy(classifier=classify_splittable)
+EVICTION = CallPolicy(classifier=classify_eviction)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: +1/limit per fast success, halved on overload, errors or slow calls
+    (at most once per latency target, so one burst of failures only halves it once)."""
+
+    def __init__(self, limits: DependencyLimits):
+        self.min_limit = limits.min_concurrency
+        self.max_limit = limits.max_concurrency
+        self.latency_target = limits.latency_target_seconds
+        self.limit = float(limits.initial_concurrency)
+        self.inflight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+    def release(self, latency: float, outcome: Outcome, latency_target: Optional[float] = None) -> None:
+        latency_target = latency_target or self.latency_target
+        with self._cond:
+            self.inflight -= 1
+            now = time.monotonic()
+            if outcome != Outcome.OK or latency > latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True  # exactly one trial call decides whether to close again
+                return True
+            return False
+
+    def record(self, outcome: Outcome) -> Optional[str]:
+        """Updates the state; returns the new state when it changed."""
+        with self._lock:
+            previous = self.state
+            if outcome == Outcome.ERROR:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self.state, self.opened_at = self.OPEN, time.monotonic()
+            elif outcome == Outcome.OK:
+                self.failures = 0
+                self.state = self.CLOSED
+            if self.state == self.HALF_OPEN:
+                self._trial_running = False
+            return self.state if self.state != previous else None
+
+class OutboundGuard:
+    """Token bucket, adaptive concurrency limit, retry on overload and circuit breaker for one dependency."""
+
+    def __init__(self, name: str, limits: DependencyLimits, classifier: Callable[[Any, Optional[BaseException]], Outcome] = classify):
+        self.name = name
+        self.limits = limits
+        self.policy = CallPolicy(classifier=classifier)
+        self.bucket = TokenBucket(limits.rate, limits.burst)
+        self.limiter = AdaptiveConcurrencyLimiter(limits)
+        self.breaker = CircuitBreaker(limits.failure_threshold, limits.reset_timeout_seconds)
+        self.counts = {outcome.value: 0 for outcome in Outcome}
+        self.counts.update(rejected=0, retried=0)
+        self._counts_lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._counts_lock:
+            self.counts[key] += 1
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        return self.call_with(self.policy, fn, *args, **kwargs)
+
+    def call_with(self, policy: CallPolicy, fn: Callable, *args, **kwargs) -> Any:
+        for attempt in range(self.limits.max_retries + 1):
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise CircuitOpenError(self.name)
+            self.bucket.acquire()
+            self.limiter.acquire()
+            result, exc = None, None
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                exc = e
+            outcome = policy.classifier(result, exc)
+            self.limiter.release(time.monotonic() - started, outcome, policy.latency_target)
+            changed = self.breaker.record(outcome)
+            if changed:
+                logger.warning("Circuit state changed", dependency=self.name, state=changed)
+            self._count(outcome.value)
+
+            if outcome == Outcome.OVERLOAD and attempt < self.limits.max_retries:
+                self._count("retried")
+                time.sleep(random.uniform(0, min(10.0, 0.5 * 2 ** attempt)))  # full-jitter backoff
+                continue
+            if exc is not None:
+                raise exc
+            return result
+
+    def _counts_copy(self) -> Dict[str, int]:
+        with self._counts_lock:
+            return dict(self.counts)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "inflight": self.limiter.inflight,
+            "tokens": round(self.bucket.tokens, 2),
+            "calls": self._counts_copy(),
+        }
+
+class OutboundRegistry:
+    """One guard per outbound dependency, shared by every client that talks to it."""
+
+    def __init__(self, limits: Dict[str, DependencyLimits]):
+        self.guards = {name: OutboundGuard(name, dependency_limits) for name, dependency_limits in limits.items()}
+
+    def guard(self, name: str) -> OutboundGuard:
+        return self.guards[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: guard.snapshot() for name, guard in self.guards.items()}
+
+    def open_circuits(self) -> List[str]:
+        return [name for name, guard in self.guards.items() if guard.breaker.state == CircuitBreaker.OPEN]
\ No newline at end of file
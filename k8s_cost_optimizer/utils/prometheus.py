@@ -1,8 +1,16 @@
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
 from prometheus_api_client import PrometheusConnect
 from .logger import logger
+from .outbound import SPLITTABLE_QUERY, CircuitOpenError, OutboundGuard
+from .query_planner import ShardedQueryPlanner, ShardedResult
 
 class PrometheusClient:
-    def __init__(self, url: str, timeout: int):
+    def __init__(self, url: str, timeout: int, query_concurrency: int = 8, query_shards: int = 8,
+                 guard: Optional[OutboundGuard] = None):
+        self.timeout = timeout
+        self.guard = guard
+        self.planner = ShardedQueryPlanner(concurrency=query_concurrency, shard_count=query_shards)
         self.client = None
         try:
             self.client = PrometheusConnect(url=url, disable_ssl=True)
@@ -15,11 +23,49 @@ class PrometheusClient:
             logger.error("Prometheus client initialization failed", error=str(e))
             self.client = None
 
-    def query(self, query: str):
+    def _call(self, fn, splittable: bool = False, **kwargs):
+        if not self.guard:
+            return fn(**kwargs)
+        # Sharded queries are retried by the planner splitting them, not by the guard.
+        return self.guard.call_with(SPLITTABLE_QUERY, fn, **kwargs) if splittable else self.guard.call(fn, **kwargs)
+
+    def query(self, query: str, splittable: bool = False):
         if not self.client:
             return None
         try:
-            return self.client.custom_query(query=query)
+            return self._call(self.client.custom_query, splittable, query=query, timeout=self.timeout)
+        except CircuitOpenError:
+            if splittable:
+                raise
+            logger.error("Prometheus query skipped, circuit open", query=query)
+            return None
         except Exception as e:
             logger.error("Prometheus query failed", query=query, error=str(e))
-            return None
\ No newline at end of file
+            return None
+
+    def query_range(self, query: str, start: datetime, end: datetime, step_seconds: int, splittable: bool = False):
+        if not self.client:
+            return None
+        try:
+            return self._call(
+                self.client.custom_query_range, splittable,
+                query=query, start_time=start, end_time=end, step=str(step_seconds), timeout=self.timeout
+            )
+        except CircuitOpenError:
+            if splittable:
+                raise
+            logger.error("Prometheus range query skipped, circuit open", query=query)
+            return None
+        except Exception as e:
+            logger.error("Prometheus range query failed", query=query, error=str(e))
+            return None
+
+    def query_sharded(self, build_query: Callable[[str], str], namespaces: Iterable[str],
+                      weights: Optional[Dict[str, float]] = None) -> ShardedResult:
+        """Instant query split by namespace; `build_query` receives the namespace label matcher."""
+        return self.planner.run(lambda q: self.query(q, splittable=True), build_query, namespaces, weights)
+
+    def query_range_sharded(self, build_query: Callable[[str], str], start: datetime, end: datetime, step_seconds: int,
+                            namespaces: Iterable[str], weights: Optional[Dict[str, float]] = None) -> ShardedResult:
+        return self.planner.run(lambda q: self.query_range(q, start, end, step_seconds, splittable=True),
+                                build_query, namespaces, weights)
\ No newline at end of file
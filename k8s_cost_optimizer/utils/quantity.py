@@ -0,0 +1,7 @@
+from functools import lru_cache
+from kubernetes.utils import parse_quantity
+
+@lru_cache(maxsize=8192)
+def quantity(value: str) -> float:
+    """Kubernetes quantity string ("250m", "1Gi") as a float; cached since the same values repeat across objects."""
+    return float(parse_quantity(value))
\ No newline at end of file
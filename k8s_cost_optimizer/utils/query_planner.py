@@ -0,0 +1,95 @@
+import heapq
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from .logger import logger
+from .outbound import CircuitOpenError
+
+def namespace_matcher(namespaces: Iterable[str]) -> str:
+    """PromQL label matcher restricting a selector to `namespaces`."""
+    # Namespace names are DNS labels, so they need no regex escaping.
+    return f', namespace=~"{"|".join(sorted(namespaces))}"'
+
+class ShardedResult(BaseModel):
+    series: List[dict] = []
+    failed_namespaces: List[str] = []
+    shards: int = 0  # queries actually issued, including retries
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed_namespaces
+
+def partition(namespaces: List[str], weights: Dict[str, float], shard_count: int) -> List[List[str]]:
+    """Splits namespaces into at most `shard_count` groups of similar total weight (largest first)."""
+    shard_count = max(1, min(shard_count, len(namespaces)))
+    heap = [(0.0, i) for i in range(shard_count)]
+    groups: List[List[str]] = [[] for _ in range(shard_count)]
+    for ns in sorted(namespaces, key=lambda n: (-weights.get(n, 1.0), n)):
+        load, i = heapq.heappop(heap)
+        groups[i].append(ns)
+        heapq.heappush(heap, (load + weights.get(ns, 1.0), i))
+    return [g for g in groups if g]
+
+class ShardedQueryPlanner:
+    """Runs one PromQL expression as several namespace-restricted queries in parallel.
+
+    Expressions that aggregate per series (quantile_over_time, rate, plain selectors) give the same
+    answer whether evaluated once or per disjoint namespace shard, so the results can simply be
+    concatenated. A shard that fails (query.max-samples, timeouts) is split in half and retried until
+    it is a single namespace; namespaces that still fail are reported instead of silently dropped.
+    Splitting is the only retry: once the dependency's circuit is open, remaining shards fail as-is.
+    """
+
+    def __init__(self, concurrency: int = 8, shard_count: int = 8):
+        self.concurrency = concurrency
+        self.shard_count = shard_count
+
+    def run(
+        self,
+        execute: Callable[[str], Optional[list]],
+        build_query: Callable[[str], str],
+        namespaces: Iterable[str],
+        weights: Optional[Dict[str, float]] = None,
+    ) -> ShardedResult:
+        """`build_query(matcher)` renders the expression for a namespace matcher; `execute(query)`
+        returns its series, or None on failure, and raises CircuitOpenError when the dependency is down."""
+        namespaces = sorted(set(namespaces))
+        result = ShardedResult()
+        if not namespaces:
+            return result
+        weights = weights or {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            running: Dict[Future, List[str]] = {}
+
+            def submit(shard: List[str]) -> None:
+                result.shards += 1
+                running[pool.submit(execute, build_query(namespace_matcher(shard)))] = shard
+
+            for shard in partition(namespaces, weights, self.shard_count):
+                submit(shard)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = running.pop(future)
+                    try:
+                        series = future.result()
+                    except CircuitOpenError:
+                        result.failed_namespaces.extend(shard)
+                        continue
+                    if series is not None:
+                        result.series.extend(series)
+                    elif len(shard) > 1:
+                        for half in partition(shard, weights, 2):
+                            submit(half)
+                    else:
+                        result.failed_namespaces.extend(shard)
+
+        log = logger.bind(shards=result.shards, namespaces=len(namespaces), series=len(result.series))
+        if result.failed_namespaces:
+            log.warning("Sharded query incomplete", failed_namespaces=sorted(result.failed_namespaces))
+        else:
+            log.debug("Sharded query complete")
+        return result
\ No newline at end of file
@@ -0,0 +1,109 @@
+from collections import defaultdict
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from k8s_cost_optimizer.models.action_record import ActionRecord
+from k8s_cost_optimizer.models.schemas import ActionStatus, OptimizationType
+
+GRANULARITIES = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d", "month": "%Y-%m"}
+RETENTION_SECONDS = {"hour": 35 * 86400, "day": 400 * 86400, "month": None}  # None: kept forever
+GROUP_BY_FIELDS = ("bucket", "type", "namespace", "status")
+GENERATED_STATUSES = (ActionStatus.PENDING.value, ActionStatus.APPROVED.value)
+DEFAULT_WINDOWS = {"hour": timedelta(hours=24), "day": timedelta(days=30), "month": timedelta(days=365)}
+MAX_BUCKETS = 2000
+_WINDOW = re.compile(r"^(\d+)([hd])$")
+
+Cells = Dict[str, float]  # "{type}|{namespace}|{status}|{metric}" -> value
+
+def bucket_of(granularity: str, timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).strftime(GRANULARITIES[granularity])
+
+def transition_cells(action: ActionRecord) -> Tuple[float, Cells]:
+    """The increments one status transition adds: the action entered `action.status` at the returned time.
+
+    Queued or auto-approved actions count at creation, executed/failed/rejected ones when they finished.
+    """
+    status = action.status.value
+    at = action.created_at if status in GENERATED_STATUSES or action.executed_at is None else action.executed_at
+    prefix = f"{action.type.value}|{action.namespace}|{status}|"
+    cells = {prefix + "count": 1.0, prefix + "estimated_savings": action.estimated_savings}
+    if action.status == ActionStatus.EXECUTED:
+        cells[prefix + "realized_savings"] = action.estimated_savings
+    return at, cells
+
+def parse_window(window: str) -> timedelta:
+    """"24h" or "7d" -> timedelta."""
+    match = _WINDOW.match(window.strip())
+    if not match:
+        raise ValueError(f"invalid window {window!r}; expected e.g. 24h or 7d")
+    amount, unit = int(match.group(1)), match.group(2)
+    return timedelta(hours=amount) if unit == "h" else timedelta(days=amount)
+
+def _utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def buckets_between(granularity: str, since: datetime, until: datetime) -> List[str]:
+    fmt = GRANULARITIES[granularity]
+    since, until = _utc(since), _utc(until)
+    current = datetime.strptime(since.strftime(fmt), fmt)  # floor to the bucket start
+    buckets = []
+    while current <= until:
+        buckets.append(current.strftime(fmt))
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f"window spans more than {MAX_BUCKETS} {granularity} buckets; use a coarser granularity")
+        if granularity == "hour":
+            current += timedelta(hours=1)
+        elif granularity == "day":
+            current += timedelta(days=1)
+        else:
+            current = current.replace(year=current.year + current.month // 12, month=current.month % 12 + 1)
+    return buckets
+
+class RollupQuery(BaseModel):
+    granularity: str = "day"
+    since: datetime
+    until: datetime
+    group_by: List[str] = []
+    type: Optional[OptimizationType] = None
+    namespace: Optional[str] = None
+    status: Optional[ActionStatus] = None
+
+    def buckets(self) -> List[str]:
+        if self.granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        unknown = set(self.group_by) - set(GROUP_BY_FIELDS)
+        if unknown:
+            raise ValueError(f"cannot group by {', '.join(sorted(unknown))}")
+        return buckets_between(self.granularity, self.since, self.until)
+
+def aggregate(cells_by_bucket: Iterable[Tuple[str, Cells]], query: RollupQuery) -> List[Dict]:
+    """Sums pre-aggregated cells into one row per group.
+
+    Each row has `counts` per status entered, `estimated_savings` of the actions generated (queued or
+    auto-approved) and `realized_savings` of the ones executed, within the window.
+    """
+    groups: Dict[tuple, Dict] = {}
+    for bucket, cells in cells_by_bucket:
+        for field, value in cells.items():
+            action_type, namespace, status, metric = field.rsplit("|", 3)
+            if (query.type and action_type != query.type.value) or (query.namespace and namespace != query.namespace) \
+                    or (query.status and status != query.status.value):
+                continue
+            dims = {"bucket": bucket, "type": action_type, "namespace": namespace, "status": status}
+            key = tuple(dims[g] for g in query.group_by)
+            row = groups.get(key)
+            if row is None:
+                row = groups[key] = {**{g: dims[g] for g in query.group_by},
+                                     "counts": defaultdict(int), "estimated_savings": 0.0, "realized_savings": 0.0}
+            if metric == "count":
+                row["counts"][status] += int(value)
+            elif metric == "realized_savings":
+                row["realized_savings"] += value
+            elif status in GENERATED_STATUSES:
+                row["estimated_savings"] += value
+    return [{**row, "counts": dict(row["counts"]),
+             "estimated_savings": round(row["estimated_savings"], 2), "realized_savings": round(row["realized_savings"], 2)}
+            for _, row in sorted(groups.items())]
\ No newline at end of file
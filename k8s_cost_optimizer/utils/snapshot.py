@@ -0,0 +1,425 @@
+import json
+import mmap
+import os
+import secrets
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope
+from .informer import object_key
+from .logger import logger
+from .query_planner import ShardedResult
+from .volume_index import ClaimInfo
+
+# --- projections: only the fields the analysis reads ---
+_ = True  # leaf, kept as plain JSON
+_TIME = "datetime"  # leaf, restored as a datetime
+
+_CONTAINER = {"name": _, "resources": {"requests": _}}
+_CONTAINER_STATUS = {"state": {"terminated": {"finished_at": _TIME}}}
+
+NODE_FIELDS = {
+    "metadata": {"name": _, "labels": _},
+    "spec": {"unschedulable": _, "taints": [{"key": _, "value": _, "effect": _}]},
+    "status": {"allocatable": _, "conditions": [{"type": _, "status": _}]},
+}
+POD_FIELDS = {
+    "metadata": {"name": _, "namespace": _, "uid": _, "annotations": _, "owner_references": [{"kind": _, "name": _}]},
+    "spec": {
+        "node_name": _,
+        "containers": [_CONTAINER],
+        "init_containers": [_CONTAINER],
+        "overhead": _,
+        "tolerations": [{"key": _, "operator": _, "value": _, "effect": _}],
+        "node_selector": _,
+        "affinity": {
+            "node_affinity": {"required_during_scheduling_ignored_during_execution": {"node_selector_terms": [
+                {"match_expressions": [{"key": _, "operator": _, "values": _}], "match_fields": _},
+            ]}},
+            "pod_affinity": {"required_during_scheduling_ignored_during_execution": _},
+            "pod_anti_affinity": {"required_during_scheduling_ignored_during_execution": _},
+        },
+    },
+    "status": {
+        "phase": _,
+        "container_statuses": [_CONTAINER_STATUS],
+        "init_container_statuses": [_CONTAINER_STATUS],
+        "ephemeral_container_statuses": [_CONTAINER_STATUS],
+        "conditions": [{"last_transition_time": _TIME}],
+    },
+}
+HPA_FIELDS = {
+    "metadata": {"name": _, "namespace": _},
+    "spec": {"min_replicas": _, "max_replicas": _, "scale_target_ref": {"kind": _, "name": _}},
+    "status": {"current_replicas": _, "desired_replicas": _},
+}
+OBJECT_FIELDS = {"nodes": NODE_FIELDS, "pods": POD_FIELDS, "hpas": HPA_FIELDS}
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "to_dict"):
+        return _plain(value.to_dict())
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+def project(obj: Any, fields: Any) -> Any:
+    """Reduces a client model object to the JSON-ready subset described by `fields`."""
+    if obj is None:
+        return None
+    if isinstance(fields, dict):
+        return {f: v for f, spec in fields.items() if (v := project(getattr(obj, f, None), spec)) is not None}
+    if isinstance(fields, list):
+        return [project(item, fields[0]) for item in obj]
+    return _plain(obj)
+
+def restore(value: Any, fields: Any) -> Any:
+    """Inverse of `project`: attribute-style objects on which unrecorded-but-projected fields read as None."""
+    if value is None:
+        return None
+    if isinstance(fields, dict):
+        return SimpleNamespace(**{f: restore(value.get(f), spec) for f, spec in fields.items()})
+    if isinstance(fields, list):
+        return [restore(item, fields[0]) for item in value]
+    return datetime.fromisoformat(value) if fields == _TIME else value
+
+# --- recording ---
+_recorder: ContextVar[Optional["SnapshotRecorder"]] = ContextVar("snapshot_recorder", default=None)
+
+@contextmanager
+def recording(recorder: Optional["SnapshotRecorder"]) -> Iterator[None]:
+    """Makes `recorder` collect every input read in this context (LangGraph copies it into node threads)."""
+    token = _recorder.set(recorder)
+    try:
+        yield
+    finally:
+        _recorder.reset(token)
+
+def active_recorder() -> Optional["SnapshotRecorder"]:
+    return _recorder.get()
+
+MAGIC = b"K8SSNAP1"
+VERSION = 1
+
+class SnapshotRecorder:
+    """Collects one analysis run's inputs and writes them as a snapshot file.
+
+    Layout: MAGIC, u64 header length, JSON header (section table and run metadata), then 8-byte aligned
+    sections: zlib-compressed JSON for objects and labels, and one raw little-endian float64 block
+    holding every Prometheus (timestamp, value) sample, which readers memory-map instead of parsing.
+    """
+
+    def __init__(self, run_id: str, scope: AnalysisScope):
+        self.run_id = run_id
+        self.scope = scope
+        self.captured_at = time.time()
+        self.objects: Dict[str, Dict[str, Any]] = {kind: {} for kind in OBJECT_FIELDS}
+        self.claims: Dict[str, Dict[str, Any]] = {}
+        self.queries: Dict[str, Dict[str, Any]] = {}
+        self.kubecost: Dict[str, Any] = {}
+        self.ai_analysis: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_objects(self, kind: str, objects: Iterable[Any]) -> None:
+        fields = OBJECT_FIELDS[kind]
+        projected = {object_key(obj): project(obj, fields) for obj in objects}
+        with self._lock:
+            self.objects[kind].update(projected)
+
+    def add_claims(self, claims: Iterable[ClaimInfo]) -> None:
+        with self._lock:
+            self.claims.update({f"{c.namespace}/{c.name}": c.model_dump() for c in claims})
+
+    def add_query(self, expression: str, result: ShardedResult, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, step_seconds: Optional[int] = None) -> None:
+        """Records a sharded query under its unrestricted expression; replays filter it by namespace."""
+        entry = {"range": start is not None, "series": []}
+        if start is not None:
+            entry.update(start=start.timestamp(), end=end.timestamp(), step=step_seconds)
+        for series in result.series:
+            samples = series.get("values") if start is not None else [series.get("value")]
+            entry["series"].append((series.get("metric", {}), np.asarray(samples or [], dtype=float).reshape(-1, 2)))
+        with self._lock:
+            previous = self.queries.get(expression)
+            if previous is not None:
+                entry["series"] = previous["series"] + entry["series"]
+            self.queries[expression] = entry
+
+    def add_kubecost(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.kubecost[key] = value
+
+    def write(self, directory: str) -> str:
+        with self._lock:
+            samples, index, offset = [], {}, 0
+            for expression, entry in self.queries.items():
+                described = []
+                for metric, values in entry["series"]:
+                    described.append({"metric": metric, "offset": offset, "length": len(values)})
+                    samples.append(values)
+                    offset += len(values)
+                index[expression] = {**{k: v for k, v in entry.items() if k != "series"}, "series": described}
+            sections = {
+                "samples": ("f8", np.concatenate(samples).astype("<f8").tobytes() if samples else b""),
+                "objects": ("json+zlib", _pack_json({kind: list(objs.values()) for kind, objs in self.objects.items()})),
+                "claims": ("json+zlib", _pack_json(list(self.claims.values()))),
+                "queries": ("json+zlib", _pack_json(index)),
+                "kubecost": ("json+zlib", _pack_json(self.kubecost)),
+            }
+            header = {
+                "version": VERSION, "run_id": self.run_id, "captured_at": self.captured_at,
+                "scope": self.scope.model_dump(mode="json"), "ai_analysis": self.ai_analysis, "sections": {},
+            }
+
+        position = 0
+        for name, (codec, data) in sections.items():
+            header["sections"][name] = [position, len(data), codec]
+            position += _aligned(len(data))
+        header_bytes = json.dumps(header).encode()
+        data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.run_id}-{secrets.token_hex(3)}.snap")
+        with open(path + ".tmp", "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+            f.write(b"\0" * (data_start - f.tell()))
+            for _, data in sections.values():
+                f.write(data + b"\0" * (_aligned(len(data)) - len(data)))
+        os.replace(path + ".tmp", path)  # readers never see a partial snapshot
+        return path
+
+def _aligned(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+def _pack_json(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode())
+
+# --- recording wrappers, installed when SNAPSHOT_RECORD_DIR is set ---
+class _Passthrough:
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+class RecordingKubernetesClient(_Passthrough):
+    def _listed(self, kind: str, objects: list) -> list:
+        recorder = active_recorder()
+        if recorder is not None:
+            recorder.add_objects(kind, objects)
+        return objects
+
+    def get_nodes(self) -> list:
+        return self._listed("nodes", self._target.get_nodes())
+
+    def get_all_pods(self, namespaces=None) -> list:
+        return self._listed("pods", self._target.get_all_pods(namespaces))
+
+    def get_finished_pods(self, namespaces=None) -> list:
+        return self._listed("pods", self._target.get_finished_pods(namespaces))
+
+    def list_hpas(self, namespaces=None) -> list:
+        return self._listed("hpas", self._target.list_hpas(namespaces))
+
+class RecordingPrometheusClient(_Passthrough):
+    def query_sharded(self, build_query, namespaces, weights=None) -> ShardedResult:
+        result = self._target.query_sharded(build_query, namespaces, weights)
+        recorder = active_recorder()
+        if recorder is not None:
+            recorder.add_query(build_query(""), result)
+        return result
+
+    def query_range_sharded(self, build_query, start, end, step_seconds, namespaces, weights=None) -> ShardedResult:
+        result = self._target.query_range_sharded(build_query, start, end, step_seconds, namespaces, weights)
+        recorder = active_recorder()
+        if recorder is not None:
+            recorder.add_query(build_query(""), result, start, end, step_seconds)
+        return result
+
+class RecordingKubecostClient(_Passthrough):
+    def _recorded(self, key: str, value: Any) -> Any:
+        recorder = active_recorder()
+        if recorder is not None:
+            recorder.add_kubecost(key, value)
+        return value
+
+    def get_total_monthly_cost(self) -> float:
+        return self._recorded("total_monthly_cost", self._target.get_total_monthly_cost())
+
+    def get_savings_recommendations(self) -> list:
+        return self._recorded("savings_recommendations", self._target.get_savings_recommendations())
+
+    def get_allocations(self, window: str = "7d", aggregate: str = "namespace,controller") -> list:
+        return self._recorded(f"allocations:{window}:{aggregate}", self._target.get_allocations(window, aggregate))
+
+    def get_assets(self, window: str = "7d") -> list:
+        return self._recorded(f"assets:{window}", self._target.get_assets(window))
+
+class RecordingVolumeIndex(_Passthrough):
+    def unreferenced_claims(self, scope: Optional[AnalysisScope] = None) -> List[ClaimInfo]:
+        claims = self._target.unreferenced_claims(scope)
+        recorder = active_recorder()
+        if recorder is not None:
+            recorder.add_claims(claims)
+        return claims
+
+# --- reading and replay ---
+class Snapshot:
+    """A recorded snapshot, memory-mapped. JSON sections are decoded on first use; Prometheus samples
+    are numpy views straight into the mapping."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        (header_length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._map[header_start:header_start + header_length])
+        if self.header["version"] != VERSION:
+            raise ValueError(f"unsupported snapshot version {self.header['version']}")
+        self._data_start = _aligned(header_start + header_length)
+        self._decoded: Dict[str, Any] = {}
+
+    @property
+    def run_id(self) -> str:
+        return self.header["run_id"]
+
+    @property
+    def captured_at(self) -> datetime:
+        return datetime.fromtimestamp(self.header["captured_at"], tz=timezone.utc)
+
+    @property
+    def scope(self) -> AnalysisScope:
+        return AnalysisScope.model_validate(self.header["scope"])
+
+    @property
+    def ai_analysis(self) -> Optional[str]:
+        return self.header.get("ai_analysis")
+
+    def clock(self) -> datetime:
+        return self.captured_at
+
+    def section(self, name: str) -> Any:
+        if name not in self._decoded:
+            offset, length, codec = self.header["sections"][name]
+            start = self._data_start + offset
+            if codec == "f8":
+                self._decoded[name] = np.frombuffer(self._map, dtype="<f8", count=length // 8, offset=start).reshape(-1, 2)
+            else:
+                self._decoded[name] = json.loads(zlib.decompress(self._map[start:start + length]))
+        return self._decoded[name]
+
+    def objects(self, kind: str) -> list:
+        return [restore(obj, OBJECT_FIELDS[kind]) for obj in self.section("objects").get(kind, [])]
+
+def _in_namespaces(objects: list, namespaces: Optional[Iterable[str]]) -> list:
+    if namespaces is None:
+        return list(objects)
+    namespaces = set(namespaces)
+    return [obj for obj in objects if obj.metadata.namespace in namespaces]
+
+class ReplayKubernetesClient:
+    """The `KubernetesClient` read methods used by analysis, answered from a snapshot.
+
+    Pods listed only through the finished-pod selector are all the snapshot has for their namespaces,
+    so replays should use the recorded scope or a narrower one.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.nodes = snapshot.objects("nodes")
+        self.pods = snapshot.objects("pods")
+        self.hpas = snapshot.objects("hpas")
+
+    def get_nodes(self) -> list:
+        return list(self.nodes)
+
+    def list_namespaces(self) -> list:
+        return sorted({obj.metadata.namespace for obj in self.pods + self.hpas})
+
+    def get_all_pods(self, namespaces: Optional[Iterable[str]] = None) -> list:
+        return _in_namespaces(self.pods, namespaces)
+
+    def get_finished_pods(self, namespaces: Optional[Iterable[str]] = None) -> list:
+        return [p for p in _in_namespaces(self.pods, namespaces) if p.status and p.status.phase in ("Succeeded", "Failed")]
+
+    def list_hpas(self, namespaces: Optional[Iterable[str]] = None) -> list:
+        return _in_namespaces(self.hpas, namespaces)
+
+class ReplayPrometheusClient:
+    """Sharded queries answered from recorded series, looked up by their unrestricted expression.
+
+    Range samples are shifted by the difference between the requested and the recorded start, so a
+    replay whose clock is pinned to the capture time lines up with the recorded window.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.queries = snapshot.section("queries")
+        self.samples = snapshot.section("samples")
+
+    def _replay(self, build_query: Callable[[str], str], namespaces: Iterable[str],
+                start: Optional[datetime] = None) -> ShardedResult:
+        namespaces = sorted(set(namespaces))
+        entry = self.queries.get(build_query(""))
+        if entry is None:
+            logger.warning("Query not in snapshot", query=build_query(""))
+            return ShardedResult(failed_namespaces=namespaces, shards=1)
+        wanted = set(namespaces)
+        shift = start.timestamp() - entry["start"] if start is not None and entry["range"] else 0.0
+        series = []
+        for described in entry["series"]:
+            if described["metric"].get("namespace") not in wanted:
+                continue
+            values = self.samples[described["offset"]:described["offset"] + described["length"]]
+            if entry["range"]:
+                if shift:
+                    values = values + (shift, 0.0)
+                series.append({"metric": described["metric"], "values": values})
+            elif len(values):
+                series.append({"metric": described["metric"], "value": values[0]})
+        return ShardedResult(series=series, shards=1)
+
+    def query_sharded(self, build_query, namespaces, weights=None) -> ShardedResult:
+        return self._replay(build_query, namespaces)
+
+    def query_range_sharded(self, build_query, start, end, step_seconds, namespaces, weights=None) -> ShardedResult:
+        return self._replay(build_query, namespaces, start)
+
+class ReplayKubecostClient:
+    """Recorded Kubecost responses; calls that were not recorded get the live client's fallbacks."""
+
+    def __init__(self, snapshot: Snapshot):
+        self.recorded = snapshot.section("kubecost")
+
+    def get_total_monthly_cost(self) -> float:
+        return self.recorded.get("total_monthly_cost", 1500.0)
+
+    def get_savings_recommendations(self) -> list:
+        return self.recorded.get("savings_recommendations", [])
+
+    def get_allocations(self, window: str = "7d", aggregate: str = "namespace,controller") -> list:
+        return self.recorded.get(f"allocations:{window}:{aggregate}", [])
+
+    def get_assets(self, window: str = "7d") -> list:
+        return self.recorded.get(f"assets:{window}", [])
+
+class ReplayVolumeIndex:
+    def __init__(self, snapshot: Snapshot):
+        self.claims = [ClaimInfo(**c) for c in snapshot.section("claims")]
+
+    def unreferenced_claims(self, scope: Optional[AnalysisScope] = None) -> List[ClaimInfo]:
+        scope = scope or AnalysisScope()
+        return [c for c in self.claims if scope.includes(c.namespace)]
\ No newline at end of file
@@ -0,0 +1,546 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from k8s_cost_optimizer.models.action_record import ActionRecord
+from k8s_cost_optimizer.models.schemas import ActionStatus, OptimizationRun, RunStatus, ShardClaim
+from .logger import logger
+from .rollups import GRANULARITIES, RETENTION_SECONDS, Cells, bucket_of, transition_cells
+
+FINISHED_STATUSES = (RunStatus.COMPLETED, RunStatus.FAILED)
+CLAIMABLE_STATUSES = (RunStatus.PENDING, RunStatus.RUNNING)
+EPOCH = datetime(1970, 1, 1)
+
+def pending_key(action: ActionRecord) -> Tuple:
+    """What an action recommends changing; rightsizing is per container, everything else per target."""
+    return action.type, action.namespace, action.target, getattr(action.details, "container", None)
+
+class StateStore(ABC):
+    """Runs, actions, the activity log and stats, shared by every agent replica.
+
+    Actions are stored once by id, as `ActionRecord`s; runs, the pending queue and the activity log
+    only reference them, so a status change made by any replica is visible everywhere. Runs are
+    returned without their actions; use `list_run_actions`. Queuing actions and recording activity
+    also update the savings rollups, so those always match the stored history.
+    """
+
+    # --- runs ---
+    @abstractmethod
+    def create_run(self, run: OptimizationRun) -> None:
+        pass
+
+    @abstractmethod
+    def get_run(self, run_id: str) -> Optional[OptimizationRun]:
+        pass
+
+    @abstractmethod
+    def list_runs(self) -> List[OptimizationRun]:
+        pass
+
+    @abstractmethod
+    def list_active_runs(self) -> List[OptimizationRun]:
+        pass
+
+    @abstractmethod
+    def list_run_actions(self, run_id: str) -> List[ActionRecord]:
+        pass
+
+    @abstractmethod
+    def iter_runs(self, since: Optional[float] = None, until: Optional[float] = None,
+                  batch_size: int = 500) -> Iterator[OptimizationRun]:
+        """Runs created in [since, until] (epoch seconds), oldest first, fetched in batches."""
+
+    @abstractmethod
+    def claim_shard(self, run_id: str, shard: str, worker: str, expected_owner: Optional[str] = None) -> bool:
+        """Marks an unfinished shard RUNNING under `worker` if its current owner is `expected_owner`
+        (None: unclaimed). A compare-and-set, so exactly one worker wins each claim or re-claim."""
+
+    @abstractmethod
+    def complete_shard(
+        self, run_id: str, shard: str, worker: str, status: RunStatus,
+        report: Optional[Dict[str, Any]], actions: List[ActionRecord]
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Records a shard result if `worker` still owns the shard; results of a shard that was
+        re-claimed meanwhile are dropped. Returns every shard's report once the last shard finishes, else None."""
+
+    @abstractmethod
+    def finalize_run(self, run_id: str, status: RunStatus, report: Dict[str, Any], detail: Optional[str] = None) -> None:
+        pass
+
+    # --- actions ---
+    @abstractmethod
+    def save_action(self, action: ActionRecord) -> None:
+        pass
+
+    @abstractmethod
+    def add_pending_actions(self, actions: List[ActionRecord]) -> None:
+        pass
+
+    @abstractmethod
+    def pop_pending_action(self, action_id: str) -> Optional[ActionRecord]:
+        pass
+
+    def queue_pending_actions(self, actions: List[ActionRecord]) -> List[ActionRecord]:
+        """Queues newly found actions, once per opportunity (see `pending_key`). An opportunity that
+        is already queued with the same recommendation keeps its action; a stale one is rejected as
+        superseded and replaced. Returns the actions actually queued."""
+        queued = {pending_key(a): a for a in self.list_pending_actions()}
+        fresh = []
+        for action in actions:
+            stale = queued.pop(pending_key(action), None)
+            if stale is not None and (stale.details, stale.estimated_savings) == (action.details, action.estimated_savings):
+                continue
+            if stale is not None and self.pop_pending_action(stale.id) is not None:
+                stale.status = ActionStatus.REJECTED
+                stale.error = f"Superseded by {action.id}"
+                self.record_activity(stale)
+            fresh.append(action)
+        self.add_pending_actions(fresh)
+        return fresh
+
+    @abstractmethod
+    def list_pending_actions(self) -> List[ActionRecord]:
+        pass
+
+    @abstractmethod
+    def count_pending_actions(self) -> int:
+        pass
+
+    @abstractmethod
+    def record_activity(self, action: ActionRecord) -> None:
+        pass
+
+    @abstractmethod
+    def list_activity(self, limit: int) -> List[ActionRecord]:
+        pass
+
+    @abstractmethod
+    def iter_actions(self, since: Optional[float] = None, until: Optional[float] = None,
+                     batch_size: int = 500) -> Iterator[ActionRecord]:
+        """Actions created in [since, until] (epoch seconds), oldest first, fetched in batches."""
+
+    @abstractmethod
+    def iter_activity(self, batch_size: int = 500) -> Iterator[ActionRecord]:
+        """The activity log, newest first, fetched in batches."""
+
+    # --- stats ---
+    @abstractmethod
+    def record_execution(self, savings: float) -> None:
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, float]:
+        pass
+
+    # --- rollups ---
+    @abstractmethod
+    def record_transitions(self, actions: List[ActionRecord]) -> None:
+        """Adds each action's current status to the hour/day/month rollup cells; O(1) per action."""
+
+    @abstractmethod
+    def get_rollups(self, granularity: str, buckets: List[str]) -> List[Tuple[str, Cells]]:
+        pass
+
+class InMemoryStateStore(StateStore):
+    """Process-local store; the default for a single replica and the stand-in for tests."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.runs: Dict[str, OptimizationRun] = {}
+        self.shard_reports: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.run_action_ids: Dict[str, List[str]] = {}
+        self.actions: Dict[str, ActionRecord] = {}
+        self.pending_ids: Dict[str, None] = {}  # insertion-ordered set
+        self.activity_ids: List[str] = []
+        self.stats = {"total_savings": 0.0, "actions_executed": 0}
+        self.rollups: Dict[Tuple[str, str], Cells] = {}
+
+    def create_run(self, run: OptimizationRun) -> None:
+        with self._lock:
+            self.runs[run.run_id] = run
+            self.shard_reports[run.run_id] = {}
+            self.run_action_ids[run.run_id] = []
+
+    def get_run(self, run_id: str) -> Optional[OptimizationRun]:
+        return self.runs.get(run_id)
+
+    def list_runs(self) -> List[OptimizationRun]:
+        return sorted(self.runs.values(), key=lambda r: r.run_id, reverse=True)
+
+    def list_active_runs(self) -> List[OptimizationRun]:
+        return [r for r in self.runs.values() if r.status not in FINISHED_STATUSES]
+
+    def list_run_actions(self, run_id: str) -> List[ActionRecord]:
+        return [self.actions[i] for i in self.run_action_ids.get(run_id, [])]
+
+    def iter_runs(self, since=None, until=None, batch_size=500) -> Iterator[OptimizationRun]:
+        for run in sorted(list(self.runs.values()), key=lambda r: r.created_at):
+            created = (run.created_at - EPOCH).total_seconds()
+            if (since is None or created >= since) and (until is None or created <= until):
+                yield run
+
+    def claim_shard(self, run_id: str, shard: str, worker: str, expected_owner: Optional[str] = None) -> bool:
+        with self._lock:
+            run = self.runs.get(run_id)
+            if run is None or run.shards.get(shard) not in CLAIMABLE_STATUSES:
+                return False
+            current = run.claims.get(shard)
+            if (current.owner if current else None) != expected_owner:
+                return False
+            run.claims[shard] = ShardClaim(owner=worker)
+            run.shards[shard] = RunStatus.RUNNING
+            run.status = RunStatus.RUNNING
+            return True
+
+    def complete_shard(self, run_id, shard, worker, status, report, actions):
+        with self._lock:
+            run = self.runs[run_id]
+            claim = run.claims.get(shard)
+            if claim is None or claim.owner != worker:
+                logger.warning("Dropping result of a shard claimed by another worker", run_id=run_id, shard=shard, worker=worker)
+                return None
+            for action in actions:
+                self.actions[action.id] = action
+            self.run_action_ids[run_id].extend(a.id for a in actions)
+            run.shards[shard] = status
+            self.shard_reports[run_id][shard] = report or {}
+            if all(s in FINISHED_STATUSES for s in run.shards.values()):
+                return dict(self.shard_reports[run_id])
+            return None
+
+    def finalize_run(self, run_id, status, report, detail=None) -> None:
+        with self._lock:
+            run = self.runs[run_id]
+            run.status = status
+            run.report = report
+            run.detail = detail
+            self.shard_reports.pop(run_id, None)
+
+    def save_action(self, action: ActionRecord) -> None:
+        self.actions[action.id] = action
+
+    def add_pending_actions(self, actions: List[ActionRecord]) -> None:
+        with self._lock:
+            for action in actions:
+                self.actions[action.id] = action
+                self.pending_ids[action.id] = None
+            self.record_transitions(actions)
+
+    def pop_pending_action(self, action_id: str) -> Optional[ActionRecord]:
+        with self._lock:
+            if action_id not in self.pending_ids:
+                return None
+            del self.pending_ids[action_id]
+            return self.actions[action_id]
+
+    def list_pending_actions(self) -> List[ActionRecord]:
+        return [self.actions[i] for i in list(self.pending_ids)]
+
+    def count_pending_actions(self) -> int:
+        return len(self.pending_ids)
+
+    def record_activity(self, action: ActionRecord) -> None:
+        with self._lock:
+            self.actions[action.id] = action
+            self.activity_ids.insert(0, action.id)  # Prepend to show newest first
+            self.record_transitions([action])
+
+    def list_activity(self, limit: int) -> List[ActionRecord]:
+        return [self.actions[i] for i in self.activity_ids[:limit]]
+
+    def iter_actions(self, since=None, until=None, batch_size=500) -> Iterator[ActionRecord]:
+        for action in sorted(list(self.actions.values()), key=lambda a: a.created_at):
+            if (since is None or action.created_at >= since) and (until is None or action.created_at <= until):
+                yield action
+
+    def iter_activity(self, batch_size=500) -> Iterator[ActionRecord]:
+        for action_id in list(self.activity_ids):
+            yield self.actions[action_id]
+
+    def record_execution(self, savings: float) -> None:
+        with self._lock:
+            self.stats["total_savings"] += savings
+            self.stats["actions_executed"] += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        return dict(self.stats)
+
+    def record_transitions(self, actions: List[ActionRecord]) -> None:
+        with self._lock:
+            for action in actions:
+                at, cells = transition_cells(action)
+                for granularity in GRANULARITIES:
+                    bucket = self.rollups.setdefault((granularity, bucket_of(granularity, at)), {})
+                    for field, value in cells.items():
+                        bucket[field] = bucket.get(field, 0.0) + value
+
+    def get_rollups(self, granularity: str, buckets: List[str]) -> List[Tuple[str, Cells]]:
+        with self._lock:
+            return [(b, dict(self.rollups[(granularity, b)])) for b in buckets if (granularity, b) in self.rollups]
+
+class RedisStateStore(StateStore):
+    """Store shared by all replicas. Keys:
+
+    run:{id}            run document (without actions/shards)
+    run:{id}:shards     hash shard -> RunStatus
+    run:{id}:claims     hash shard -> ShardClaim json (compare-and-set under WATCH)
+    run:{id}:reports    hash shard -> report json
+    run:{id}:actions    list of action ids
+    runs / runs:active  sorted set of all run ids / set of unfinished run ids
+    actions             hash action id -> action json
+    actions:index       sorted set of every action id (score = created_at), for exports
+    actions:pending     sorted set of pending action ids (score = insertion order)
+    activity            list of action ids, newest first
+    stats               hash of counters
+    rollup:{g}:{bucket} hash "{type}|{namespace}|{status}|{metric}" -> value, per hour/day/month bucket
+    """
+
+    def __init__(self, url: str, key_prefix: str):
+        import redis  # only needed when a shared store is configured
+
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = key_prefix
+        logger.info("Redis state store initialized", url=url)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def _load_actions(self, ids: List[str]) -> List[ActionRecord]:
+        if not ids:
+            return []
+        docs = self.redis.hmget(self._key("actions"), ids)
+        return [ActionRecord.from_dict(json.loads(doc)) for doc in docs if doc]
+
+    @staticmethod
+    def _dump_action(action: ActionRecord) -> str:
+        return json.dumps(action.to_dict())
+
+    def _write_actions(self, pipe: Any, actions: List[ActionRecord]) -> None:
+        pipe.hset(self._key("actions"), mapping={a.id: self._dump_action(a) for a in actions})
+        pipe.zadd(self._key("actions", "index"), {a.id: a.created_at for a in actions})
+
+    @staticmethod
+    def _dump_run(run: OptimizationRun) -> str:
+        return run.model_dump_json(exclude={"actions", "shards", "claims"})
+
+    def _load_runs(self, run_ids: List[str]) -> List[OptimizationRun]:
+        pipe = self.redis.pipeline()
+        for run_id in run_ids:
+            pipe.get(self._key("run", run_id))
+            pipe.hgetall(self._key("run", run_id, "shards"))
+            pipe.hgetall(self._key("run", run_id, "claims"))
+        replies = pipe.execute()
+        runs = []
+        for doc, shards, claims in zip(replies[::3], replies[1::3], replies[2::3]):
+            if doc:
+                run = OptimizationRun.model_validate_json(doc)
+                run.shards = {k: RunStatus(v) for k, v in shards.items()}
+                run.claims = {k: ShardClaim.model_validate_json(v) for k, v in claims.items()}
+                runs.append(run)
+        return runs
+
+    def create_run(self, run: OptimizationRun) -> None:
+        pipe = self.redis.pipeline()
+        pipe.set(self._key("run", run.run_id), self._dump_run(run))
+        if run.shards:
+            pipe.hset(self._key("run", run.run_id, "shards"), mapping={k: v.value for k, v in run.shards.items()})
+        pipe.zadd(self._key("runs"), {run.run_id: (run.created_at - EPOCH).total_seconds()})
+        pipe.sadd(self._key("runs", "active"), run.run_id)
+        pipe.execute()
+
+    def get_run(self, run_id: str) -> Optional[OptimizationRun]:
+        runs = self._load_runs([run_id])
+        return runs[0] if runs else None
+
+    def list_runs(self) -> List[OptimizationRun]:
+        return self._load_runs(self.redis.zrevrange(self._key("runs"), 0, -1))
+
+    def list_active_runs(self) -> List[OptimizationRun]:
+        return self._load_runs(sorted(self.redis.smembers(self._key("runs", "active"))))
+
+    def list_run_actions(self, run_id: str) -> List[ActionRecord]:
+        return self._load_actions(self.redis.lrange(self._key("run", run_id, "actions"), 0, -1))
+
+    def iter_runs(self, since=None, until=None, batch_size=500) -> Iterator[OptimizationRun]:
+        # The runs sorted set is scored by creation time, so the time range is resolved by Redis.
+        low, high = "-inf" if since is None else since, "+inf" if until is None else until
+        offset = 0
+        while True:
+            run_ids = self.redis.zrangebyscore(self._key("runs"), low, high, start=offset, num=batch_size)
+            if not run_ids:
+                return
+            yield from self._load_runs(run_ids)
+            offset += len(run_ids)
+
+    def _claim_owner(self, pipe: Any, run_id: str, shard: str) -> Optional[str]:
+        claim = pipe.hget(self._key("run", run_id, "claims"), shard)
+        return ShardClaim.model_validate_json(claim).owner if claim else None
+
+    def claim_shard(self, run_id: str, shard: str, worker: str, expected_owner: Optional[str] = None) -> bool:
+        shards_key, claims_key = self._key("run", run_id, "shards"), self._key("run", run_id, "claims")
+
+        def compare_and_set(pipe) -> bool:
+            status = pipe.hget(shards_key, shard)
+            if status is None or RunStatus(status) not in CLAIMABLE_STATUSES:
+                return False
+            if self._claim_owner(pipe, run_id, shard) != expected_owner:
+                return False
+            pipe.multi()
+            pipe.hset(claims_key, shard, ShardClaim(owner=worker).model_dump_json())
+            pipe.hset(shards_key, shard, RunStatus.RUNNING.value)
+            return True
+
+        if not self.redis.transaction(compare_and_set, shards_key, claims_key, value_from_callable=True):
+            return False
+        self._update_run(run_id, status=RunStatus.RUNNING)
+        return True
+
+    def complete_shard(self, run_id, shard, worker, status, report, actions):
+        shards_key = self._key("run", run_id, "shards")
+
+        def record(pipe) -> None:
+            if self._claim_owner(pipe, run_id, shard) != worker:
+                return
+            pipe.multi()
+            if actions:
+                self._write_actions(pipe, actions)
+                pipe.rpush(self._key("run", run_id, "actions"), *[a.id for a in actions])
+            pipe.hset(self._key("run", run_id, "reports"), shard, json.dumps(report or {}, default=str))
+            pipe.hset(shards_key, shard, status.value)
+            pipe.hgetall(shards_key)
+
+        replies = self.redis.transaction(record, self._key("run", run_id, "claims"))
+        if not replies:
+            logger.warning("Dropping result of a shard claimed by another worker", run_id=run_id, shard=shard, worker=worker)
+            return None
+        shards = replies[-1]
+        if not all(RunStatus(s) in FINISHED_STATUSES for s in shards.values()):
+            return None
+        reports = self.redis.hgetall(self._key("run", run_id, "reports"))
+        return {k: json.loads(v) for k, v in reports.items()}
+
+    def finalize_run(self, run_id, status, report, detail=None) -> None:
+        self._update_run(run_id, status=status, report=report, detail=detail)
+        pipe = self.redis.pipeline()
+        pipe.srem(self._key("runs", "active"), run_id)
+        pipe.delete(self._key("run", run_id, "reports"))
+        pipe.execute()
+
+    def _update_run(self, run_id: str, **fields) -> None:
+        key = self._key("run", run_id)
+
+        def update(pipe) -> None:
+            doc = pipe.get(key)
+            if not doc:
+                return
+            run = OptimizationRun.model_validate_json(doc).model_copy(update=fields)
+            pipe.multi()
+            pipe.set(key, self._dump_run(run))
+
+        self.redis.transaction(update, key)
+
+    def save_action(self, action: ActionRecord) -> None:
+        pipe = self.redis.pipeline()
+        self._write_actions(pipe, [action])
+        pipe.execute()
+
+    def add_pending_actions(self, actions: List[ActionRecord]) -> None:
+        if not actions:
+            return
+        pipe = self.redis.pipeline()
+        for action in actions:
+            pipe.incr(self._key("actions", "pending", "seq"))
+        self._write_actions(pipe, actions)
+        seqs = pipe.execute()[:len(actions)]
+        self.record_transitions(actions)
+        self.redis.zadd(self._key("actions", "pending"), {a.id: seq for a, seq in zip(actions, seqs)})
+
+    def pop_pending_action(self, action_id: str) -> Optional[ActionRecord]:
+        # ZREM returns 1 for exactly one caller, so concurrent approvals cannot both win.
+        if not self.redis.zrem(self._key("actions", "pending"), action_id):
+            return None
+        doc = self.redis.hget(self._key("actions"), action_id)
+        return ActionRecord.from_dict(json.loads(doc)) if doc else None
+
+    def list_pending_actions(self) -> List[ActionRecord]:
+        return self._load_actions(self.redis.zrange(self._key("actions", "pending"), 0, -1))
+
+    def count_pending_actions(self) -> int:
+        return self.redis.zcard(self._key("actions", "pending"))
+
+    def record_activity(self, action: ActionRecord) -> None:
+        pipe = self.redis.pipeline()
+        self._write_actions(pipe, [action])
+        pipe.lpush(self._key("activity"), action.id)
+        self._add_transitions(pipe, [action])
+        pipe.execute()
+
+    def list_activity(self, limit: int) -> List[ActionRecord]:
+        return self._load_actions(self.redis.lrange(self._key("activity"), 0, limit - 1))
+
+    def iter_actions(self, since=None, until=None, batch_size=500) -> Iterator[ActionRecord]:
+        # HSCAN may return a field more than once; the index yields each id exactly once, oldest first,
+        # and is scored by creation time, so the time range is resolved by Redis.
+        low, high = "-inf" if since is None else since, "+inf" if until is None else until
+        offset = 0
+        while True:
+            action_ids = self.redis.zrangebyscore(self._key("actions", "index"), low, high, start=offset, num=batch_size)
+            if not action_ids:
+                return
+            yield from self._load_actions(action_ids)
+            offset += len(action_ids)
+
+    def iter_activity(self, batch_size=500) -> Iterator[ActionRecord]:
+        start = 0
+        while True:
+            action_ids = self.redis.lrange(self._key("activity"), start, start + batch_size - 1)
+            if not action_ids:
+                return
+            yield from self._load_actions(action_ids)
+            start += len(action_ids)
+
+    def record_execution(self, savings: float) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hincrbyfloat(self._key("stats"), "total_savings", savings)
+        pipe.hincrby(self._key("stats"), "actions_executed", 1)
+        pipe.execute()
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = self.redis.hgetall(self._key("stats"))
+        return {
+            "total_savings": float(stats.get("total_savings", 0.0)),
+            "actions_executed": int(stats.get("actions_executed", 0)),
+        }
+
+    def _add_transitions(self, pipe: Any, actions: List[ActionRecord]) -> None:
+        for action in actions:
+            at, cells = transition_cells(action)
+            for granularity, retention in RETENTION_SECONDS.items():
+                key = self._key("rollup", granularity, bucket_of(granularity, at))
+                for field, value in cells.items():
+                    pipe.hincrbyfloat(key, field, value)
+                if retention:
+                    pipe.expire(key, retention)
+
+    def record_transitions(self, actions: List[ActionRecord]) -> None:
+        if not actions:
+            return
+        pipe = self.redis.pipeline()
+        self._add_transitions(pipe, actions)
+        pipe.execute()
+
+    def get_rollups(self, granularity: str, buckets: List[str]) -> List[Tuple[str, Cells]]:
+        pipe = self.redis.pipeline()
+        for bucket in buckets:
+            pipe.hgetall(self._key("rollup", granularity, bucket))
+        return [
+            (bucket, {field: float(value) for field, value in cells.items()})
+            for bucket, cells in zip(buckets, pipe.execute()) if cells
+        ]
+
+def build_state_store(redis_url: str, key_prefix: str) -> StateStore:
+    if redis_url:
+        return RedisStateStore(redis_url, key_prefix)
+    return InMemoryStateStore()
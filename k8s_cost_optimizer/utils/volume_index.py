@@ -0,0 +1,200 @@
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope
+from .informer import Informer
+from .k8s_client import KubernetesClient
+from .logger import logger
+from .quantity import quantity
+
+ClaimKey = Tuple[str, str]  # (namespace, claim name)
+
+class ClaimInfo(BaseModel):
+    namespace: str
+    name: str
+    phase: str
+    reason: str  # "pending", "lost" or "unmounted"
+    storage_class: Optional[str] = None
+    volume_name: Optional[str] = None
+    provisioned_bytes: float = 0.0
+
+def _template_claims(pod_spec: Any) -> Set[str]:
+    return {
+        v.persistent_volume_claim.claim_name
+        for v in (pod_spec and pod_spec.volumes) or []
+        if v.persistent_volume_claim
+    }
+
+def _ephemeral_claims(pod: Any) -> Set[str]:
+    """Claims of generic ephemeral volumes, which Kubernetes names `<pod>-<volume>`."""
+    return {f"{pod.metadata.name}-{v.name}" for v in (pod.spec and pod.spec.volumes) or [] if v.ephemeral}
+
+def _terminated(statuses: Any) -> Optional[List[Any]]:
+    return [
+        SimpleNamespace(state=SimpleNamespace(terminated=SimpleNamespace(finished_at=cs.state.terminated.finished_at)))
+        for cs in statuses or [] if cs.state and cs.state.terminated
+    ] or None
+
+def slim_pod(pod: Any) -> Any:
+    """What the pod informer keeps: claim-bearing volumes, phase and finish times (for the continuous
+    mode's cleanup triggers). Full pod objects for every pod in the cluster would dominate memory."""
+    status = pod.status
+    finished = status is not None and status.phase in ("Succeeded", "Failed")
+    volumes = [
+        SimpleNamespace(
+            name=v.name,
+            persistent_volume_claim=v.persistent_volume_claim and SimpleNamespace(claim_name=v.persistent_volume_claim.claim_name),
+            ephemeral=True if v.ephemeral else None,
+        )
+        for v in (pod.spec and pod.spec.volumes) or [] if v.persistent_volume_claim or v.ephemeral
+    ]
+    return SimpleNamespace(
+        metadata=SimpleNamespace(name=pod.metadata.name, namespace=pod.metadata.namespace),
+        spec=SimpleNamespace(volumes=volumes or None),
+        status=status and SimpleNamespace(
+            phase=status.phase,
+            init_container_statuses=_terminated(status.init_container_statuses) if finished else None,
+            container_statuses=_terminated(status.container_statuses) if finished else None,
+            ephemeral_container_statuses=_terminated(status.ephemeral_container_statuses) if finished else None,
+            conditions=[SimpleNamespace(last_transition_time=c.last_transition_time) for c in status.conditions or []]
+            if finished else None,
+        ),
+    )
+
+class VolumeReferenceIndex:
+    """Incrementally maintained claim -> referrers index, joined to PersistentVolume capacity.
+
+    Referrers are pods mounting a claim (or owning it through a generic ephemeral volume, for as
+    long as the pod exists), CronJobs whose job template mounts it, and StatefulSets whose
+    volumeClaimTemplates generate it (`<template>-<statefulset>-<ordinal>`, so claims kept after a
+    scale-down still count as referenced). Each watched object remembers which claims it
+    contributed, so an update only touches the claims that changed and finding unreferenced claims
+    is a single pass over the PVCs.
+    """
+
+    def __init__(self, k8s_client: KubernetesClient):
+        self._lock = threading.Lock()
+        self.claims: Dict[ClaimKey, Any] = {}
+        self.volumes: Dict[str, Tuple[float, Optional[str]]] = {}  # PV name -> (capacity bytes, storage class)
+        self.refs: Dict[ClaimKey, Set[str]] = {}
+        self.template_prefixes: Dict[Tuple[str, str], Set[str]] = {}  # (namespace, "<tpl>-<sts>") -> StatefulSets
+        self._contributions: Dict[str, Set] = {}  # referrer -> claim keys / prefixes it added
+
+        core, apps, batch = k8s_client.core_v1, k8s_client.apps_v1, k8s_client.batch_v1
+        self.informers = [
+            Informer("persistentvolumes", core.list_persistent_volume),
+            Informer("persistentvolumeclaims", core.list_persistent_volume_claim_for_all_namespaces),
+            Informer("pods", core.list_pod_for_all_namespaces, transform=slim_pod),
+            Informer("statefulsets", apps.list_stateful_set_for_all_namespaces),
+            Informer("cronjobs", batch.list_cron_job_for_all_namespaces),
+        ]
+        handlers = [self._on_volume, self._on_claim, self._on_pod, self._on_statefulset, self._on_cronjob]
+        for informer, handler in zip(self.informers, handlers):
+            informer.add_handler(handler)
+
+    def start(self) -> None:
+        for informer in self.informers:
+            informer.start()
+        logger.info("Volume reference index started", claims=len(self.claims), volumes=len(self.volumes))
+
+    def informer(self, name: str) -> Informer:
+        return next(i for i in self.informers if i.name == name)
+
+    # --- event handlers ---
+    def _on_volume(self, event_type: str, pv: Any) -> None:
+        with self._lock:
+            if event_type == "DELETED":
+                self.volumes.pop(pv.metadata.name, None)
+                return
+            capacity = (pv.spec.capacity or {}).get("storage", "0")
+            self.volumes[pv.metadata.name] = (quantity(capacity), pv.spec.storage_class_name)
+
+    def _on_claim(self, event_type: str, pvc: Any) -> None:
+        key = (pvc.metadata.namespace, pvc.metadata.name)
+        with self._lock:
+            if event_type == "DELETED":
+                self.claims.pop(key, None)
+            else:
+                self.claims[key] = pvc
+
+    def _set_references(self, referrer: str, claims: Set[ClaimKey], prefixes: Set[Tuple[str, str]]) -> None:
+        """Replaces everything `referrer` previously contributed with `claims` and `prefixes`."""
+        with self._lock:
+            previous = self._contributions.pop(referrer, set())
+            current = {("claim", c) for c in claims} | {("prefix", p) for p in prefixes}
+            for kind, key in previous - current:
+                target = self.refs if kind == "claim" else self.template_prefixes
+                holders = target.get(key)
+                if holders is not None:
+                    holders.discard(referrer)
+                    if not holders:
+                        del target[key]
+            for kind, key in current - previous:
+                target = self.refs if kind == "claim" else self.template_prefixes
+                target.setdefault(key, set()).add(referrer)
+            if current:
+                self._contributions[referrer] = current
+
+    def _on_pod(self, event_type: str, pod: Any) -> None:
+        namespace = pod.metadata.namespace
+        finished = pod.status and pod.status.phase in ("Succeeded", "Failed")
+        claims = set()
+        if event_type != "DELETED":
+            # Ephemeral claims are deleted with their pod, so they stay referenced while it exists.
+            claims = _ephemeral_claims(pod) if finished else _template_claims(pod.spec) | _ephemeral_claims(pod)
+        self._set_references(f"Pod/{namespace}/{pod.metadata.name}", {(namespace, c) for c in claims}, set())
+
+    def _on_cronjob(self, event_type: str, cronjob: Any) -> None:
+        namespace = cronjob.metadata.namespace
+        claims = set()
+        if event_type != "DELETED":
+            job_spec = cronjob.spec.job_template.spec
+            claims = _template_claims(job_spec.template.spec if job_spec and job_spec.template else None)
+        self._set_references(f"CronJob/{namespace}/{cronjob.metadata.name}", {(namespace, c) for c in claims}, set())
+
+    def _on_statefulset(self, event_type: str, sts: Any) -> None:
+        namespace, name = sts.metadata.namespace, sts.metadata.name
+        claims, prefixes = set(), set()
+        if event_type != "DELETED":
+            claims = {(namespace, c) for c in _template_claims(sts.spec.template.spec)}
+            prefixes = {(namespace, f"{t.metadata.name}-{name}") for t in sts.spec.volume_claim_templates or []}
+        self._set_references(f"StatefulSet/{namespace}/{name}", claims, prefixes)
+
+    # --- queries ---
+    def _is_referenced(self, key: ClaimKey) -> bool:
+        if key in self.refs:
+            return True
+        prefix, _, ordinal = key[1].rpartition("-")
+        return ordinal.isdigit() and (key[0], prefix) in self.template_prefixes
+
+    def referrers(self, namespace: str, claim: str) -> Set[str]:
+        with self._lock:
+            return set(self.refs.get((namespace, claim), set()))
+
+    def unreferenced_claims(self, scope: Optional[AnalysisScope] = None) -> List[ClaimInfo]:
+        """Unreferenced claims (Bound, Pending or Lost) in `scope`, with provisioned size and class."""
+        scope = scope or AnalysisScope()
+        candidates = []
+        with self._lock:
+            for key, pvc in self.claims.items():
+                if not scope.includes(key[0]):
+                    continue
+                phase = pvc.status.phase if pvc.status else "Pending"
+                # Referenced Pending claims are usually waiting for their first consumer to schedule.
+                if phase not in ("Bound", "Pending", "Lost") or self._is_referenced(key):
+                    continue
+                volume_name = pvc.spec.volume_name
+                capacity, storage_class = self.volumes.get(volume_name, (0.0, None))
+                candidates.append(ClaimInfo(
+                    namespace=key[0],
+                    name=key[1],
+                    phase=phase,
+                    reason={"Bound": "unmounted", "Pending": "pending", "Lost": "lost"}[phase],
+                    storage_class=storage_class or pvc.spec.storage_class_name,
+                    volume_name=volume_name,
+                    provisioned_bytes=capacity,
+                ))
+        return candidates
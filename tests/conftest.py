@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+
+from k8s_cost_optimizer.config import CoordinationSettings
+from k8s_cost_optimizer.agents.coordinator import ClusterCoordinator
+from k8s_cost_optimizer.utils.lease import InMemoryLeaseBackend
+from k8s_cost_optimizer.utils.state_store import InMemoryStateStore, RedisStateStore
+
+NAMESPACES = [f"ns-{i}" for i in range(40)]
+
+class FakeNamespaces:
+    """The only Kubernetes call the coordinator makes."""
+
+    def __init__(self, namespaces: List[str]):
+        self.namespaces = namespaces
+
+    def list_namespaces(self) -> List[str]:
+        return list(self.namespaces)
+
+def make_replica(identity: str, backend: InMemoryLeaseBackend) -> ClusterCoordinator:
+    return ClusterCoordinator(CoordinationSettings(POD_NAME=identity), backend, FakeNamespaces(NAMESPACES))
+
+def expire_lease(backend: InMemoryLeaseBackend, name: str) -> None:
+    """Ages a lease past its duration, as if its holder had stopped renewing it."""
+    record = backend.get(name)
+    stale = datetime.now(timezone.utc) - timedelta(seconds=record.duration_seconds + 1)
+    assert backend.replace(record.model_copy(update={"renew_time": stale}))
+
+@pytest.fixture
+def backend() -> InMemoryLeaseBackend:
+    return InMemoryLeaseBackend()
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryStateStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisStateStore("redis://localhost:6379/0", "test")  # connects lazily; swapped below
+    store.redis = fakeredis.FakeRedis(decode_responses=True)
+    return store
\ No newline at end of file
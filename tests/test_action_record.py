@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from k8s_cost_optimizer.models.action_record import (
+    DETAILS_TYPES, ActionRecord, HPADetails, NodeDrainDetails, PodCleanupDetails, PVCCleanupDetails,
+    RightsizingDetails,
+)
+from k8s_cost_optimizer.models.schemas import ActionStatus, OptimizationType
+
+DETAILS = {
+    OptimizationType.POD_CLEANUP: PodCleanupDetails(phase="Failed", uid="uid-1", finished_at="2026-01-01T00:00:00+00:00"),
+    OptimizationType.PVC_CLEANUP: PVCCleanupDetails(phase="Released", reason="no pod references it",
+                                                    storage_class="ssd", volume_name="pv-1", provisioned_bytes=10 * 2**30),
+    OptimizationType.RIGHTSIZING: RightsizingDetails(container="app", current_requests={"cpu": "1", "memory": "1Gi"},
+                                                     recommended_requests={"cpu": "400m", "memory": "300Mi"},
+                                                     workload_kind="StatefulSet"),
+    OptimizationType.HPA_OPTIMIZATION: HPADetails(recommendation="Lower minReplicas from 4 to 1", current_min=4,
+                                                  current_max=10, recommended_min=1, recommended_max=10,
+                                                  replicas_p50=1.5, replicas_p95=3.25, replicas_peak=5,
+                                                  time_at_min=0.75, time_at_max=0.0, window_days=7,
+                                                  replica_monthly_cost=12.5),
+    OptimizationType.NODE_OPTIMIZATION: NodeDrainDetails(reason="Underutilized", cpu_utilization=0.12,
+                                                         memory_utilization=0.2, pods_to_move=3,
+                                                         destinations={"node-b": 2, "node-c": 1}, pricing="kubecost"),
+}
+
+def record(action_type):
+    return ActionRecord(type=action_type, target="web", namespace="shop", details=DETAILS[action_type],
+                        confidence=0.9, estimated_savings=12.5, status=ActionStatus.EXECUTED,
+                        created_at=1767225600.25, executed_at=1767229200.5, error=None)
+
+def fields(action):
+    return {slot: getattr(action, slot) for slot in ActionRecord.__slots__}
+
+def test_every_action_type_has_a_round_trip_case():
+    assert set(DETAILS) == set(DETAILS_TYPES)
+
+@pytest.mark.parametrize("action_type", list(DETAILS), ids=lambda t: t.value)
+def test_store_format_round_trip(action_type):
+    original = record(action_type)
+    restored = ActionRecord.from_dict(json.loads(json.dumps(original.to_dict())))
+    assert type(restored.details) is DETAILS_TYPES[action_type]
+    assert fields(restored) == fields(original)
+
+@pytest.mark.parametrize("action_type", list(DETAILS), ids=lambda t: t.value)
+def test_api_model_round_trip(action_type):
+    original = record(action_type)
+    model = original.to_model()
+    assert model.action_details == {"operation": DETAILS_TYPES[action_type].operation, **DETAILS[action_type]._asdict()}
+    restored = ActionRecord.from_dict(model.model_dump(mode="json"))
+    assert fields(restored) == fields(original)
+
+def test_documents_without_newer_fields_get_their_defaults():
+    doc = record(OptimizationType.RIGHTSIZING).to_dict()
+    del doc["action_details"]["workload_kind"], doc["executed_at"], doc["status"]
+    restored = ActionRecord.from_dict(doc)
+    assert restored.details.workload_kind == "Deployment"
+    assert (restored.status, restored.executed_at) == (ActionStatus.PENDING, None)
\ No newline at end of file
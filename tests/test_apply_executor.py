@@ -0,0 +1,47 @@
+from k8s_cost_optimizer.agents.apply_executor import ServerSideApplyExecutor
+from k8s_cost_optimizer.models.action_record import ActionRecord, HPADetails, RightsizingDetails
+from k8s_cost_optimizer.models.schemas import OptimizationType
+
+class FakeApplier:
+    def __init__(self, conflicts=()):
+        self.conflicts = set(conflicts)
+        self.calls = []
+
+    def apply_object(self, body, dry_run=False, force=False):
+        self.calls.append((body, dry_run, force))
+        if body["metadata"]["name"] in self.conflicts and not force:
+            return False, "Conflict with another field manager: .spec.maxReplicas owned by argocd"
+        return True, ""
+
+def hpa_action(name="web"):
+    details = HPADetails(recommendation="", current_min=4, current_max=20, recommended_min=2, recommended_max=8)
+    return ActionRecord(OptimizationType.HPA_OPTIMIZATION, name, "shop", details, confidence=0.9)
+
+def resize_action(container):
+    details = RightsizingDetails(container=container, current_requests={"cpu": "1"}, recommended_requests={"cpu": 0.5})
+    return ActionRecord(OptimizationType.RIGHTSIZING, "web", "shop", details, confidence=0.9)
+
+def test_hpa_patch_sets_both_bounds():
+    applier = FakeApplier()
+    ServerSideApplyExecutor(applier).execute([hpa_action()])
+    body = applier.calls[-1][0]
+    assert body["spec"] == {"minReplicas": 2, "maxReplicas": 8}
+
+def test_container_resizes_share_one_patch():
+    applier = FakeApplier()
+    actions = [resize_action("app"), resize_action("sidecar")]
+    results = ServerSideApplyExecutor(applier).execute(actions)
+    assert all(ok for ok, _ in results.values())
+    applied = [body for body, dry_run, _ in applier.calls if not dry_run]
+    assert len(applied) == 1
+    assert [c["name"] for c in applied[0]["spec"]["template"]["spec"]["containers"]] == ["app", "sidecar"]
+
+def test_conflicts_are_reported_unless_forced():
+    applier = FakeApplier(conflicts={"web"})
+    action = hpa_action()
+    ok, message = ServerSideApplyExecutor(applier).execute([action])[action.id]
+    assert not ok and "argocd" in message
+    assert all(dry_run for _, dry_run, _ in applier.calls)
+
+    ok, _ = ServerSideApplyExecutor(applier, force_conflicts=True).execute([action])[action.id]
+    assert ok
\ No newline at end of file
@@ -0,0 +1,53 @@
+from types import SimpleNamespace as NS
+
+from k8s_cost_optimizer.agents.safety_controller import SafetyController
+from k8s_cost_optimizer.models.action_record import ActionRecord, NodeDrainDetails
+from k8s_cost_optimizer.models.schemas import ActionStatus, OptimizationType
+from k8s_cost_optimizer.tools.consolidation import ConsolidationPlanner
+
+def node(name, cpu="4", memory="16Gi", unschedulable=None):
+    return NS(
+        metadata=NS(name=name, labels={}),
+        spec=NS(taints=None, unschedulable=unschedulable),
+        status=NS(allocatable={"cpu": cpu, "memory": memory}, conditions=[NS(type="Ready", status="True")]),
+    )
+
+def pod(name, node_name, cpu="1", memory="1Gi", affinity=None):
+    container = NS(resources=NS(requests={"cpu": cpu, "memory": memory}))
+    return NS(
+        metadata=NS(name=name, namespace="shop", annotations=None, owner_references=[NS(kind="ReplicaSet")]),
+        spec=NS(node_name=node_name, containers=[container], init_containers=None, overhead=None,
+                tolerations=None, node_selector=None, affinity=affinity),
+        status=NS(phase="Running"),
+    )
+
+def test_later_drains_see_pods_moved_by_earlier_ones():
+    nodes = [node("a"), node("b"), node("c", cpu="8", memory="32Gi")]
+    # b starts at 44% (memory); draining a onto it takes its CPU to 50%, so b is no longer a candidate.
+    pods = [pod("p1", "a"), pod("p2", "b", memory="7Gi"), pod("p3", "c", cpu="5", memory="2Gi")]
+    drains = ConsolidationPlanner().plan(nodes, pods, {})
+    assert [d.node for d in drains] == ["a"]
+    assert drains[0].destinations == {"b": 1}
+
+def test_required_pod_affinity_blocks_the_node():
+    affinity = NS(node_affinity=None, pod_anti_affinity=None,
+                  pod_affinity=NS(required_during_scheduling_ignored_during_execution=[NS()]))
+    nodes = [node("a"), node("b"), node("c")]
+    pods = [pod("p1", "a", affinity=affinity), pod("p2", "b", cpu="2"), pod("p3", "c", cpu="2")]
+    assert ConsolidationPlanner().plan(nodes, pods[1:] + [pod("p1", "a")], {})[0].node == "a"
+    assert "a" not in [d.node for d in ConsolidationPlanner().plan(nodes, pods, {})]
+
+def drain_action(name):
+    details = NodeDrainDetails(reason="", cpu_utilization=0.1, memory_utilization=0.1, pods_to_move=1, destinations={})
+    return ActionRecord(OptimizationType.NODE_OPTIMIZATION, name, "", details, confidence=0.9)
+
+def test_safety_counts_drains_approved_in_the_same_batch():
+    nodes = [node(name) for name in "abcd"]
+    controller = SafetyController(NS(get_nodes=lambda: nodes))
+    actions = controller.validate_actions([drain_action(name) for name in "abc"], "run")
+    assert [a.status for a in actions] == [ActionStatus.APPROVED, ActionStatus.APPROVED, ActionStatus.REJECTED]
+
+def test_execution_recheck_ignores_cordoned_nodes():
+    nodes = [node("a"), node("b", unschedulable=True), node("c")]
+    controller = SafetyController(NS(get_nodes=lambda: nodes))
+    assert not controller.can_drain_node(drain_action("a"))
\ No newline at end of file
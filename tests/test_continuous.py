@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace as NS
+
+from k8s_cost_optimizer.agents.continuous import ContinuousOptimizer
+from k8s_cost_optimizer.config import ContinuousSettings
+from k8s_cost_optimizer.models.schemas import OptimizationType
+from k8s_cost_optimizer.tools.pod_cleaner import PodCleanupTool
+
+RETENTION = PodCleanupTool.RETENTION.total_seconds()
+
+def optimizer() -> ContinuousOptimizer:
+    settings = ContinuousSettings(debounce_seconds=0, max_delay_seconds=0, min_interval_seconds=0,
+                                  full_sweep_interval_seconds=10 * RETENTION)
+    k8s = NS(autoscaling_v2=NS(list_horizontal_pod_autoscaler_for_all_namespaces=None), core_v1=NS(list_node=None))
+    return ContinuousOptimizer(settings, k8s, volume_index=None)
+
+def finished_pod(name: str, ago: timedelta, namespace: str = "jobs"):
+    terminated = NS(state=NS(terminated=NS(finished_at=datetime.now(timezone.utc) - ago)))
+    return NS(
+        metadata=NS(name=name, namespace=namespace),
+        spec=NS(volumes=None),
+        status=NS(phase="Succeeded", container_statuses=[terminated], init_container_statuses=None,
+                  ephemeral_container_statuses=None, conditions=None),
+    )
+
+def test_pod_cleanup_waits_for_the_retention_period():
+    continuous = optimizer()
+    continuous._on_pod("MODIFIED", finished_pod("job-1", timedelta(hours=1)))
+    now = time.monotonic()
+    assert continuous.poll(now + 1) is None
+
+    trigger, scope = continuous.poll(now + RETENTION - 3600 + 5)
+    assert trigger == "event"
+    assert scope.action_types == {OptimizationType.POD_CLEANUP} and scope.namespaces == {"jobs"}
+    assert continuous.poll(now + 2 * RETENTION) is None  # fired once
+
+def test_pod_past_retention_triggers_right_away():
+    continuous = optimizer()
+    continuous._on_pod("MODIFIED", finished_pod("job-1", PodCleanupTool.RETENTION + timedelta(minutes=1)))
+    trigger, scope = continuous.poll(time.monotonic() + 1)
+    assert scope.action_types == {OptimizationType.POD_CLEANUP}
+
+def test_deleted_pod_is_not_cleaned_up():
+    continuous = optimizer()
+    pod = finished_pod("job-1", timedelta(hours=1))
+    continuous._on_pod("MODIFIED", pod)
+    continuous._on_pod("DELETED", pod)
+    assert continuous.poll(time.monotonic() + RETENTION) is None
+
+def test_namespace_alert_targets_rightsizing_there():
+    continuous = optimizer()
+    assert continuous.handle_alerts([{"status": "firing", "labels": {"namespace": "shop"}}]) == 1
+    _, scope = continuous.poll(time.monotonic() + 1)
+    assert scope.action_types == {OptimizationType.RIGHTSIZING} and scope.namespaces == {"shop"}
\ No newline at end of file
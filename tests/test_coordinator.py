@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from k8s_cost_optimizer.agents.coordinator import CLUSTER_SHARD, merge_shard_reports
+from k8s_cost_optimizer.models.schemas import AnalysisScope, OptimizationRun, RunStatus
+from k8s_cost_optimizer.utils.state_store import InMemoryStateStore
+
+from conftest import NAMESPACES, expire_lease, make_replica
+
+def start(backend, *identities):
+    replicas = [make_replica(identity, backend) for identity in identities]
+    for _ in range(2):  # the second round sees every member lease created in the first
+        for replica in replicas:
+            replica.heartbeat()
+    return replicas
+
+def schedule(store, leader, run_id="run-1"):
+    store.create_run(OptimizationRun(run_id=run_id, status=RunStatus.PENDING, shards=leader.plan_shards()))
+    return run_id
+
+def process(store, replica, run_id):
+    """One pass of the shard worker loop for `replica`; returns the shards it completed."""
+    done = []
+    for shard, owner in replica.claimable_shards(store.get_run(run_id)):
+        if store.claim_shard(run_id, shard, replica.identity, expected_owner=owner):
+            reports = store.complete_shard(run_id, shard, replica.identity, RunStatus.COMPLETED,
+                                           {"total_actions_generated": 1}, [])
+            if reports is not None:
+                store.finalize_run(run_id, RunStatus.COMPLETED, merge_shard_reports(reports))
+            done.append(shard)
+    return done
+
+def test_exactly_one_leader_and_shared_membership(backend):
+    replicas = start(backend, "r0", "r1", "r2")
+    assert [r.is_leader for r in replicas].count(True) == 1
+    assert all(r.live_members() == ["r0", "r1", "r2"] for r in replicas)
+
+def test_leader_failover(backend):
+    r0, r1, r2 = start(backend, "r0", "r1", "r2")
+    leader = next(r for r in (r0, r1, r2) if r.is_leader)
+    survivors = [r for r in (r0, r1, r2) if r is not leader]
+
+    expire_lease(backend, f"{leader.settings.lease_prefix}-leader")
+    expire_lease(backend, f"{leader.settings.lease_prefix}-member-{leader.identity}")
+    for replica in survivors:
+        replica.heartbeat()
+
+    assert [r.is_leader for r in survivors].count(True) == 1
+    assert all(leader.identity not in r.live_members() for r in survivors)
+    assert backend.get(f"{leader.settings.lease_prefix}-leader").transitions == 1
+
+def test_shards_partition_namespaces_across_replicas(backend):
+    replicas = start(backend, "r0", "r1", "r2")
+    run = OptimizationRun(run_id="run-1", status=RunStatus.PENDING, shards=replicas[0].plan_shards())
+    assert set(run.shards) == {"r0", "r1", "r2", CLUSTER_SHARD}
+
+    scopes = {shard: replicas[0].scope_for(run, shard) for shard in run.shards}
+    owned = [ns for shard in ("r0", "r1", "r2") for ns in scopes[shard].namespaces]
+    assert sorted(owned) == sorted(NAMESPACES)
+    assert not any(scopes[shard].cluster_scoped for shard in ("r0", "r1", "r2"))
+    assert scopes[CLUSTER_SHARD].namespaces == set() and scopes[CLUSTER_SHARD].cluster_scoped
+    # Every replica computes the same partition.
+    assert scopes["r1"] == replicas[2].scope_for(run, "r1")
+
+def test_targeted_run_only_partitions_its_namespaces(backend):
+    r0, r1 = start(backend, "r0", "r1")
+    target = AnalysisScope(namespaces={"ns-1", "ns-2", "ns-3"})
+    run = OptimizationRun(run_id="run-1", status=RunStatus.PENDING, shards=r0.plan_shards(), scope=target)
+    assert r0.scope_for(run, "r0").namespaces | r0.scope_for(run, "r1").namespaces == target.namespaces
+
+def test_shard_claim_and_finalize(backend):
+    replicas = start(backend, "r0", "r1", "r2")
+    leader = next(r for r in replicas if r.is_leader)
+    store = InMemoryStateStore()
+    run_id = schedule(store, leader)
+
+    followers_done = [process(store, r, run_id) for r in replicas if r is not leader]
+    assert all(len(done) == 1 for done in followers_done)
+    assert store.get_run(run_id).status == RunStatus.RUNNING
+
+    assert sorted(process(store, leader, run_id)) == sorted([leader.identity, CLUSTER_SHARD])
+    run = store.get_run(run_id)
+    assert run.status == RunStatus.COMPLETED
+    assert run.report["total_actions_generated"] == 4
+    assert store.list_active_runs() == []
+
+def test_each_shard_is_claimed_once(backend):
+    r0, r1 = start(backend, "r0", "r1")
+    store = InMemoryStateStore()
+    run_id = schedule(store, r0)
+    assert store.claim_shard(run_id, "r1", "r1")
+    assert not store.claim_shard(run_id, "r1", "r0")
+    assert ("r1", None) not in r0.claimable_shards(store.get_run(run_id))
+
+def test_leader_reclaims_running_shard_of_dead_replica(backend):
+    r0, r1, r2 = start(backend, "r0", "r1", "r2")
+    leader = next(r for r in (r0, r1, r2) if r.is_leader)
+    victim = next(r for r in (r0, r1, r2) if not r.is_leader)
+    store = InMemoryStateStore()
+    run_id = schedule(store, leader)
+
+    # The victim claims its shard, then dies before completing it.
+    assert store.claim_shard(run_id, victim.identity, victim.identity)
+    for replica in (r0, r1, r2):
+        if replica is not victim:
+            process(store, replica, run_id)
+    assert store.get_run(run_id).status == RunStatus.RUNNING
+
+    expire_lease(backend, f"{victim.settings.lease_prefix}-member-{victim.identity}")
+    leader.heartbeat()
+    # A fresh claim is left alone for one lease term, in case its owner has just joined.
+    assert leader.claimable_shards(store.get_run(run_id)) == []
+    store.runs[run_id].claims[victim.identity].claimed_at -= timedelta(seconds=60)
+
+    assert leader.claimable_shards(store.get_run(run_id)) == [(victim.identity, victim.identity)]
+    assert process(store, leader, run_id) == [victim.identity]
+    assert store.get_run(run_id).status == RunStatus.COMPLETED
+    assert store.list_active_runs() == []
+
+    # The dead replica's late result no longer counts.
+    assert store.complete_shard(run_id, victim.identity, victim.identity, RunStatus.FAILED, {"error": "late"}, []) is None
+    assert store.get_run(run_id).claims[victim.identity].owner == leader.identity
+
+def test_followers_do_not_reclaim(backend):
+    r0, r1, r2 = start(backend, "r0", "r1", "r2")
+    follower = next(r for r in (r0, r1, r2) if not r.is_leader)
+    store = InMemoryStateStore()
+    run_id = schedule(store, r0)
+    dead = next(r for r in (r0, r1, r2) if r is not follower and not r.is_leader)
+    assert store.claim_shard(run_id, dead.identity, dead.identity)
+    store.runs[run_id].claims[dead.identity].claimed_at -= timedelta(seconds=60)
+    expire_lease(backend, f"{dead.settings.lease_prefix}-member-{dead.identity}")
+    follower.heartbeat()
+    assert follower.claimable_shards(store.get_run(run_id)) == [(follower.identity, None)]
\ No newline at end of file
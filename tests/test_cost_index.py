@@ -0,0 +1,92 @@
+import math
+from types import SimpleNamespace as NS
+
+import numpy as np
+import pytest
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope
+from k8s_cost_optimizer.tools.kubecost_suggester import KubecostSuggesterTool
+from k8s_cost_optimizer.utils.cost_index import (
+    DEFAULT_CPU_CORE_HOUR, DEFAULT_RAM_GIB_HOUR, DEFAULT_STORAGE_GIB_HOUR, GIB, HOURS_PER_MONTH, CostIndex,
+)
+
+def allocation(namespace, controller, cpu_cost, cores, ram_cost, ram_gib, total=0.0, minutes=0.0, name=None):
+    return {"name": name or f"{namespace}/{controller}",
+            "properties": {"namespace": namespace, "controller": controller},
+            "cpuCost": cpu_cost, "cpuCoreHours": cores, "ramCost": ram_cost, "ramByteHours": ram_gib * GIB,
+            "totalCost": total, "minutes": minutes}
+
+class FakeKubecost:
+    def __init__(self, allocations=(), assets=(), recommendations=()):
+        self.allocations, self.assets, self.recommendations = list(allocations), list(assets), list(recommendations)
+        self.calls = []
+
+    def get_allocations(self, window="7d", aggregate="namespace,controller"):
+        self.calls.append("allocations")
+        return self.allocations
+
+    def get_assets(self, window="7d"):
+        self.calls.append("assets")
+        return self.assets
+
+    def get_savings_recommendations(self):
+        return self.recommendations
+
+ALLOCATIONS = [
+    allocation("shop", "web", cpu_cost=4.0, cores=100.0, ram_cost=1.0, ram_gib=100.0, total=20.0, minutes=600),
+    allocation("shop", "db", cpu_cost=1.0, cores=100.0, ram_cost=0.0, ram_gib=0.0),
+    allocation("", "", cpu_cost=50.0, cores=1.0, ram_cost=50.0, ram_gib=1.0, name="__idle__"),
+]
+ASSETS = [
+    {"type": "Node", "properties": {"name": "node-a"}, "nodeType": "m5.large", "totalCost": 2.0, "minutes": 60},
+    {"type": "Node", "properties": {"name": "node-b"}, "nodeType": "m5.large", "totalCost": 4.0, "minutes": 60},
+    {"type": "Disk", "storageClass": "ssd", "totalCost": 1.0, "byteHours": 100.0 * GIB, "minutes": 60},
+    {"type": "Node", "properties": {"name": "node-gone"}, "totalCost": 9.0, "minutes": 0},
+]
+
+def test_rates_resolve_workload_then_namespace_then_cluster():
+    costs = CostIndex.from_kubecost(FakeKubecost(ALLOCATIONS, ASSETS))
+    assert costs.source == "kubecost"
+    monthly = costs.compute_monthly_cost(["shop", "shop", "shop", "other"], ["web", "db", None, "web"],
+                                         np.ones(4), np.zeros(4))
+    # web 0.04/core-hour; db 0.01; the namespace blends both (5 / 200); unknown namespaces get the same
+    # cluster rate, since the idle bucket is excluded.
+    assert monthly / HOURS_PER_MONTH == pytest.approx([0.04, 0.01, 0.025, 0.025])
+    # db has no RAM data of its own, so it falls back to the cluster RAM rate.
+    ram = costs.compute_monthly_cost(["shop"], ["db"], np.zeros(1), np.array([GIB]))
+    assert ram[0] / HOURS_PER_MONTH == pytest.approx(0.01)
+
+def test_workload_storage_and_node_lookups_fall_back():
+    costs = CostIndex.from_kubecost(FakeKubecost(ALLOCATIONS, ASSETS))
+    workload = costs.workload_monthly_cost(["shop", "shop"], ["web", "db"])
+    assert workload[0] == pytest.approx(2.0 * HOURS_PER_MONTH) and math.isnan(workload[1])
+
+    storage = costs.storage_monthly_cost(["ssd", "unknown"], np.array([GIB, GIB]))
+    assert storage / HOURS_PER_MONTH == pytest.approx([0.01, 0.01])  # unknown classes: mean of known rates
+
+    nodes = costs.node_hourly_cost(["node-a", "node-new", "node-bare"], ["m5.large", "m5.large", None],
+                                   np.array([2.0, 2.0, 2.0]), np.array([0.0, 0.0, 0.0]))
+    assert nodes == pytest.approx([2.0, 3.0, 2 * 0.025])  # by name, then instance type, then capacity
+    assert "node-gone" not in costs.node_hourly_costs
+
+def test_without_kubecost_data_default_prices_apply():
+    kubecost = FakeKubecost()
+    costs = CostIndex.from_kubecost(kubecost, datasets=frozenset({"allocations"}))
+    assert (costs.source, kubecost.calls) == ("default", ["allocations"])
+    monthly = costs.compute_monthly_cost(["shop"], ["web"], np.array([1.0]), np.array([GIB]))
+    assert monthly[0] == pytest.approx((DEFAULT_CPU_CORE_HOUR + DEFAULT_RAM_GIB_HOUR) * HOURS_PER_MONTH)
+    assert costs.storage_monthly_cost([None], np.array([GIB]))[0] == pytest.approx(DEFAULT_STORAGE_GIB_HOUR * HOURS_PER_MONTH)
+
+def test_kubecost_suggestions_skip_controller_kinds_that_cannot_be_patched():
+    def rec(name, kind, **extra):
+        return {"type": "Request Sizing", "namespace": "shop", "name": name, "container": "app",
+                "controllerKind": kind, "requestCurrent": {"cpu": "1"}, "requestRec": {"cpu": "500m"}, **extra}
+
+    recommendations = [rec("web", "deployment"), rec("db", "statefulset", monthlySavings=3.0),
+                       rec("nightly", "job"), rec("orphan", "replicaset")]
+    costs = CostIndex.from_kubecost(FakeKubecost(ALLOCATIONS))
+    tool = KubecostSuggesterTool(FakeKubecost(recommendations=recommendations), NS(), NS())
+    actions = {a.target: a for a in tool.analyze(AnalysisScope(), costs)}
+    assert {t: a.details.workload_kind for t, a in actions.items()} == {"web": "Deployment", "db": "StatefulSet"}
+    assert actions["web"].estimated_savings == pytest.approx(round(0.5 * 0.04 * HOURS_PER_MONTH, 2))
+    assert actions["db"].estimated_savings == 3.0
\ No newline at end of file
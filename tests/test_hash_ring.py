@@ -0,0 +1,24 @@
+from k8s_cost_optimizer.utils.hash_ring import ConsistentHashRing
+
+KEYS = [f"ns-{i}" for i in range(500)]
+
+def test_owner_is_deterministic_and_independent_of_member_order():
+    a = ConsistentHashRing(["r0", "r1", "r2"])
+    b = ConsistentHashRing(["r2", "r0", "r1", "r0"])
+    assert [a.owner(k) for k in KEYS] == [b.owner(k) for k in KEYS]
+
+def test_partition_covers_every_key_once_and_spreads_them():
+    shards = ConsistentHashRing(["r0", "r1", "r2"]).partition(KEYS)
+    assert sorted(k for keys in shards.values() for k in keys) == sorted(KEYS)
+    assert all(len(keys) > len(KEYS) / 6 for keys in shards.values())
+
+def test_removing_a_member_only_moves_its_keys():
+    before = ConsistentHashRing(["r0", "r1", "r2"])
+    after = ConsistentHashRing(["r0", "r2"])
+    moved = [k for k in KEYS if before.owner(k) != after.owner(k)]
+    assert moved and all(before.owner(k) == "r1" for k in moved)
+
+def test_empty_ring_owns_nothing():
+    ring = ConsistentHashRing([])
+    assert ring.owner("ns-0") is None
+    assert ring.partition(["ns-0"]) == {}
\ No newline at end of file
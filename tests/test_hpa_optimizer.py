@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace as NS
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope
+from k8s_cost_optimizer.tools.hpa_optimizer import (
+    CURRENT_REPLICAS, DESIRED_REPLICAS, OBSERVED_METRIC, TARGET_METRIC, HPAOptimizerTool,
+)
+from k8s_cost_optimizer.utils.query_planner import ShardedResult
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+def hpa(name, min_replicas, max_replicas):
+    return NS(metadata=NS(name=name, namespace="shop"),
+              spec=NS(min_replicas=min_replicas, max_replicas=max_replicas, scale_target_ref=NS(name=name)))
+
+def history(name, replicas, demand):
+    """Series for one HPA: `replicas` and `demand` are cycled over the whole window."""
+    steps = int(HPAOptimizerTool.WINDOW.total_seconds() // HPAOptimizerTool.STEP_SECONDS) + 1
+    start = (NOW - HPAOptimizerTool.WINDOW).timestamp()
+    times = [start + i * HPAOptimizerTool.STEP_SECONDS for i in range(steps)]
+
+    def series(metric, values):
+        labels = {"__name__": metric, "namespace": "shop", "horizontalpodautoscaler": name,
+                  "metric_name": "cpu", "metric_target_type": "utilization"}
+        return {"metric": labels, "values": [[t, str(values[i % len(values)])] for i, t in enumerate(times)]}
+
+    # observed / target = demand / replicas, so the tool's demand estimate comes out as `demand`.
+    return [series(CURRENT_REPLICAS, replicas), series(DESIRED_REPLICAS, replicas),
+            series(OBSERVED_METRIC, [d / r * 50 for d, r in zip(demand, replicas)]), series(TARGET_METRIC, [50])]
+
+class FakePrometheus:
+    def __init__(self, series):
+        self.series = series
+
+    def query_range_sharded(self, build_query, start, end, step_seconds, namespaces, weights=None):
+        return ShardedResult(series=self.series)
+
+def analyze(hpas, series):
+    tool = HPAOptimizerTool(NS(list_hpas=lambda namespaces: hpas), FakePrometheus(series))
+    tool.clock = lambda: NOW
+    return {a.target: a for a in tool.analyze(AnalysisScope())}
+
+def test_ceiling_is_tuned_even_when_the_floor_stays():
+    actions = analyze([hpa("web", 2, 20)], history("web", [3, 4, 5], [3, 4, 5]))
+    details = actions["web"].details
+    assert (details.recommended_min, details.recommended_max) == (2, 6)
+    assert details.recommendation == "Lower maxReplicas from 20 to 6"
+    assert actions["web"].estimated_savings == 0
+
+def test_floor_and_ceiling_together():
+    actions = analyze([hpa("api", 4, 10)], history("api", [4, 4, 4, 5], [1, 2, 2, 5]))
+    details = actions["api"].details
+    assert (details.recommended_min, details.recommended_max) == (1, 6)
+    assert details.recommendation == "Lower minReplicas from 4 to 1; lower maxReplicas from 10 to 6"
+    assert actions["api"].estimated_savings > 0
+
+def test_capped_hpas_get_a_higher_ceiling_and_settled_ones_nothing():
+    series = history("busy", [10], [12]) + history("steady", [3, 4, 5], [3, 4, 5])
+    actions = analyze([hpa("busy", 2, 10), hpa("steady", 2, 6)], series)
+    assert actions["busy"].details.recommendation == "Raise maxReplicas from 10 to 15"
+    assert "steady" not in actions
+
+def test_small_ceiling_moves_are_left_alone():
+    series = history("near", [3, 4, 5], [3, 4, 5]) + history("api", [4, 4, 4, 5], [1, 2, 2, 5])
+    actions = analyze([hpa("near", 2, 7), hpa("api", 4, 7)], series)
+    assert "near" not in actions  # 7 -> 6 is within the hysteresis band
+    details = actions["api"].details
+    assert (details.recommended_min, details.recommended_max) == (1, 7)
+    assert details.recommendation == "Lower minReplicas from 4 to 1"
\ No newline at end of file
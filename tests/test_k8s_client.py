@@ -0,0 +1,71 @@
+from types import SimpleNamespace as NS
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from k8s_cost_optimizer.utils import k8s_client
+from k8s_cost_optimizer.utils.k8s_client import FINISHED_POD_FIELD_SELECTOR, KubernetesClient
+
+class FakeCoreV1:
+    """Pages pod lists two at a time and records every call."""
+
+    def __init__(self, pods=(), delete_errors=None):
+        self.pods = list(pods)
+        self.delete_errors = delete_errors or {}
+        self.list_calls, self.deletes = [], []
+
+    def _page(self, kwargs, pods):
+        self.list_calls.append(kwargs)
+        start = int(kwargs.get("_continue") or 0)
+        token = str(start + 2) if start + 2 < len(pods) else None
+        return NS(items=pods[start:start + 2], metadata=NS(_continue=token))
+
+    def list_pod_for_all_namespaces(self, **kwargs):
+        return self._page(kwargs, self.pods)
+
+    def list_namespaced_pod(self, namespace, **kwargs):
+        return self._page({"namespace": namespace, **kwargs}, [p for p in self.pods if p.namespace == namespace])
+
+    def delete_namespaced_pod(self, name, namespace, body=None):
+        self.deletes.append((namespace, name, body))
+        if name in self.delete_errors:
+            raise ApiException(status=self.delete_errors[name], reason="error")
+
+@pytest.fixture
+def kube(monkeypatch):
+    monkeypatch.setattr(k8s_client.config, "load_incluster_config", lambda: None)
+    return KubernetesClient(page_size=2)
+
+def test_finished_pod_selector_only_matches_terminal_phases():
+    excluded = {term.split("!=")[1] for term in FINISHED_POD_FIELD_SELECTOR.split(",")}
+    assert all(term.startswith("status.phase!=") for term in FINISHED_POD_FIELD_SELECTOR.split(","))
+    phases = {"Pending", "Running", "Succeeded", "Failed", "Unknown"}
+    assert phases - excluded == {"Succeeded", "Failed"}
+
+def test_finished_pods_are_selected_server_side_and_paged(kube):
+    pods = [NS(name=f"pod-{i}", namespace="jobs" if i % 2 else "web") for i in range(5)]
+    kube.core_v1 = FakeCoreV1(pods)
+    assert kube.get_finished_pods() == pods
+    assert [c.get("_continue") for c in kube.core_v1.list_calls] == [None, "2", "4"]
+    assert all(c["field_selector"] == FINISHED_POD_FIELD_SELECTOR and c["limit"] == 2 for c in kube.core_v1.list_calls)
+
+    kube.core_v1 = FakeCoreV1(pods)
+    assert [p.name for p in kube.get_finished_pods(["jobs"])] == ["pod-1", "pod-3"]
+    assert {c["namespace"] for c in kube.core_v1.list_calls} == {"jobs"}
+    assert all(c["field_selector"] == FINISHED_POD_FIELD_SELECTOR for c in kube.core_v1.list_calls)
+
+def test_bulk_delete_preconditions_on_uid_and_maps_conflicts(kube):
+    kube.core_v1 = FakeCoreV1(delete_errors={"gone": 404, "replaced": 409, "forbidden": 403})
+    results = kube.delete_pods([
+        ("jobs", "done", "uid-1"), ("jobs", "gone", "uid-2"), ("jobs", "replaced", "uid-3"),
+        ("jobs", "forbidden", "uid-4"), ("jobs", "legacy", None),
+    ])
+    assert results[("jobs", "done")] == (True, "")
+    assert results[("jobs", "gone")] == (True, "Pod was already deleted")
+    assert results[("jobs", "replaced")] == (False, "Pod was replaced since analysis (uid precondition failed)")
+    assert results[("jobs", "forbidden")][0] is False
+    assert results[("jobs", "legacy")] == (True, "")
+
+    bodies = {name: body for _, name, body in kube.core_v1.deletes}
+    assert bodies["done"].preconditions.uid == "uid-1"
+    assert bodies["legacy"] is None  # no uid recorded, so no precondition
\ No newline at end of file
@@ -0,0 +1,77 @@
+import pytest
+
+from k8s_cost_optimizer.config import DependencyLimits
+from k8s_cost_optimizer.utils.outbound import EVICTION, SPLITTABLE_QUERY, CircuitOpenError, Outcome, OutboundGuard
+from k8s_cost_optimizer.utils.query_planner import ShardedQueryPlanner
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+class ReadTimeout(Exception):
+    pass
+
+def make_guard(**limits):
+    return OutboundGuard("test", DependencyLimits(rate=1000.0, burst=1000, failure_threshold=2, **limits))
+
+def failing(exc):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise exc
+    return fn, calls
+
+def test_overload_is_retried_by_default():
+    guard = make_guard(max_retries=1)
+    fn, calls = failing(StatusError(429))
+    with pytest.raises(StatusError):
+        guard.call(fn)
+    assert len(calls) == 2
+    assert guard.counts["retried"] == 1
+
+def test_splittable_timeouts_and_503s_are_not_retried_or_counted_by_the_circuit():
+    guard = make_guard()
+    for exc in (ReadTimeout(), StatusError(503), ReadTimeout(), StatusError(503)):
+        fn, calls = failing(exc)
+        with pytest.raises(type(exc)):
+            guard.call_with(SPLITTABLE_QUERY, fn)
+        assert len(calls) == 1
+    assert guard.breaker.state == guard.breaker.CLOSED
+    assert guard.counts[Outcome.TOO_HEAVY.value] == 4
+
+def test_plain_timeouts_still_open_the_circuit():
+    guard = make_guard()
+    for _ in range(2):
+        with pytest.raises(ReadTimeout):
+            guard.call(failing(ReadTimeout())[0])
+    with pytest.raises(CircuitOpenError):
+        guard.call(lambda: None)
+
+def test_eviction_blocked_by_a_budget_is_not_overload():
+    guard = make_guard()
+    limit = guard.limiter.limit
+    fn, calls = failing(StatusError(429))
+    with pytest.raises(StatusError):
+        guard.call_with(EVICTION, fn)
+    assert len(calls) == 1
+    assert guard.limiter.limit >= limit
+    assert guard.counts[Outcome.OVERLOAD.value] == 0
+
+def test_list_latency_target_overrides_the_dependency_target():
+    guard = make_guard(latency_target_seconds=1.0)
+    limit = guard.limiter.limit
+    guard.limiter.acquire()
+    guard.limiter.release(5.0, Outcome.OK, latency_target=10.0)
+    assert guard.limiter.limit >= limit
+
+def test_planner_does_not_split_once_the_circuit_is_open():
+    queries = []
+
+    def execute(query):
+        queries.append(query)
+        raise CircuitOpenError("prometheus")
+    result = ShardedQueryPlanner(concurrency=2, shard_count=2).run(execute, lambda m: m, ["a", "b", "c", "d"])
+    assert len(queries) == 2
+    assert sorted(result.failed_namespaces) == ["a", "b", "c", "d"]
\ No newline at end of file
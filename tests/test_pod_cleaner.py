@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace as NS
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope
+from k8s_cost_optimizer.tools.pod_cleaner import PodCleanupTool, pod_finished_at
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+def terminated(finished_at):
+    return NS(state=NS(terminated=NS(finished_at=finished_at) if finished_at else None))
+
+def pod(name="job-1", init=None, containers=None, ephemeral=None, conditions=None, phase="Succeeded"):
+    return NS(
+        metadata=NS(name=name, namespace="jobs", uid=f"uid-{name}"),
+        status=NS(phase=phase, init_container_statuses=init, container_statuses=containers,
+                  ephemeral_container_statuses=ephemeral, conditions=conditions),
+    )
+
+def test_finished_at_is_the_latest_termination_across_container_kinds():
+    base = NOW - timedelta(days=2)
+    init = [terminated(base)]
+    containers = [terminated(base + timedelta(minutes=5)), terminated(None)]
+    assert pod_finished_at(pod(init=init, containers=containers)) == base + timedelta(minutes=5)
+    debug = [terminated(base + timedelta(hours=1))]
+    assert pod_finished_at(pod(init=init, containers=containers, ephemeral=debug)) == base + timedelta(hours=1)
+    assert pod_finished_at(pod(init=[terminated(base + timedelta(hours=2))], containers=containers)) \
+        == base + timedelta(hours=2)
+
+def test_finished_at_falls_back_to_conditions_and_assumes_utc():
+    naive = datetime(2026, 2, 1, 12, 0)
+    conditions = [NS(last_transition_time=naive - timedelta(hours=1)), NS(last_transition_time=naive)]
+    assert pod_finished_at(pod(containers=[terminated(None)], conditions=conditions)) == naive.replace(tzinfo=timezone.utc)
+    assert pod_finished_at(pod()) is None
+
+def test_cleanup_keeps_pods_within_retention():
+    pods = [
+        pod("old", containers=[terminated(NOW - timedelta(days=2))]),
+        pod("debugged", containers=[terminated(NOW - timedelta(days=2))], ephemeral=[terminated(NOW - timedelta(hours=1))]),
+        pod("unknown"),
+    ]
+    tool = PodCleanupTool(NS(get_finished_pods=lambda namespaces: pods), None)
+    tool.clock = lambda: NOW
+    [action] = tool.analyze(AnalysisScope())
+    assert (action.target, action.details.uid) == ("old", "uid-old")
\ No newline at end of file
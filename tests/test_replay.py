@@ -0,0 +1,80 @@
+from datetime import timedelta
+from types import SimpleNamespace as NS
+
+import pytest
+from kubernetes import client
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope, OptimizationType
+from k8s_cost_optimizer.replay import apply_overrides, coerce, replay
+from k8s_cost_optimizer.tools.hpa_optimizer import HPAOptimizerTool
+from k8s_cost_optimizer.tools.pod_cleaner import PodCleanupTool
+from k8s_cost_optimizer.utils import snapshot as snapshots
+
+def test_durations_replace_timedeltas():
+    assert coerce("36h", PodCleanupTool.RETENTION) == timedelta(hours=36)
+    assert coerce("2d", HPAOptimizerTool.WINDOW) == timedelta(days=2)
+    assert coerce("90", timedelta()) == timedelta(seconds=90)
+    with pytest.raises(ValueError):
+        coerce("1w", timedelta())
+
+def test_numbers_keep_their_type():
+    assert coerce("1", HPAOptimizerTool.MAX_HEADROOM) == 1.0
+    assert isinstance(coerce("1", HPAOptimizerTool.MAX_HEADROOM), float)
+    assert coerce("600", HPAOptimizerTool.STEP_SECONDS) == 600
+    with pytest.raises(ValueError):
+        coerce("0.5", HPAOptimizerTool.STEP_SECONDS)
+    with pytest.raises(ValueError):
+        coerce("high", HPAOptimizerTool.MAX_HEADROOM)
+
+def test_overrides_apply_to_the_named_tool_only():
+    tools = [PodCleanupTool(None, None), HPAOptimizerTool(None, None)]
+    apply_overrides(tools, [("PodCleanupTool", "RETENTION", "12h")])
+    assert tools[0].RETENTION == timedelta(hours=12)
+    assert PodCleanupTool.RETENTION == timedelta(hours=24)
+    with pytest.raises(ValueError):
+        apply_overrides(tools, [("PodCleanupTool", "NO_SUCH", "1")])
+    with pytest.raises(ValueError):
+        apply_overrides(tools, [("NoSuchTool", "RETENTION", "1h")])
+
+def k8s_node(name):
+    return client.V1Node(
+        metadata=client.V1ObjectMeta(name=name, labels={"topology.kubernetes.io/zone": "z1"}),
+        spec=client.V1NodeSpec(),
+        status=client.V1NodeStatus(allocatable={"cpu": "4", "memory": "16Gi"},
+                                   conditions=[client.V1NodeCondition(type="Ready", status="True")]),
+    )
+
+def k8s_pod(name, node, cpu="1", affinity=None):
+    container = client.V1Container(name="app", resources=client.V1ResourceRequirements(requests={"cpu": cpu, "memory": "1Gi"}))
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=name, namespace="shop", uid=name,
+                                     owner_references=[client.V1OwnerReference(api_version="apps/v1", kind="ReplicaSet",
+                                                                               name="rs", uid="rs")]),
+        spec=client.V1PodSpec(node_name=node, containers=[container], affinity=affinity),
+        status=client.V1PodStatus(phase="Running"),
+    )
+
+def test_recorded_snapshot_replays_node_consolidation(tmp_path):
+
+    zone = client.V1NodeAffinity(required_during_scheduling_ignored_during_execution=client.V1NodeSelector(
+        node_selector_terms=[client.V1NodeSelectorTerm(match_expressions=[
+            client.V1NodeSelectorRequirement(key="topology.kubernetes.io/zone", operator="In", values=["z1"])])]))
+    colocated = client.V1PodAffinity(required_during_scheduling_ignored_during_execution=[
+        client.V1PodAffinityTerm(topology_key="kubernetes.io/hostname",
+                                 label_selector=client.V1LabelSelector(match_labels={"app": "cache"}))])
+    nodes = [k8s_node(name) for name in ("a", "b", "c", "d")]
+    pods = [
+        k8s_pod("zoned", "a", affinity=client.V1Affinity(node_affinity=zone)),
+        k8s_pod("colocated", "d", affinity=client.V1Affinity(pod_affinity=colocated)),
+        k8s_pod("busy-b", "b", cpu="2500m"), k8s_pod("busy-c", "c", cpu="2500m"),
+    ]
+    k8s = snapshots.RecordingKubernetesClient(NS(get_nodes=lambda: nodes, get_all_pods=lambda namespaces=None: pods))
+    recorder = snapshots.SnapshotRecorder("run-1", AnalysisScope(action_types={OptimizationType.NODE_OPTIMIZATION}))
+    with snapshots.recording(recorder):
+        k8s.get_nodes()
+        k8s.get_all_pods()
+    path = recorder.write(str(tmp_path))
+
+    summary = replay(path, [], include_actions=True)
+    assert "error" not in summary
+    assert [a["target"] for a in summary["action_details"]] == ["a"]
\ No newline at end of file
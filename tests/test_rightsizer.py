@@ -0,0 +1,52 @@
+from types import SimpleNamespace as NS
+
+from k8s_cost_optimizer.models.schemas import AnalysisScope
+from k8s_cost_optimizer.tools.rightsizer import RightsizingTool
+from k8s_cost_optimizer.utils.query_planner import ShardedResult
+
+def pod(name, owner_kind, owner_name, cpu="1", memory="1Gi", namespace="shop"):
+    container = NS(name="app", resources=NS(requests={"cpu": cpu, "memory": memory}))
+    return NS(
+        metadata=NS(name=name, namespace=namespace, owner_references=[NS(kind=owner_kind, name=owner_name)]),
+        spec=NS(containers=[container]),
+    )
+
+class FakeK8s:
+    def __init__(self, pods):
+        self.pods = pods
+
+    def get_all_pods(self, namespaces=None):
+        return list(self.pods)
+
+class FakePrometheus:
+    """p95 usage per pod: CPU cores and memory bytes."""
+
+    def __init__(self, usage):
+        self.usage = usage
+
+    def query_sharded(self, build_query, namespaces, weights=None):
+        cpu = "cpu" in build_query("")
+        return ShardedResult(series=[
+            {"metric": {"namespace": "shop", "pod": name, "container": "app"},
+             "value": [0, str(cores if cpu else memory)]}
+            for name, (cores, memory) in self.usage.items()
+        ])
+
+def test_one_action_per_workload_container_sized_for_the_busiest_replica():
+    pods = [pod("web-5d8f-a", "ReplicaSet", "web-5d8f"), pod("web-5d8f-b", "ReplicaSet", "web-5d8f")]
+    usage = {"web-5d8f-a": (0.2, 300 * 2**20), "web-5d8f-b": (0.4, 200 * 2**20)}
+    [action] = RightsizingTool(FakeK8s(pods), FakePrometheus(usage)).analyze(AnalysisScope())
+    assert (action.target, action.details.workload_kind) == ("web", "Deployment")
+    assert action.details.recommended_requests == {"cpu": "400m", "memory": "300Mi"}
+    assert action.estimated_savings > 0
+
+def test_skips_workloads_the_executor_cannot_patch():
+    pods = [pod("batch-x1", "Job", "batch"), pod("db-0", "StatefulSet", "db")]
+    usage = {"batch-x1": (0.1, 2**20), "db-0": (0.1, 2**20)}
+    actions = RightsizingTool(FakeK8s(pods), FakePrometheus(usage)).analyze(AnalysisScope())
+    assert [(a.target, a.details.workload_kind) for a in actions] == [("db", "StatefulSet")]
+
+def test_insignificant_cpu_change_is_ignored():
+    pods = [pod("web-5d8f-a", "ReplicaSet", "web-5d8f", cpu="500m")]
+    usage = {"web-5d8f-a": (0.45, 2**20)}
+    assert RightsizingTool(FakeK8s(pods), FakePrometheus(usage)).analyze(AnalysisScope()) == []
\ No newline at end of file
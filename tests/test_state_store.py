@@ -0,0 +1,150 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from k8s_cost_optimizer.models.action_record import ActionRecord, PodCleanupDetails, RightsizingDetails
+from k8s_cost_optimizer.models.schemas import ActionStatus, OptimizationRun, OptimizationType, RunStatus
+from k8s_cost_optimizer.utils.state_store import EPOCH, RedisStateStore
+
+def action(target: str, namespace: str = "default", savings: float = 10.0) -> ActionRecord:
+    return ActionRecord(type=OptimizationType.POD_CLEANUP, target=target, namespace=namespace,
+                        details=PodCleanupDetails(phase="Succeeded", uid=None, finished_at="2026-01-01T00:00:00"),
+                        estimated_savings=savings, confidence=0.9)
+
+def new_run(store, run_id="run-1", shards=("r0", "r1"), created_at=None):
+    run = OptimizationRun(run_id=run_id, status=RunStatus.PENDING, shards={s: RunStatus.PENDING for s in shards},
+                          created_at=created_at or datetime.utcnow())
+    store.create_run(run)
+    return run
+
+def test_run_lifecycle(store):
+    new_run(store)
+    assert store.claim_shard("run-1", "r0", "r0")
+    assert not store.claim_shard("run-1", "r0", "r1")
+    assert not store.claim_shard("run-1", "missing", "r0")
+    assert store.claim_shard("run-1", "r1", "r1")
+    run = store.get_run("run-1")
+    assert run.status == RunStatus.RUNNING
+    assert {s: c.owner for s, c in run.claims.items()} == {"r0": "r0", "r1": "r1"}
+
+    first = [action("a"), action("b")]
+    assert store.complete_shard("run-1", "r0", "r0", RunStatus.COMPLETED, {"n": 2}, first) is None
+    reports = store.complete_shard("run-1", "r1", "r1", RunStatus.FAILED, {"error": "boom"}, [])
+    assert reports == {"r0": {"n": 2}, "r1": {"error": "boom"}}
+
+    store.finalize_run("run-1", RunStatus.FAILED, {"merged": True}, "boom")
+    run = store.get_run("run-1")
+    assert (run.status, run.report, run.detail) == (RunStatus.FAILED, {"merged": True}, "boom")
+    assert store.list_active_runs() == []
+    assert sorted(a.target for a in store.list_run_actions("run-1")) == ["a", "b"]
+    assert not store.claim_shard("run-1", "r0", "r1", expected_owner="r0")  # finished shards stay finished
+
+def test_reclaim_is_compare_and_set(store):
+    new_run(store)
+    assert store.claim_shard("run-1", "r0", "r0")
+    assert not store.claim_shard("run-1", "r0", "leader")  # owned, not unclaimed
+    assert not store.claim_shard("run-1", "r0", "leader", expected_owner="someone-else")
+    assert store.claim_shard("run-1", "r0", "leader", expected_owner="r0")
+    assert not store.claim_shard("run-1", "r0", "other", expected_owner="r0")  # lost the race
+    assert store.complete_shard("run-1", "r0", "r0", RunStatus.COMPLETED, {}, [action("stale")]) is None
+    assert store.list_run_actions("run-1") == []
+    assert store.get_run("run-1").claims["r0"].owner == "leader"
+
+def test_pending_queue(store):
+    actions = [action("a"), action("b"), action("c")]
+    store.add_pending_actions(actions)
+    assert [a.target for a in store.list_pending_actions()] == ["a", "b", "c"]
+    assert store.count_pending_actions() == 3
+    popped = store.pop_pending_action(actions[1].id)
+    assert popped.target == "b"
+    assert store.pop_pending_action(actions[1].id) is None
+    assert [a.target for a in store.list_pending_actions()] == ["a", "c"]
+
+def test_queue_pending_actions_once_per_container_and_refreshes_stale(store):
+    def rightsize(container, cpu):
+        return ActionRecord(type=OptimizationType.RIGHTSIZING, target="web", namespace="default",
+                            details=RightsizingDetails(container, {"cpu": "1"}, {"cpu": cpu}),
+                            estimated_savings=5.0, confidence=0.8)
+
+    first = [rightsize("app", "500m"), rightsize("sidecar", "100m"), action("a")]
+    assert store.queue_pending_actions(first) == first
+
+    again = [rightsize("app", "500m"), rightsize("sidecar", "50m"), action("a")]
+    queued = store.queue_pending_actions(again)
+    assert queued == [again[1]]
+    assert sorted(a.id for a in store.list_pending_actions()) == sorted([first[0].id, again[1].id, first[2].id])
+    superseded = store.list_activity(10)
+    assert [(a.id, a.status, a.error) for a in superseded] == [
+        (first[1].id, ActionStatus.REJECTED, f"Superseded by {again[1].id}")]
+
+def test_activity_stats_and_exports(store):
+    actions = [action(f"pod-{i}", savings=float(i)) for i in range(5)]
+    for a in actions:
+        a.status = ActionStatus.EXECUTED
+        a.executed_at = time.time()
+        store.record_activity(a)
+        store.record_execution(a.estimated_savings)
+    assert [a.target for a in store.list_activity(2)] == ["pod-4", "pod-3"]
+    assert [a.target for a in store.iter_activity(batch_size=2)] == [f"pod-{i}" for i in range(4, -1, -1)]
+    assert sorted(a.id for a in store.iter_actions(batch_size=2)) == sorted(a.id for a in actions)
+    assert store.get_stats() == {"total_savings": 10.0, "actions_executed": 5}
+
+def test_iter_actions_yields_each_action_once(store):
+    actions = [action(f"pod-{i}") for i in range(5)]
+    store.add_pending_actions(actions)
+    for a in actions:
+        a.status = ActionStatus.EXECUTED
+        a.executed_at = time.time()
+        store.record_activity(a)
+        store.save_action(a)
+    exported = [a.id for a in store.iter_actions(batch_size=2)]
+    assert sorted(exported) == sorted(a.id for a in actions)
+
+def test_run_updates_do_not_overwrite_each_other(store):
+    if not isinstance(store, RedisStateStore):
+        pytest.skip("only the shared store has concurrent writers")
+    new_run(store)
+    key, dump, raced = store._key("run", "run-1"), store._dump_run, []
+
+    def racing_dump(run):
+        if not raced:  # another replica updates the run between our read and write
+            raced.append(True)
+            other = OptimizationRun.model_validate_json(store.redis.get(key)).model_copy(update={"detail": "concurrent"})
+            store.redis.set(key, dump(other))
+        return dump(run)
+
+    store._dump_run = racing_dump
+    store._update_run("run-1", status=RunStatus.RUNNING)
+    run = store.get_run("run-1")
+    assert (run.status, run.detail) == (RunStatus.RUNNING, "concurrent")
+
+def test_iter_runs_by_creation_time(store):
+    base = datetime(2026, 1, 1)
+    for i in range(5):
+        new_run(store, f"run-{i}", created_at=base + timedelta(hours=i))
+    since = (base + timedelta(hours=1) - EPOCH).total_seconds()
+    until = (base + timedelta(hours=3) - EPOCH).total_seconds()
+    assert [r.run_id for r in store.iter_runs(since, until, batch_size=2)] == ["run-1", "run-2", "run-3"]
+    assert [r.run_id for r in store.list_runs()] == [f"run-{i}" for i in range(4, -1, -1)]
+
+def test_iter_actions_by_creation_time(store):
+    actions = [action(f"pod-{i}") for i in range(5)]
+    for i, a in enumerate(actions):
+        a.created_at = 1_000_000.0 + i * 3600
+    store.add_pending_actions(actions[::-1])
+    since, until = actions[1].created_at, actions[3].created_at
+    assert [a.target for a in store.iter_actions(since, until, batch_size=2)] == ["pod-1", "pod-2", "pod-3"]
+    assert [a.target for a in store.iter_actions(since=since, batch_size=2)] == ["pod-1", "pod-2", "pod-3", "pod-4"]
+
+def test_rollups(store):
+    pending = action("a", namespace="team-a", savings=5.0)
+    store.add_pending_actions([pending])
+    pending.status = ActionStatus.EXECUTED
+    pending.executed_at = pending.created_at
+    store.record_activity(pending)
+    bucket = datetime.utcfromtimestamp(pending.created_at).strftime("%Y-%m-%d")
+    [(got_bucket, cells)] = store.get_rollups("day", [bucket, "1999-01-01"])
+    assert got_bucket == bucket
+    assert cells["pod_cleanup|team-a|pending|count"] == 1.0
+    assert cells["pod_cleanup|team-a|executed|realized_savings"] == 5.0
\ No newline at end of file
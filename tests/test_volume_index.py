@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace as NS
+
+from kubernetes.client.rest import ApiException
+
+from k8s_cost_optimizer.tools.pod_cleaner import pod_finished_at
+from k8s_cost_optimizer.utils.informer import Informer
+from k8s_cost_optimizer.utils.volume_index import VolumeReferenceIndex, slim_pod
+
+FINISHED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def pod(name, volumes=(), phase="Running", namespace="data"):
+    terminated = NS(state=NS(terminated=NS(finished_at=FINISHED_AT, exit_code=0), running=None))
+    return NS(
+        metadata=NS(name=name, namespace=namespace, labels={"app": name}, resource_version="1"),
+        spec=NS(volumes=list(volumes), containers=[NS(name="main", image="busybox")]),
+        status=NS(phase=phase, container_statuses=[terminated], init_container_statuses=None,
+                  ephemeral_container_statuses=None, conditions=[NS(type="Ready", last_transition_time=FINISHED_AT)]),
+    )
+
+def claim_volume(name, claim):
+    return NS(name=name, persistent_volume_claim=NS(claim_name=claim, read_only=False), ephemeral=None, config_map=None)
+
+def ephemeral_volume(name):
+    return NS(name=name, persistent_volume_claim=None, ephemeral=NS(volume_claim_template=NS()), config_map=None)
+
+def pvc(name, namespace="data"):
+    return NS(metadata=NS(name=name, namespace=namespace),
+              spec=NS(volume_name=None, storage_class_name="standard"), status=NS(phase="Bound"))
+
+class PagedList:
+    def __init__(self, objects, expire_after=None):
+        self.objects = objects
+        self.expire_after = expire_after
+        self.calls = []
+
+    def __call__(self, limit=None, _continue=None, **kwargs):
+        self.calls.append((limit, _continue))
+        if self.expire_after is not None and _continue is not None and len(self.calls) > self.expire_after:
+            raise ApiException(status=410, reason="Gone")
+        start = int(_continue or 0)
+        end = start + limit if limit else len(self.objects)
+        token = str(end) if end < len(self.objects) else None
+        return NS(items=self.objects[start:end], metadata=NS(_continue=token, resource_version="42"))
+
+def test_informer_lists_in_pages_and_keeps_transformed_objects():
+    list_fn = PagedList([pod(f"p{i}") for i in range(5)])
+    informer = Informer("pods", list_fn, page_size=2, transform=slim_pod)
+    informer._relist()
+    assert [limit for limit, _ in list_fn.calls] == [2, 2, 2]
+    assert sorted(informer.store) == [f"data/p{i}" for i in range(5)]
+    assert not hasattr(informer.store["data/p0"].spec, "containers")
+    assert informer.resource_version == "42"
+
+def test_expired_continuation_falls_back_to_one_list():
+    list_fn = PagedList([pod(f"p{i}") for i in range(5)], expire_after=1)
+    informer = Informer("pods", list_fn, page_size=2)
+    informer._relist()
+    assert len(informer.store) == 5
+    assert list_fn.calls[-1] == (None, None)
+
+def test_slim_pod_keeps_what_the_handlers_read():
+    finished = slim_pod(pod("job", [claim_volume("data", "job-data"), NS(name="cfg", persistent_volume_claim=None,
+                                                                         ephemeral=None, config_map=NS())], "Succeeded"))
+    assert [v.persistent_volume_claim.claim_name for v in finished.spec.volumes] == ["job-data"]
+    assert finished.status.phase == "Succeeded"
+    assert pod_finished_at(finished) == FINISHED_AT
+    running = slim_pod(pod("web"))
+    assert running.spec.volumes is None and running.status.container_statuses is None
+
+def index_with(pods, claims):
+    lists = {name: PagedList(objs) for name, objs in
+             (("pv", []), ("pvc", claims), ("pods", pods), ("sts", []), ("cron", []))}
+    k8s = NS(
+        core_v1=NS(list_persistent_volume=lists["pv"], list_persistent_volume_claim_for_all_namespaces=lists["pvc"],
+                   list_pod_for_all_namespaces=lists["pods"]),
+        apps_v1=NS(list_stateful_set_for_all_namespaces=lists["sts"]),
+        batch_v1=NS(list_cron_job_for_all_namespaces=lists["cron"]),
+    )
+    index = VolumeReferenceIndex(k8s)
+    for informer in index.informers:
+        informer._relist()
+    return index
+
+def test_ephemeral_claims_are_referenced_while_their_pod_exists():
+    pods = [pod("web", [ephemeral_volume("scratch")]), pod("job", [ephemeral_volume("scratch")], "Succeeded")]
+    claims = [pvc("web-scratch"), pvc("job-scratch"), pvc("orphan")]
+    index = index_with(pods, claims)
+    assert [c.name for c in index.unreferenced_claims()] == ["orphan"]
+    index.informer("pods")._dispatch("DELETED", slim_pod(pods[1]))
+    assert sorted(c.name for c in index.unreferenced_claims()) == ["job-scratch", "orphan"]
\ No newline at end of file